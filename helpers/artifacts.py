@@ -0,0 +1,101 @@
+# ============================================================
+# helpers/artifacts.py
+#
+# In-memory handoff of tables between stages that run in one process
+# (thread stages of helpers/pipeline.py, or one script run directly):
+# - publish() registers a stage's output frame under its file path, typed
+#   by helpers/table_schema.py, and queues the Parquet write on a
+#   background writer thread (ARTIFACTS_PERSIST=0: no write, and a copy left
+#   by an earlier run is deleted so it is never taken for this run's table)
+# - fetch() returns the registered frame, or reads the file when the
+#   producer ran in another process or in an earlier run
+# - flush() waits for queued writes; the pipeline calls it before a stage's
+#   outputs are hashed or read by a process stage
+# - release() drops frames no remaining stage reads (the pipeline calls it)
+# ============================================================
+
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+import pandas as pd
+
+from helpers import table_schema
+
+PERSIST = os.getenv("ARTIFACTS_PERSIST", "1") != "0"
+
+_lock = threading.Lock()
+_frames: dict[str, pd.DataFrame] = {}
+_writes: dict[str, object] = {}  # path -> Future of its latest queued write
+_writer: ThreadPoolExecutor | None = None
+
+
+def _key(path) -> str:
+    return str(Path(path).resolve())
+
+
+def publish(df: pd.DataFrame, path) -> pd.DataFrame:
+    """Register `df` as the table at `path` (typed by its schema) and queue its write; returns the typed frame."""
+    global _writer
+    stem = Path(path).stem
+    df = table_schema.enforce(df, stem) if stem in table_schema.SCHEMAS else df.copy()
+    with _lock:
+        _frames[_key(path)] = df
+        if PERSIST:
+            if _writer is None:
+                # One writer thread: writes of the same path land in publish order
+                _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifacts")
+            _writes[_key(path)] = _writer.submit(table_schema.write_parquet, df, path)
+        else:
+            Path(path).unlink(missing_ok=True)
+    return df
+
+
+def has(path) -> bool:
+    """True if a frame was published for `path` in this process."""
+    with _lock:
+        return _key(path) in _frames
+
+
+def fetch(path, copy: bool = True) -> pd.DataFrame:
+    """The table at `path`: the published frame (a copy unless copy=False), else read from disk."""
+    with _lock:
+        df = _frames.get(_key(path))
+    if df is None:
+        flush([path])  # a released frame may still be being written
+        return table_schema.read_table(path)
+    return df.copy() if copy else df
+
+
+def release(paths):
+    """Drop the published frames of `paths` (queued writes still complete); later fetches read the files."""
+    with _lock:
+        for path in paths:
+            _frames.pop(_key(path), None)
+
+
+def pending(paths) -> list[str]:
+    """Those of `paths` whose queued write has not finished yet."""
+    with _lock:
+        return [p for p in paths if (f := _writes.get(_key(p))) is not None and not f.done()]
+
+
+def flush(paths=None):
+    """Wait for the queued writes of `paths` (default: all); raises the first write error."""
+    with _lock:
+        keys = list(_writes) if paths is None else [_key(p) for p in paths]
+        futures = [_writes[k] for k in keys if k in _writes]
+    wait(futures)
+    for future in futures:
+        future.result()
+
+
+@atexit.register
+def _flush_at_exit():
+    # Scripts run directly exit right after publishing: report writes that failed
+    try:
+        flush()
+    except Exception as e:
+        print(f"❌ Failed to write artifact: {e}")
@@ -0,0 +1,173 @@
+# ============================================================
+# helpers/auditor_index.py
+#
+# HKEX Auditor Reports archive page (auditorreport_anntdate_des.htm),
+# fetched and parsed once per process for every consumer:
+# - download_hkex_auditor_reports.py writes the rows to auditor_reports.csv
+# - download_hkex_auditor_pdfs.py takes its PDF links from the same rows
+# Parsing is one streaming lxml pass over the table rows (BeautifulSoup's
+# html.parser is the fallback when lxml is not installed).
+# Sync is incremental: the page lists the newest announcements first, so
+# parsing stops once it is past rows already in auditor_reports.csv.
+# ============================================================
+
+import csv
+import os
+import threading
+
+from helpers import http_client
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+URL = "https://www3.hkexnews.hk/reports/auditorreport/ncms/auditorreport_anntdate_des.htm"
+SAVE_DIR = "./data/raw"
+HTML_PATH = os.path.join(SAVE_DIR, "auditor_reports.htm")  # cached page (+ .metadata sidecar)
+CSV_PATH = os.path.join(SAVE_DIR, "auditor_reports.csv")
+PDF_DIR = "data/raw/auditor_pdfs"
+FULL_SYNC = os.getenv("AUDITOR_FULL_SYNC", "0") in ("1", "true", "True")  # rebuild the CSV from every row
+COLUMNS = ["stock_code", "listed_company_name", "announcement_date", "hyperlink", "pdf_path", "document_name"]
+KEY_COLUMNS = ["stock_code", "announcement_date", "hyperlink"]  # identity of a row (row_key)
+
+_lock = threading.Lock()
+_state = {"new_rows": None, "result": None}  # this process's sync (shared by both stages)
+
+
+# ------------------------------------------------------------
+# Parsing
+# ------------------------------------------------------------
+def make_row(cols: list[str], links: list[str]) -> dict:
+    """
+    Row dict from the first three cell texts and the row's hrefs. The first href
+    is the row's hyperlink; "pdf_links" keeps every PDF href of the row for the
+    PDF downloader (it is not a CSV column).
+    """
+    link = links[0] if links else ""
+    raw_name = os.path.basename(link.split("?")[0]) if link else ""
+    return {
+        "stock_code": cols[0],
+        "listed_company_name": cols[1],
+        "announcement_date": cols[2],
+        "hyperlink": link,
+        "pdf_path": f"{PDF_DIR}/{raw_name}" if raw_name else "",  # relative path for portability
+        "document_name": os.path.splitext(raw_name)[0] if raw_name else "",  # matches other tables
+        "pdf_links": [href for href in links if href.lower().endswith(".pdf")],
+    }
+
+
+def row_key(row: dict, columns=KEY_COLUMNS) -> tuple:
+    """
+    Identity of an index row: its `columns` values (default KEY_COLUMNS). Values are
+    normalized so CSV strings ("00005") match what pandas stored in SQLite (5).
+    """
+    def norm(value):
+        text = "" if value is None else str(value).strip()
+        if text.lower() == "nan":
+            return ""
+        try:
+            number = float(text)
+            return str(int(number)) if number.is_integer() else text
+        except ValueError:
+            return text
+    return tuple(norm(row.get(column)) for column in columns)
+
+
+def iter_rows(path: str = HTML_PATH):
+    """Yield the data rows of the page's first table, newest announcement first."""
+    if etree is None:
+        yield from _iter_rows_bs4(path)
+        return
+    header_skipped = False
+    for _, el in etree.iterparse(path, events=("end",), tag=("tr", "table"), html=True, encoding="utf-8"):
+        if el.tag == "table":
+            return  # first table only
+        if not header_skipped:
+            header_skipped = True
+        else:
+            cols = ["".join(t.strip() for t in td.itertext()) for td in el.iterfind("td")]
+            if len(cols) >= 3:
+                yield make_row(cols, [a.get("href") for a in el.iterfind(".//a[@href]")])
+        el.clear(keep_tail=True)  # bounded memory on the full archive
+
+
+def _iter_rows_bs4(path: str):
+    from bs4 import BeautifulSoup
+
+    with open(path, "rb") as f:
+        table = BeautifulSoup(f.read(), "html.parser").find("table")
+    if not table:
+        return
+    for row in table.find_all("tr")[1:]:  # skip header
+        cols = [td.get_text(strip=True) for td in row.find_all("td")]
+        if len(cols) >= 3:
+            yield make_row(cols, [a["href"] for a in row.find_all("a", href=True)])
+
+
+def read_csv(path: str = CSV_PATH) -> list[dict]:
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def write_csv(rows: list[dict], path: str = CSV_PATH, append: bool = False):
+    """Write `rows` to the CSV (atomically), or append them to an existing one."""
+    if append and os.path.exists(path):
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore").writerows(rows)
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def new_rows(rows, known: set) -> list[dict]:
+    """
+    Rows of `rows` (newest first) whose key is not in `known`. Stops at the end of
+    the announcement date of the first known row, so same-day filings listed after
+    it are still picked up.
+    """
+    new, boundary = [], None
+    for row in rows:
+        if boundary is not None and row["announcement_date"] != boundary:
+            break
+        if row_key(row) in known:
+            boundary = boundary or row["announcement_date"]
+            continue
+        new.append(row)
+    return new
+
+
+# ------------------------------------------------------------
+# Shared fetch
+# ------------------------------------------------------------
+def sync(metrics=None) -> tuple[list[dict] | None, str, bool]:
+    """
+    (new_rows, result, full) for this run. The first caller in a process does the
+    conditional GET and parses the page; later callers get the same answer.
+    result is the fetch_if_modified() outcome ("downloaded" / "not_modified" /
+    "missing"; new_rows is None when missing). full is True when there was no
+    usable CSV (or AUDITOR_FULL_SYNC is set) and new_rows holds the whole index.
+    Otherwise only rows newer than those in auditor_reports.csv are parsed.
+    """
+    with _lock:
+        if _state["result"] is None:
+            os.makedirs(SAVE_DIR, exist_ok=True)
+            result = http_client.fetch_if_modified(URL, HTML_PATH, timeout=30, metrics=metrics)
+            rows, full = None, FULL_SYNC or not os.path.exists(CSV_PATH)
+            if result != "missing":
+                csv_fresh = not full and os.path.getmtime(CSV_PATH) >= os.path.getmtime(HTML_PATH)
+                if full:
+                    rows = list(iter_rows())
+                elif result == "not_modified" and csv_fresh:
+                    rows = []
+                else:
+                    rows = new_rows(iter_rows(), {row_key(r) for r in read_csv()})
+            _state.update(new_rows=rows, result=result, full=full)
+        return _state["new_rows"], _state["result"], _state["full"]
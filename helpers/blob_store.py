@@ -0,0 +1,225 @@
+# ============================================================
+# helpers/blob_store.py
+#
+# Content-addressable store for raw downloads:
+# - blobs are kept once under BLOB_ROOT/<sha256[:2]>/<sha256>, read-only
+# - compressible formats (xls, htm, json, csv, ...) are stored zstd-compressed
+#   when the optional `zstandard` package is installed
+# - human-readable paths (data/raw/auditor_pdfs/..., data/processed/...) are
+#   hardlinks to the blob (symlink, then copy, as fallbacks); compressed blobs
+#   keep a plain working copy next to the pipeline instead
+# - `_blob_catalog` table in the SQLite DB maps logical names to blobs, so a
+#   missing file can be restored without downloading it again
+#
+# Writers must replace files (os.replace, as helpers/http_client.py does),
+# never rewrite them in place: a hardlinked path shares the blob's inode.
+# ============================================================
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import stat
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import zstandard  # optional: compressible blobs are stored uncompressed without it
+except ImportError:
+    zstandard = None
+
+BLOB_ROOT = os.getenv("BLOB_ROOT", "data/blobs")
+DB_PATH = os.getenv("DB_PATH", "data/hongkong.db")
+COMPRESS = os.getenv("BLOB_COMPRESS", "1") not in ("0", "false", "False")
+LINK_MODE = os.getenv("BLOB_LINK_MODE", "hard")  # hard | symbolic | copy
+COMPRESSIBLE = {".xls", ".htm", ".html", ".json", ".csv", ".txt"}  # pdf/xlsx are compressed already
+ZSTD_LEVEL = 10
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def logical_name(path) -> str:
+    """Catalog key of a file: its path relative to the project, with forward slashes."""
+    p = Path(os.path.abspath(path))
+    try:
+        return p.relative_to(Path.cwd()).as_posix()
+    except ValueError:
+        return p.as_posix()
+
+
+class BlobStore:
+    """Blobs under `root` plus the `_blob_catalog` table in the SQLite DB at db_path."""
+
+    def __init__(self, root: str = BLOB_ROOT, db_path: str = DB_PATH, compress: bool = COMPRESS,
+                 link_mode: str = LINK_MODE):
+        self.root = Path(root)
+        self.db_path = db_path
+        self.compress = compress and zstandard is not None
+        self.link_mode = link_mode
+        self.root.mkdir(parents=True, exist_ok=True)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS _blob_catalog (
+                    name TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER, stored_size INTEGER,
+                    compressed INTEGER, mtime_ns INTEGER, updated_at TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_blob_catalog_sha ON _blob_catalog(sha256)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=120)
+
+    # --------------------------------------------------------
+    # Blobs
+    # --------------------------------------------------------
+    def blob_path(self, sha: str, compressed: bool) -> Path:
+        return self.root / sha[:2] / (sha + (".zst" if compressed else ""))
+
+    def _find_blob(self, sha: str) -> tuple[Path, bool] | None:
+        for compressed in (False, True):
+            blob = self.blob_path(sha, compressed)
+            if blob.exists():
+                return blob, compressed
+        return None
+
+    def _write_blob(self, src: Path, sha: str, compressed: bool) -> Path:
+        blob = self.blob_path(sha, compressed)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temp name: two threads may store the same content at once
+        fd, tmp = tempfile.mkstemp(dir=blob.parent, prefix=sha + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out, open(src, "rb") as f:
+                if compressed:
+                    zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(f, out)
+                else:
+                    shutil.copyfileobj(f, out, CHUNK_SIZE)
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)  # in-place writes fail loudly
+            os.replace(tmp, blob)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return blob
+
+    def _materialize(self, blob: Path, compressed: bool, dest: Path):
+        """Point `dest` at a blob (link, or a decompressed copy), replacing it atomically."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.link")
+        if tmp.exists() or tmp.is_symlink():
+            tmp.unlink()
+        if compressed:
+            with open(blob, "rb") as f, open(tmp, "wb") as out:
+                zstandard.ZstdDecompressor().copy_stream(f, out)
+        else:
+            modes = {"hard": ("hard", "symbolic"), "symbolic": ("symbolic",)}.get(self.link_mode, ())
+            for mode in modes + ("copy",):
+                try:
+                    if mode == "hard":
+                        os.link(blob, tmp)
+                    elif mode == "symbolic":
+                        os.symlink(os.path.abspath(blob), tmp)
+                    else:
+                        shutil.copyfile(blob, tmp)
+                    break
+                except OSError:
+                    continue
+        os.replace(tmp, dest)
+
+    # --------------------------------------------------------
+    # Catalog
+    # --------------------------------------------------------
+    def lookup(self, name: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT sha256, size, stored_size, compressed, mtime_ns FROM _blob_catalog WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("sha256", "size", "stored_size", "compressed", "mtime_ns"), row))
+
+    def _record(self, name: str, sha: str, path: Path, blob: Path, compressed: bool):
+        st = path.stat()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO _blob_catalog VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, sha, st.st_size, blob.stat().st_size, int(compressed), st.st_mtime_ns,
+                 datetime.now().isoformat(timespec="seconds")),
+            )
+
+    # --------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------
+    def put(self, path, name: str | None = None) -> str:
+        """
+        Store the file at `path` (logical name: `name` or its project-relative path)
+        and return its SHA-256. Content already held is not stored again; `path`
+        becomes a link to the blob. Files unchanged since the last put are not re-hashed.
+        """
+        path = Path(path)
+        name = name or logical_name(path)
+        entry = self.lookup(name)
+        st = path.stat()
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns \
+                and self._find_blob(entry["sha256"]):
+            return entry["sha256"]
+
+        sha = file_sha256(path)
+        found = self._find_blob(sha)
+        if found is None:
+            compressed = self.compress and path.suffix.lower() in COMPRESSIBLE
+            found = self._write_blob(path, sha, compressed), compressed
+        blob, compressed = found
+        if not compressed and not path.is_symlink() and not os.path.samefile(blob, path):
+            self._materialize(blob, False, path)
+        self._record(name, sha, path, blob, compressed)
+        return sha
+
+    def restore(self, path, name: str | None = None) -> bool:
+        """Recreate a cataloged file from its blob (False if it is not held)."""
+        path = Path(path)
+        entry = self.lookup(name or logical_name(path))
+        found = self._find_blob(entry["sha256"]) if entry else None
+        if found is None:
+            return False
+        self._materialize(*found, path)
+        self._record(name or logical_name(path), entry["sha256"], path, *found)
+        return True
+
+    def link(self, src, dest, name: str | None = None) -> str:
+        """Make `dest` a second name for the content of `src` (no extra copy for linkable blobs)."""
+        sha = self.put(src)
+        blob, compressed = self._find_blob(sha)
+        dest = Path(dest)
+        self._materialize(blob, compressed, dest)
+        self._record(name or logical_name(dest), sha, dest, blob, compressed)
+        return sha
+
+    def put_tree(self, directory, pattern: str = "*") -> int:
+        """put() every file under `directory` matching `pattern`; returns the number of files."""
+        count = 0
+        for path in sorted(Path(directory).rglob(pattern)):
+            if path.is_file() and not path.name.endswith((".part", ".metadata", ".tmp")):
+                self.put(path)
+                count += 1
+        return count
+
+
+# ------------------------------------------------------------
+# Entry point: move existing download folders into the store
+#   python helpers/blob_store.py data/raw/auditor_pdfs data/processed/auditor_pdfs
+# (only folders whose files are replaced, never edited in place)
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    store = BlobStore()
+    for directory in sys.argv[1:] or ["data/raw/auditor_pdfs", "data/processed/auditor_pdfs"]:
+        print(f"📦 {directory}: {store.put_tree(directory)} files stored in {store.root}")
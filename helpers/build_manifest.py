@@ -0,0 +1,271 @@
+# ============================================================
+# helpers/build_manifest.py
+#
+# Persistent build manifest for the stage runner (like make / dbt state):
+# - _pipeline_runs        : one row per stage execution with the content
+#                           hashes of its code, inputs and outputs
+# - _pipeline_tables      : lineage hash of every table a stage built
+#                           (in-place updates keep the builder's hash)
+# - _pipeline_file_hashes : stat cache so unchanged files are not rehashed
+#
+# A stage whose fingerprint (code + inputs + arguments) matches its last
+# successful run, and whose outputs are still as recorded, is skipped.
+# The code hash covers the stage's source file plus every project module it
+# imports, directly or through other project modules.
+# ============================================================
+
+import ast
+import hashlib
+import inspect
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+TABLE_PREFIX = "table:"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+# ------------------------------------------------------------
+# Hash helpers
+# ------------------------------------------------------------
+def _sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _sha256_json(obj) -> str:
+    return _sha256_bytes(json.dumps(obj, sort_keys=True, default=str).encode("utf-8"))
+
+
+# ------------------------------------------------------------
+# Project modules a stage's code depends on
+# ------------------------------------------------------------
+def _project_file(module: str) -> Path | None:
+    base = PROJECT_ROOT.joinpath(*module.split("."))
+    for candidate in (base.with_suffix(".py"), base / "__init__.py"):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _imported_files(source: Path) -> set[Path]:
+    """Project files imported by `source` (absolute imports only, as the project uses)."""
+    found = set()
+    for node in ast.walk(ast.parse(source.read_bytes())):
+        if isinstance(node, ast.Import):
+            modules = [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # "from helpers import sheet_grid" imports a module, "from x import f" a name
+            modules = [node.module] + [f"{node.module}.{a.name}" for a in node.names]
+        else:
+            continue
+        found |= {f for f in map(_project_file, modules) if f is not None}
+    return found
+
+
+def with_imports(sources) -> set[Path]:
+    """`sources` plus every project file they import, transitively."""
+    seen, todo = set(), [Path(s).resolve() for s in sources]
+    while todo:
+        source = todo.pop()
+        if source in seen or not source.is_file():
+            continue
+        seen.add(source)
+        todo.extend(_imported_files(source) - seen)
+    return seen
+
+
+def _referenced_files(func) -> set[Path]:
+    """Project files of the modules/objects a function's body refers to (e.g. main.py's load_csv -> csv_loader)."""
+    found = set()
+    code = getattr(func, "__code__", None)
+    for name in code.co_names if code is not None else ():
+        module = inspect.getmodule(func.__globals__.get(name))
+        path = getattr(module, "__file__", None)
+        if path and Path(path).resolve().is_relative_to(PROJECT_ROOT):
+            found.add(Path(path).resolve())
+    return found
+
+
+class BuildManifest:
+    """Content-hash manifest stored in the project SQLite database."""
+
+    def __init__(self, db_path: str, run_id: str | None = None):
+        self.db_path = db_path
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS _pipeline_runs (
+                    run_id TEXT, stage TEXT, status TEXT, fingerprint TEXT,
+                    code_hash TEXT, inputs_hash TEXT, outputs TEXT,
+                    started_at TEXT, elapsed REAL
+                );
+                CREATE INDEX IF NOT EXISTS ix_pipeline_runs_stage ON _pipeline_runs(stage, status);
+                CREATE TABLE IF NOT EXISTS _pipeline_tables (
+                    table_name TEXT PRIMARY KEY, hash TEXT, stage TEXT, updated_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS _pipeline_file_hashes (
+                    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT
+                );
+            """)
+
+    def _connect(self):
+        # Stages may be writing to the same database; wait instead of failing
+        return sqlite3.connect(self.db_path, timeout=120)
+
+    # --------------------------------------------------------
+    # Resource fingerprints
+    # --------------------------------------------------------
+    def file_hash(self, conn, path: Path) -> str:
+        """SHA-256 of a file, reusing the cached value while size and mtime are unchanged."""
+        st = path.stat()
+        key = path.as_posix()
+        row = conn.execute(
+            "SELECT size, mtime_ns, sha256 FROM _pipeline_file_hashes WHERE path = ?", (key,)
+        ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        conn.execute(
+            "INSERT OR REPLACE INTO _pipeline_file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (key, st.st_size, st.st_mtime_ns, digest),
+        )
+        return digest
+
+    def table_content_hash(self, conn, table: str) -> str:
+        """Hash of a table/view definition plus all of its rows."""
+        row = conn.execute(
+            "SELECT type, sql FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')", (table,)
+        ).fetchone()
+        if row is None:
+            return "missing"
+        h = hashlib.sha256(repr(row).encode("utf-8"))
+        if row[0] == "table":
+            cur = conn.execute(f'SELECT * FROM "{table}"')
+            while True:
+                rows = cur.fetchmany(10000)
+                if not rows:
+                    break
+                h.update(repr(rows).encode("utf-8"))
+        return h.hexdigest()
+
+    def table_hash(self, conn, table: str) -> str:
+        """Lineage hash recorded by the stage that last wrote the table (content hash if untracked)."""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')", (table,)
+        ).fetchone()
+        if not exists:
+            return "missing"
+        row = conn.execute("SELECT hash FROM _pipeline_tables WHERE table_name = ?", (table,)).fetchone()
+        return row[0] if row else self.table_content_hash(conn, table)
+
+    def resource_hash(self, conn, resource: str) -> str:
+        """Fingerprint a declared resource: table, glob, directory or file."""
+        if resource.startswith(TABLE_PREFIX):
+            return self.table_hash(conn, resource[len(TABLE_PREFIX):])
+
+        if any(ch in resource for ch in "*?["):
+            files = sorted(p for p in Path(".").glob(resource) if p.is_file())
+            return _sha256_json({p.as_posix(): self.file_hash(conn, p) for p in files})
+
+        path = Path(resource)
+        if resource.endswith("/") or path.is_dir():
+            # Large directories (PDF archives): names, sizes and mtimes only
+            if not path.exists():
+                return "missing"
+            listing = sorted(
+                (p.relative_to(path).as_posix(), p.stat().st_size, p.stat().st_mtime_ns)
+                for p in path.rglob("*") if p.is_file()
+            )
+            return _sha256_json(listing)
+
+        if not path.exists():
+            return "missing"
+        return self.file_hash(conn, path)
+
+    def code_hash(self, conn, stage: dict) -> str:
+        """
+        Hash of the code a stage runs: the file defining its function, the project
+        modules that function refers to and the stage script (kwargs["path"]), plus
+        every project module those import.
+        """
+        func = stage["func"]
+        try:
+            own = Path(inspect.getsourcefile(func)).resolve()
+            # The defining file itself is not followed: main.py imports every loader
+            sources = _referenced_files(func) - {own}
+            if stage.get("kwargs", {}).get("path"):
+                sources.add(Path(stage["kwargs"]["path"]))
+            files = {own} | with_imports(sources)
+            return _sha256_json({p.as_posix(): self.file_hash(conn, p) for p in sorted(files)})
+        except (TypeError, OSError, SyntaxError):
+            return "unknown"
+
+    # --------------------------------------------------------
+    # Stage state
+    # --------------------------------------------------------
+    def fingerprint(self, stage: dict) -> dict:
+        """Compute code, input and overall fingerprints for a stage."""
+        with self._connect() as conn:
+            code = self.code_hash(conn, stage)
+            inputs = {r: self.resource_hash(conn, r) for r in stage.get("inputs", [])}
+        kwargs = {k: v for k, v in stage.get("kwargs", {}).items() if k != "silent"}
+        inputs_hash = _sha256_json(inputs)
+        return {
+            "code_hash": code,
+            "inputs_hash": inputs_hash,
+            "fingerprint": _sha256_json({"code": code, "inputs": inputs_hash, "kwargs": kwargs}),
+        }
+
+    def outputs(self, stage: dict) -> dict:
+        with self._connect() as conn:
+            return {r: self.resource_hash(conn, r) for r in stage.get("outputs", [])}
+
+    def is_fresh(self, stage: dict, fp: dict) -> bool:
+        """True if the last successful run had the same fingerprint and outputs are unchanged."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fingerprint, outputs FROM _pipeline_runs "
+                "WHERE stage = ? AND status = 'success' ORDER BY rowid DESC LIMIT 1",
+                (stage["name"],),
+            ).fetchone()
+        if row is None or row[0] != fp["fingerprint"]:
+            return False
+        recorded = json.loads(row[1] or "{}")
+        current = self.outputs(stage)
+        if any(h == "missing" for h in current.values()):
+            return False
+        return recorded == current
+
+    def record(self, stage: dict, fp: dict | None, status: str, elapsed: float):
+        """Store a stage execution; on success also stamp lineage for written tables."""
+        fp = fp or {"fingerprint": None, "code_hash": None, "inputs_hash": None}
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._connect() as conn:
+            if status == "success":
+                for resource in stage.get("outputs", []):
+                    # A table the stage also reads is updated in place: its lineage stays with the
+                    # stage that built it, otherwise the two would keep invalidating each other
+                    if not resource.startswith(TABLE_PREFIX) or resource in stage.get("inputs", []):
+                        continue
+                    table = resource[len(TABLE_PREFIX):]
+                    # Always-run stages (remote data) get a content hash; others inherit their fingerprint
+                    lineage = self.table_content_hash(conn, table) if stage.get("always_run") else fp["fingerprint"]
+                    conn.execute(
+                        "INSERT OR REPLACE INTO _pipeline_tables (table_name, hash, stage, updated_at) VALUES (?, ?, ?, ?)",
+                        (table, lineage, stage["name"], now),
+                    )
+            outputs = {r: self.resource_hash(conn, r) for r in stage.get("outputs", [])} if status == "success" else {}
+            conn.execute(
+                "INSERT INTO _pipeline_runs (run_id, stage, status, fingerprint, code_hash, inputs_hash, outputs, started_at, elapsed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.run_id, stage["name"], status, fp["fingerprint"], fp["code_hash"], fp["inputs_hash"],
+                 json.dumps(outputs, sort_keys=True), now, elapsed),
+            )
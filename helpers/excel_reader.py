@@ -0,0 +1,45 @@
+# ============================================================
+# helpers/excel_reader.py
+#
+# One entry point for reading Excel workbooks:
+# - engines are tried in EXCEL_ENGINES order (default: calamine, then
+#   openpyxl, then xlrd), skipping any that are not installed
+# - python-calamine (Rust) reads both .xls and .xlsx; openpyxl (.xlsx) and
+#   xlrd (.xls) remain as fallbacks
+# Benchmark the engines on the downloaded workbooks with
+#   python testing/benchmark_excel_engines.py
+# ============================================================
+
+import importlib.util
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# Engine name (as pandas knows it) -> module that provides it
+ENGINE_MODULES = {"calamine": "python_calamine", "openpyxl": "openpyxl", "xlrd": "xlrd"}
+ENGINES = [e.strip() for e in os.getenv("EXCEL_ENGINES", "calamine,openpyxl,xlrd").split(",") if e.strip()]
+
+
+def available_engines(engines=None) -> list[str]:
+    """The engines of `engines` (default ENGINES) that are installed, in order."""
+    return [e for e in (engines or ENGINES)
+            if e in ENGINE_MODULES and importlib.util.find_spec(ENGINE_MODULES[e]) is not None]
+
+
+def read_excel(path, sheet_name=0, header=None, engines=None, **kwargs):
+    """
+    pd.read_excel() with the first engine that can read `path`. Same arguments
+    (header defaults to None: the raw cell grid); raises the last engine's error
+    if none of them can.
+    """
+    engines = available_engines(engines)
+    if not engines:
+        raise ImportError(f"No Excel engine installed (tried {', '.join(ENGINES)})")
+    error = None
+    for engine in engines:
+        try:
+            return pd.read_excel(Path(path), sheet_name=sheet_name, header=header, engine=engine, **kwargs)
+        except Exception as e:
+            error = e
+    raise error
@@ -0,0 +1,138 @@
+# ============================================================
+# helpers/fixture_archive.py
+#
+# Recorded HTTP responses for offline runs and load tests:
+# - <root>/index.jsonl : one line per response (method, url, status, headers, body)
+# - <root>/bodies/     : response bodies keyed by SHA-256 (stored once)
+#
+# helpers/http_client.py records into an archive when HTTP_RECORD_DIR is set;
+# testing/hkex_replay_server.py serves one back.
+# ============================================================
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Query parameters that change between runs (e.g. toDate defaults to today)
+VOLATILE_PARAMS = {"toDate", "_"}
+# Headers worth replaying (validators for conditional GETs, redirect targets)
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Location")
+# Responses worth replaying: transient errors and 304s are not recorded
+RECORDED_STATUSES = {200, 301, 302, 303, 307, 308, 404, 410}
+
+
+def fixture_key(method: str, url: str) -> tuple[str, str, tuple]:
+    """(METHOD, host/path, sorted stable query params) for a full URL."""
+    parts = urlsplit(url)
+    params = tuple(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                          if k not in VOLATILE_PARAMS))
+    return method.upper(), f"{parts.netloc}{parts.path}", params
+
+
+class FixtureArchive:
+    """Append-only response archive in directory `root`."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.bodies = self.root / "bodies"
+        self.index = self.root / "index.jsonl"
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, dict] | None = None
+
+    # --------------------------------------------------------
+    # Recording
+    # --------------------------------------------------------
+    def _store_body(self, body: bytes | None = None, path=None) -> str:
+        self.bodies.mkdir(parents=True, exist_ok=True)
+        if path is not None:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            sha = h.hexdigest()
+        else:
+            sha = hashlib.sha256(body).hexdigest()
+        target = self.bodies / sha
+        if not target.exists():
+            fd, tmp = tempfile.mkstemp(dir=self.bodies, suffix=".tmp")
+            with os.fdopen(fd, "wb") as out:
+                if path is not None:
+                    with open(path, "rb") as f:
+                        shutil.copyfileobj(f, out)
+                else:
+                    out.write(body)
+            os.replace(tmp, target)
+        return sha
+
+    def record(self, method: str, url: str, status: int, headers, body: bytes | None = None, path=None):
+        """Add a response (body as bytes, or the file at `path` for streamed downloads)."""
+        if status not in RECORDED_STATUSES:
+            return
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "headers": {k: headers[k] for k in KEPT_HEADERS if k in headers},
+            "body": self._store_body(body or b"", path) if path is not None or body else None,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.index, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            if self._entries is not None:
+                self._entries[fixture_key(entry["method"], url)] = entry
+
+    # --------------------------------------------------------
+    # Replay
+    # --------------------------------------------------------
+    def entries(self) -> dict[tuple, dict]:
+        """Latest entry per fixture key."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = {}
+                if self.index.exists():
+                    with open(self.index, "r", encoding="utf-8") as f:
+                        for line in f:
+                            if line.strip():
+                                entry = json.loads(line)
+                                self._entries[fixture_key(entry["method"], entry["url"])] = entry
+            return self._entries
+
+    def match(self, method: str, url: str) -> dict | None:
+        """
+        Entry for a request: exact match on method, host/path and stable query
+        params, else the entry on the same host/path sharing the most params.
+        """
+        entries = self.entries()
+        key = fixture_key(method, url)
+        if key in entries:
+            return entries[key]
+        wanted = set(key[2])
+        best, best_score = None, -1
+        for (m, path, params), entry in entries.items():
+            if m == key[0] and path == key[1]:
+                score = len(wanted & set(params))
+                if score > best_score:
+                    best, best_score = entry, score
+        return best
+
+    def body_path(self, entry: dict) -> Path | None:
+        return self.bodies / entry["body"] if entry.get("body") else None
+
+    def __len__(self):
+        return len(self.entries())
+
+
+def query_url(url: str, params: dict | None) -> str:
+    """`url` with `params` appended the way requests sends them."""
+    if not params:
+        return url
+    sep = "&" if urlsplit(url).query else "?"
+    return url + sep + urlencode(params)
@@ -0,0 +1,410 @@
+# ============================================================
+# helpers/http_client.py
+#
+# Shared HTTP client for all HKEX downloaders:
+# - One requests.Session per process (keep-alive connection pools)
+# - Pools sized to the caller's worker count via configure()
+# - gzip/deflate (and br when brotli is installed) accept-encoding
+# - Centralized retry with exponential backoff (honours Retry-After)
+# - Per-host circuit breaker and per-host concurrency cap
+# - download(): streamed, resumable (HTTP Range + If-Range), atomic file downloads
+# - fetch_if_modified(): conditional GET against a .metadata sidecar
+# - Base-URL overrides (HTTP_REPLAY_URL / HTTP_BASE_URLS) and response
+#   recording (HTTP_RECORD_DIR) for testing/hkex_replay_server.py
+# ============================================================
+
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from helpers.fixture_archive import FixtureArchive, query_url
+
+try:  # urllib3 only decodes br when a brotli package is available
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+DEFAULT_POOL_SIZE = 10
+MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "16"))  # concurrent requests per host
+ATTEMPTS = 3  # tries per request (first attempt included)
+BACKOFF_BASE = 1.0  # seconds; doubled each attempt plus jitter
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BREAKER_THRESHOLD = 5  # consecutive failures before a host is cut off
+BREAKER_COOLDOWN = 60  # seconds a tripped host is cut off
+CHUNK_SIZE = 256 * 1024  # streamed download chunk size (bytes)
+PART_SUFFIX = ".part"  # in-progress downloads; renamed into place when complete
+META_SUFFIX = ".metadata"  # ETag / Last-Modified sidecar next to a downloaded file
+# Send every host to a replay server: https://www1.hkexnews.hk/x -> <HTTP_REPLAY_URL>/www1.hkexnews.hk/x
+REPLAY_URL = os.getenv("HTTP_REPLAY_URL", "").rstrip("/")
+# Per-endpoint overrides, ";"-separated "original_base=replacement_base" pairs
+BASE_URLS = dict(pair.split("=", 1) for pair in os.getenv("HTTP_BASE_URLS", "").split(";") if "=" in pair)
+RECORD_DIR = os.getenv("HTTP_RECORD_DIR")  # record responses into a fixture archive (helpers/fixture_archive.py)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling a host whose circuit breaker is open."""
+
+
+class IncompleteDownloadError(requests.exceptions.RequestException):
+    """Raised when a download ends before the advertised Content-Length."""
+
+
+# ------------------------------------------------------------
+# Shared state
+# ------------------------------------------------------------
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
+
+_host_lock = threading.Lock()
+_host_slots: dict[str, threading.BoundedSemaphore] = {}
+_host_failures: dict[str, int] = {}
+_host_open_until: dict[str, float] = {}
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def configure(pool_size: int | None = None):
+    """Make sure the shared pools hold at least `pool_size` connections per host."""
+    get_session(pool_size)
+
+
+def get_session(pool_size: int | None = None) -> requests.Session:
+    """Return the process-wide session, growing its pools if needed."""
+    global _session, _pool_size
+    wanted = max(pool_size or DEFAULT_POOL_SIZE, 1)
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        if wanted > _pool_size:
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=wanted)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _pool_size = wanted
+        return _session
+
+
+def _slot(host: str) -> threading.BoundedSemaphore:
+    with _host_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_slots[host]
+
+
+# ------------------------------------------------------------
+# Base-URL overrides and recording
+# ------------------------------------------------------------
+def rewrite_url(url: str) -> str:
+    """Apply HTTP_BASE_URLS (longest matching prefix first), then HTTP_REPLAY_URL."""
+    for base in sorted(BASE_URLS, key=len, reverse=True):
+        if url.startswith(base):
+            return BASE_URLS[base] + url[len(base):]
+    if REPLAY_URL:
+        parts = urlsplit(url)
+        return f"{REPLAY_URL}/{parts.netloc}{url[len(parts.scheme) + 3 + len(parts.netloc):]}"
+    return url
+
+
+def _get_recorder():
+    global _recorder
+    if not RECORD_DIR:
+        return None
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = FixtureArchive(RECORD_DIR)
+        return _recorder
+
+
+def _record(method: str, url: str, params, resp, path=None):
+    recorder = _get_recorder()
+    if recorder is None:
+        return
+    try:
+        if path is not None:
+            recorder.record(method, query_url(url, params), 200, resp.headers, path=path)
+        else:
+            recorder.record(method, query_url(url, params), resp.status_code, resp.headers, body=resp.content)
+    except OSError as e:
+        print(f"⚠️ Recording {url} failed: {e}")
+
+
+# ------------------------------------------------------------
+# Circuit breaker
+# ------------------------------------------------------------
+def _check_breaker(host: str):
+    with _host_lock:
+        until = _host_open_until.get(host, 0)
+    if until > time.time():
+        raise CircuitOpenError(f"circuit open for {host} ({until - time.time():.0f}s left)")
+
+
+def _record_result(host: str, ok: bool):
+    with _host_lock:
+        if ok:
+            _host_failures[host] = 0
+            _host_open_until.pop(host, None)
+            return
+        _host_failures[host] = _host_failures.get(host, 0) + 1
+        if _host_failures[host] >= BREAKER_THRESHOLD:
+            # Trip (or re-trip after a failed half-open probe)
+            _host_open_until[host] = time.time() + BREAKER_COOLDOWN
+            _host_failures[host] = BREAKER_THRESHOLD - 1
+
+
+def _backoff(attempt: int, resp=None) -> float:
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return BACKOFF_BASE * 2 ** attempt + random.random()
+
+
+# ------------------------------------------------------------
+# Requests
+# ------------------------------------------------------------
+def request(method: str, url: str, *, attempts: int = ATTEMPTS, retry_statuses=RETRY_STATUSES, metrics=None, **kwargs):
+    """
+    Send a request through the shared session.
+
+    Retries connection errors, timeouts and `retry_statuses` with backoff.
+    After the last attempt the final response is returned (callers check
+    status codes as before) or the last exception is raised.
+    metrics: optional StageMetrics; body size is added to bytes_downloaded
+    (streamed responses are counted by the caller).
+    """
+    host = urlsplit(url).netloc  # breaker and per-host cap follow the original host, even when replayed
+    target = rewrite_url(url)
+    session = get_session()
+    kwargs.setdefault("timeout", 30)
+
+    attempts = max(attempts, 1)
+    for attempt in range(attempts):
+        _check_breaker(host)
+        resp = None
+        try:
+            with _slot(host):
+                resp = session.request(method, target, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            _record_result(host, ok=False)
+            if attempt == attempts - 1:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+
+        if resp.status_code in retry_statuses:
+            if resp.status_code != 429:  # throttling means the host is up; don't trip the breaker
+                _record_result(host, ok=False)
+            if attempt < attempts - 1:
+                resp.close()
+                time.sleep(_backoff(attempt, resp))
+                continue
+        else:
+            _record_result(host, ok=True)
+
+        if metrics is not None and not kwargs.get("stream"):
+            metrics.add("bytes_downloaded", len(resp.content))
+        if RECORD_DIR and not kwargs.get("stream"):
+            _record(method, url, kwargs.get("params"), resp)
+        return resp
+
+
+def get(url: str, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def head(url: str, **kwargs):
+    kwargs.setdefault("allow_redirects", False)  # same default as requests.head
+    return request("HEAD", url, **kwargs)
+
+
+# ------------------------------------------------------------
+# File downloads
+# ------------------------------------------------------------
+def _range_total(resp) -> int | None:
+    """Total size from a Content-Range header ("bytes 0-99/1234" or "bytes */1234")."""
+    m = re.search(r"/(\d+)\s*$", resp.headers.get("Content-Range", ""))
+    return int(m.group(1)) if m else None
+
+
+def _part_validator(part_meta: Path) -> str | None:
+    """The ETag (strong only) or Last-Modified saved when `.part` was started."""
+    meta = load_metadata(part_meta)
+    etag = meta.get("ETag")
+    if etag and not etag.startswith("W/"):  # If-Range needs a strong validator
+        return etag
+    return meta.get("Last-Modified")
+
+
+def _download_once(url: str, dest: Path, part: Path, chunk_size: int, metrics, kwargs) -> int:
+    part_meta = part.with_name(part.name + META_SUFFIX)
+    offset = part.stat().st_size if part.exists() else 0
+    validator = _part_validator(part_meta) if offset else None
+    # Identity encoding so Content-Length and byte ranges refer to the file itself
+    headers = {**kwargs.pop("headers", {}), "Accept-Encoding": "identity"}
+    if validator:
+        # If-Range: the server sends the whole (new) file instead of a range
+        # when it changed since the partial file was started
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+
+    # One attempt per call: download() owns the retries
+    with request("GET", url, headers=headers, stream=True, attempts=1, **kwargs) as resp:
+        if resp.status_code == 416 and validator:
+            # The partial file may already hold the whole body
+            if _range_total(resp) == offset:
+                os.replace(part, dest)
+                part_meta.unlink(missing_ok=True)
+                return 0
+            part.unlink()
+            raise IncompleteDownloadError(f"stale partial download for {url}; restarting")
+        resp.raise_for_status()
+
+        if resp.status_code == 206 and validator:
+            mode, expected = "ab", _range_total(resp)
+        else:
+            # Fresh download, no validator to resume against, server ignored
+            # the Range header or the file changed: start over
+            mode, offset = "wb", 0
+            length = resp.headers.get("Content-Length")
+            expected = int(length) if length and length.isdigit() else None
+            save_metadata(part_meta, resp.headers)
+
+        fetched = 0
+        with part.open(mode) as f:
+            for chunk in resp.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                fetched += len(chunk)
+                if metrics is not None:
+                    metrics.add("bytes_downloaded", len(chunk))
+            f.flush()
+            os.fsync(f.fileno())
+
+    size = offset + fetched
+    if expected is not None and size != expected:
+        raise IncompleteDownloadError(f"{url}: got {size} of {expected} bytes")
+    os.replace(part, dest)
+    part_meta.unlink(missing_ok=True)
+    if RECORD_DIR:
+        _record("GET", url, kwargs.get("params"), resp, path=dest)
+    return fetched
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUSES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError, IncompleteDownloadError))
+
+
+def download(url: str, dest, *, attempts: int = ATTEMPTS, chunk_size: int = CHUNK_SIZE, metrics=None, **kwargs) -> int:
+    """
+    Stream `url` to `dest` without holding the body in memory.
+
+    Data goes to `<dest>.part` and is renamed into place only once its size
+    matches Content-Length, so `dest` never exists half-written. An existing
+    `.part` file (interrupted run or connection drop) is resumed with an HTTP
+    Range request, guarded by If-Range with the ETag / Last-Modified saved in
+    `<dest>.part.metadata` when it was started; a partial file without one is
+    downloaded again. This loop is the only retry layer (each try is a single
+    request): returns the number of bytes fetched, or raises the last error
+    if the file is still incomplete after `attempts` tries (the `.part` file
+    is kept for the next run).
+    """
+    dest = Path(dest)
+    part = dest.with_name(dest.name + PART_SUFFIX)
+    kwargs.setdefault("timeout", 60)
+    attempts = max(attempts, 1)
+    fetched = 0
+    for attempt in range(attempts):
+        before = part.stat().st_size if part.exists() else 0
+        try:
+            return fetched + _download_once(url, dest, part, chunk_size, metrics, dict(kwargs))
+        except requests.exceptions.RequestException as e:
+            fetched += max((part.stat().st_size if part.exists() else 0) - before, 0)
+            if attempt == attempts - 1 or not _retryable(e):
+                raise
+            time.sleep(_backoff(attempt, getattr(e, "response", None)))
+
+
+# ------------------------------------------------------------
+# Conditional GET (.metadata sidecars)
+# ------------------------------------------------------------
+def load_metadata(path) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_metadata(path, headers) -> dict:
+    meta = {k: headers[k] for k in ("ETag", "Last-Modified") if k in headers}
+    with open(path, "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def fetch_if_modified(url: str, dest, *, metrics=None, **kwargs) -> str:
+    """
+    Refresh `dest` from `url` only if the server copy changed.
+
+    Validators come from `<dest>.metadata` (ETag / Last-Modified, as saved by
+    the previous download); files downloaded before sidecars existed use their
+    mtime for If-Modified-Since. Returns:
+      "not_modified" : 304, `dest` left as is
+      "downloaded"   : `dest` replaced atomically and the sidecar updated
+      "missing"      : 404/410
+      "redirected"   : a redirect when allow_redirects=False
+    Other HTTP errors raise requests.HTTPError.
+    """
+    dest = Path(dest)
+    meta_path = dest.with_name(dest.name + META_SUFFIX)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if dest.exists():
+        meta = load_metadata(meta_path)
+        if meta.get("ETag"):
+            headers["If-None-Match"] = meta["ETag"]
+        headers["If-Modified-Since"] = meta.get("Last-Modified") or formatdate(dest.stat().st_mtime, usegmt=True)
+
+    resp = request("GET", url, headers=headers, metrics=metrics, **kwargs)
+    if resp.status_code == 304:
+        return "not_modified"
+    if resp.status_code in (404, 410):
+        return "missing"
+    if resp.is_redirect:
+        return "redirected"
+    resp.raise_for_status()
+
+    # Unique temp name: concurrent stages may refresh the same resource
+    fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=dest.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(resp.content)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    save_metadata(meta_path, resp.headers)
+    return "downloaded"
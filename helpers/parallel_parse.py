@@ -0,0 +1,113 @@
+# ============================================================
+# helpers/parallel_parse.py
+#
+# Per-file parsing for the bronze modules (one workbook per listing year):
+# - files whose cached result is still valid are not parsed again; the key is
+#   the file's (mtime, size) plus a hash of the parser's module source and the
+#   project modules it imports, and results are pickled under CACHE_DIR/<name>/
+# - the rest are parsed in a process pool (BRONZE_WORKERS, default: half the
+#   cores, as the Main Board and GEM stages parse at the same time)
+# - results come back in the order of `files`, so callers concatenate once
+#   and get the same output however the work was scheduled
+#
+# The parser is passed as "package.module:function" so worker processes can
+# import it (stages run their scripts as __main__, which workers cannot).
+# ============================================================
+
+import hashlib
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from helpers.build_manifest import PROJECT_ROOT, with_imports
+
+CACHE_DIR = Path(os.getenv("BRONZE_CACHE_DIR", "data/cache/bronze"))
+# Per call; the two bronze stages run concurrently, so together they use every core
+MAX_WORKERS = int(os.getenv("BRONZE_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // 2)
+
+
+def _resolve(target: str):
+    module, _, func = target.partition(":")
+    return getattr(importlib.import_module(module), func)
+
+
+def _code_hash(target: str) -> str:
+    """Hash of the parser's module and the project modules it imports (sheet_grid, table_regions, ...)."""
+    origin = importlib.util.find_spec(target.partition(":")[0]).origin
+    h = hashlib.sha256()
+    for source in sorted(with_imports([origin])):
+        h.update(source.relative_to(PROJECT_ROOT).as_posix().encode("utf-8"))
+        h.update(source.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def _parse(target: str, path: str):
+    """Worker entry point: (result, None) or (None, error message)."""
+    try:
+        return _resolve(target)(Path(path)), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _cache_path(name: str, path: Path) -> Path:
+    return CACHE_DIR / name / f"{path.name}.pkl"
+
+
+def _read_cached(name: str, path: Path, key: tuple):
+    try:
+        with open(_cache_path(name, path), "rb") as f:
+            cached_key, result = pickle.load(f)
+    except Exception:  # missing, partial or unreadable: parse again
+        return None
+    return result if cached_key == key else None
+
+
+def _write_cached(name: str, path: Path, key: tuple, result):
+    target = _cache_path(name, path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump((key, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+
+
+def parse_files(files, target: str, name: str, max_workers: int = MAX_WORKERS) -> tuple[list, dict]:
+    """
+    Parse every file with the function at `target` ("package.module:function",
+    called with the file's Path). Returns (results, stats): results holds one
+    (path, result, error) per file in input order (result None when parsing
+    raised); stats counts "parsed", "cached" and "failed" files.
+    """
+    files = [Path(f) for f in files]
+    code = _code_hash(target)
+    keys = {f: (code, f.stat().st_mtime_ns, f.stat().st_size) for f in files}
+    done = {f: _read_cached(name, f, keys[f]) for f in files}
+    todo = [f for f in files if done[f] is None]
+    stats = {"parsed": 0, "cached": len(files) - len(todo), "failed": 0}
+    errors = {}
+
+    if todo:
+        workers = max(1, min(max_workers, len(todo)))
+        if workers == 1:
+            outcomes = [_parse(target, str(f)) for f in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                outcomes = list(pool.map(_parse, [target] * len(todo), [str(f) for f in todo]))
+        for f, (result, error) in zip(todo, outcomes):
+            if error is not None:
+                errors[f] = error
+                stats["failed"] += 1
+                continue
+            done[f] = result
+            stats["parsed"] += 1
+            try:
+                _write_cached(name, f, keys[f], result)
+            except OSError:
+                pass  # the cache is an optimization only
+
+    return [(f, done[f], errors.get(f)) for f in files], stats
@@ -0,0 +1,306 @@
+# ============================================================
+# helpers/pipeline.py
+#
+# Dependency-graph stage runner used by main.py:
+# - Every stage declares the files and tables it reads and writes
+# - A stage waits only for earlier stages it conflicts with
+# - Ready stages run concurrently: threads for network stages,
+#   processes for pandas/PDF stages
+# - Stages are only admitted while their memory budgets fit
+# - With a BuildManifest, stages whose inputs/code are unchanged are skipped
+# - With a RunLedger, every stage's telemetry is persisted
+# - Thread stages hand tables over in memory (helpers/artifacts.py): their
+#   thread dependents start as soon as they return, while process
+#   dependents and the manifest wait until the tables are written; a table
+#   is dropped from memory once no stage left to run reads it
+# ============================================================
+
+import multiprocessing
+import runpy
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext, redirect_stderr, redirect_stdout
+from io import StringIO
+
+from helpers import artifacts
+from helpers.telemetry import bytes_written, measure
+
+# ------------------------------------------------------------
+# Defaults
+# ------------------------------------------------------------
+DEFAULT_MAX_THREADS = 8
+DEFAULT_MAX_PROCESSES = 4
+DEFAULT_MEMORY_BUDGET_MB = 4096
+DEFAULT_STAGE_MEMORY_MB = 256
+
+
+# ------------------------------------------------------------
+# Stage callables
+# ------------------------------------------------------------
+def run_script(path: str, silent: bool = False):
+    """
+    Run a project script as __main__ (used for thread and process stages).
+    Returns the script's METRICS counters (helpers.telemetry.StageMetrics) if it has any.
+    """
+    if silent:
+        with StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+            module_globals = runpy.run_path(path, run_name="__main__")
+    else:
+        module_globals = runpy.run_path(path, run_name="__main__")
+    metrics = module_globals.get("METRICS")
+    return metrics.as_dict() if metrics is not None else {}
+
+
+def _call(func, kwargs, whole_process=False):
+    """Run a stage callable and return (value, telemetry)."""
+    value, metrics = measure(func, kwargs, whole_process=whole_process)
+    if whole_process:
+        artifacts.flush()  # the worker exits after this stage: its tables must be on disk
+    if func is run_script:
+        metrics.update(value)
+        value = None
+    elif isinstance(value, int) and not isinstance(value, bool):
+        # Loader stages return the number of rows they wrote
+        metrics.setdefault("rows_out", value)
+    return value, metrics
+
+
+# ------------------------------------------------------------
+# Graph construction
+# ------------------------------------------------------------
+def build_dependencies(stages: list[dict]) -> dict[str, set[str]]:
+    """
+    Derive stage dependencies from declared inputs/outputs.
+
+    A stage depends on every EARLIER stage that:
+      - writes something it reads or writes (read-after-write, write-after-write)
+      - reads something it writes (write-after-read)
+    Declaration order therefore breaks ties, and the graph is always acyclic.
+    """
+    deps: dict[str, set[str]] = {}
+    names = set()
+    for i, stage in enumerate(stages):
+        name = stage["name"]
+        if name in names:
+            raise ValueError(f"Duplicate stage name: {name}")
+        names.add(name)
+
+        reads = set(stage.get("inputs", []))
+        writes = set(stage.get("outputs", []))
+        deps[name] = set()
+        for earlier in stages[:i]:
+            e_reads = set(earlier.get("inputs", []))
+            e_writes = set(earlier.get("outputs", []))
+            if e_writes & (reads | writes) or e_reads & writes:
+                deps[name].add(earlier["name"])
+    return deps
+
+
+def critical_path(stages: list[dict], deps: dict[str, set[str]], elapsed: dict[str, float]) -> tuple[list[str], float]:
+    """Longest chain of dependent stages by measured wall time."""
+    best: dict[str, tuple[float, list[str]]] = {}
+    for stage in stages:  # declaration order is a topological order
+        name = stage["name"]
+        prev = max((best[d] for d in deps[name]), default=(0.0, []), key=lambda x: x[0])
+        best[name] = (prev[0] + elapsed.get(name, 0.0), prev[1] + [name])
+    if not best:
+        return [], 0.0
+    total, path = max(best.values(), key=lambda x: x[0])
+    return path, total
+
+
+# ------------------------------------------------------------
+# Scheduler
+# ------------------------------------------------------------
+def _log(msg: str):
+    # Always write to the real stdout so SILENT_MODE only hides stage output
+    print(msg, file=sys.__stdout__, flush=True)
+
+
+def run_pipeline(
+    stages: list[dict],
+    *,
+    max_threads: int = DEFAULT_MAX_THREADS,
+    max_processes: int = DEFAULT_MAX_PROCESSES,
+    memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB,
+    silent: bool = False,
+    manifest=None,
+    force: bool = False,
+    ledger=None,
+    workflow: str = "main",
+) -> list[dict]:
+    """
+    Run stages as soon as their dependencies have finished.
+
+    Stage dict keys:
+      name       : unique label
+      func       : callable (must be importable for process stages)
+      kwargs     : keyword arguments for func
+      inputs     : files/globs/"table:<name>" the stage reads
+      outputs    : files/globs/"table:<name>" the stage writes
+      executor   : "thread" (network/IO) or "process" (pandas/PDF)
+      memory_mb  : memory budget reserved while the stage runs
+      locks      : exclusive resources (e.g. "sqlite") held while running
+      always_run : never skip via the manifest (remote sources: downloads, WRDS)
+
+    manifest: optional BuildManifest; unchanged stages are skipped unless force=True
+    (every execution is still recorded so the next run can skip).
+    ledger: optional RunLedger; wall/CPU time, peak RSS, rows and bytes of every
+    stage are stored under `workflow`.
+
+    Failed stages do not block dependents (same as the sequential run,
+    which simply carried on with whatever files were on disk).
+
+    A stage that returned but whose published tables are still being written
+    is "handed off": thread stages (same process, helpers/artifacts.py) may
+    start after it, process stages wait. It is recorded in the ledger and
+    manifest once its writes and all its dependencies have finished.
+
+    Returns one result dict per stage in declaration order.
+    """
+    deps = build_dependencies(stages)
+    by_name = {s["name"]: s for s in stages}
+    pending = list(stages)
+    finished: set[str] = set()
+    handed_off: set[str] = set()  # returned, not recorded yet
+    persisting = {}  # flush future -> stage name
+    held_locks: set[str] = set()
+    memory_in_use = 0
+    running = {}
+    results: dict[str, dict] = {}
+    started: dict[str, float] = {}
+    fingerprints: dict[str, dict] = {}
+    readers: dict[str, set[str]] = {}  # resource -> stages that read it
+    for stage in stages:
+        for resource in stage.get("inputs", []):
+            readers.setdefault(resource, set()).add(stage["name"])
+
+    thread_pool = ThreadPoolExecutor(max_workers=max_threads)
+    # One stage per worker process so peak RSS and CPU time are per stage
+    process_pool = ProcessPoolExecutor(
+        max_workers=max_processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    )
+
+    quiet = StringIO() if silent else None
+    try:
+        with redirect_stdout(quiet) if silent else nullcontext(), redirect_stderr(quiet) if silent else nullcontext():
+            while pending or running or persisting:
+                # Launch every stage whose dependencies, locks and memory allow it
+                for stage in list(pending):
+                    name = stage["name"]
+                    in_process = stage.get("executor") == "process"
+                    waiting = deps[name] - finished
+                    if waiting and (in_process or not waiting <= handed_off):
+                        continue
+                    locks = set(stage.get("locks", []))
+                    if locks & held_locks:
+                        continue
+                    mem = stage.get("memory_mb", DEFAULT_STAGE_MEMORY_MB)
+                    if running and memory_in_use + mem > memory_budget_mb:
+                        continue
+
+                    # Inputs of handed-off dependencies may not be on disk yet: fingerprint when recording
+                    if manifest is not None and not waiting:
+                        fp = manifest.fingerprint(stage)
+                        fingerprints[name] = fp
+                        if not force and not stage.get("always_run") and manifest.is_fresh(stage, fp):
+                            pending.remove(stage)
+                            finished.add(name)
+                            manifest.record(stage, fp, "skipped", 0.0)
+                            results[name] = {"name": name, "ok": True, "skipped": True, "value": None, "error": None,
+                                             "elapsed": 0.0, "metrics": {}}
+                            if ledger is not None:
+                                ledger.record(workflow, name, "skipped", {})
+                            _log(f"⏩ Skipped (unchanged): {name}")
+                            continue
+
+                    kwargs = dict(stage.get("kwargs", {}))
+                    # Thread stages are silenced with the whole process (a per-thread
+                    # redirect of sys.stdout would race with other thread stages)
+                    if stage.get("func") is run_script and in_process:
+                        kwargs.setdefault("silent", silent)
+                    pool = process_pool if in_process else thread_pool
+                    future = pool.submit(_call, stage["func"], kwargs, in_process)
+
+                    running[future] = name
+                    started[name] = time.time()
+                    held_locks |= locks
+                    memory_in_use += mem
+                    pending.remove(stage)
+                    _log(f"▶️ {name}")
+
+                if not running and not persisting:
+                    break
+
+                done, _ = wait(list(running) + list(persisting), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in persisting:
+                        name = persisting.pop(future)
+                        try:
+                            future.result()
+                        except BaseException as e:
+                            results[name].update(ok=False, error=e)
+                            _log(f"❌ Failed to write outputs: {name} → {e}")
+                        continue
+
+                    name = running.pop(future)
+                    stage = by_name[name]
+                    elapsed = time.time() - started[name]
+                    held_locks -= set(stage.get("locks", []))
+                    memory_in_use -= stage.get("memory_mb", DEFAULT_STAGE_MEMORY_MB)
+                    handed_off.add(name)
+                    try:
+                        value, metrics = future.result()
+                        results[name] = {"name": name, "ok": True, "skipped": False, "value": value, "error": None,
+                                         "elapsed": elapsed, "metrics": metrics}
+                        _log(f"✅ Done: {name} ({elapsed:.1f}s)")
+                    except BaseException as e:
+                        metrics = {"wall_s": elapsed}
+                        results[name] = {"name": name, "ok": False, "skipped": False, "value": None, "error": e,
+                                         "elapsed": elapsed, "metrics": metrics}
+                        _log(f"❌ Failed: {name} ({elapsed:.1f}s) → {e}")
+                    outputs = stage.get("outputs", [])
+                    if artifacts.pending(outputs):
+                        persisting[thread_pool.submit(artifacts.flush, outputs)] = name
+                    # In-memory tables this stage read or wrote that no stage left to run reads
+                    active = {s["name"] for s in pending} | set(running.values())
+                    artifacts.release([r for r in stage.get("inputs", []) + outputs
+                                       if not readers.get(r, set()) & active])
+
+                # Record stages whose outputs are written and whose dependencies are recorded
+                # (declaration order is a topological order: one pass settles chains)
+                for stage in stages:
+                    name = stage["name"]
+                    if name not in handed_off or name in persisting.values() or not deps[name] <= finished:
+                        continue
+                    handed_off.remove(name)
+                    finished.add(name)
+                    res = results[name]
+                    res["metrics"]["bytes_written"] = bytes_written(stage.get("outputs", []), started[name])
+                    status = "success" if res["ok"] else "failed"
+                    if ledger is not None:
+                        ledger.record(workflow, name, status, res["metrics"])
+                    if manifest is not None:
+                        if name not in fingerprints:
+                            fingerprints[name] = manifest.fingerprint(stage)
+                        manifest.record(stage, fingerprints[name], status, res["elapsed"])
+    finally:
+        thread_pool.shutdown(wait=True)
+        process_pool.shutdown(wait=True)
+
+    path, path_time = critical_path(stages, deps, {n: r["elapsed"] for n, r in results.items()})
+    if path:
+        _log(f"🧭 Critical path ({path_time:.1f}s): {' → '.join(path)}")
+
+    ordered = []
+    for stage in stages:
+        res = results.get(stage["name"])
+        if res is None:
+            res = {"name": stage["name"], "ok": False, "skipped": False, "value": None,
+                   "error": RuntimeError("not run"), "elapsed": 0.0, "metrics": {}}
+        res["group"] = stage.get("group", "")
+        ordered.append(res)
+    return ordered
@@ -0,0 +1,217 @@
+# ============================================================
+# helpers/press_store.py
+#
+# Press-release store in the SQLite DB (replaces one CSV per stock):
+# - press_releases : typed table, one row per (stock_id, news_id),
+#                    indexed on date_time / stock_code / year
+# - press_manifest : one row per stockId (last status, stored rows,
+#                    newest filing, rows added by the last run)
+# - PressWriter    : single writer thread; downloader workers submit
+#                    results through a queue, rows are committed in batches
+# ============================================================
+
+import csv
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+API_DATE_FORMAT = "%d/%m/%Y %H:%M"  # DATE_TIME as returned by titleSearchServlet
+DB_DATE_FORMAT = "%Y-%m-%d %H:%M"  # stored form (sorts as text)
+
+# API field -> column (everything except stock_id, news_id, date_time and year)
+TEXT_FIELDS = {
+    "STOCK_CODE": "stock_code",
+    "STOCK_NAME": "stock_name",
+    "TITLE": "title",
+    "LONG_TEXT": "long_text",
+    "SHORT_TEXT": "short_text",
+    "FILE_TYPE": "file_type",
+    "FILE_INFO": "file_info",
+    "FILE_LINK": "file_link",
+    "DOD_WEB_PATH": "dod_web_path",
+}
+COLUMNS = ("stock_id", "news_id", "date_time", "year", *TEXT_FIELDS.values())
+
+BATCH_ROWS = 5000  # rows per transaction
+FLUSH_INTERVAL = 2.0  # seconds a partial batch may wait for more results
+
+
+def _to_db_date(value):
+    try:
+        return datetime.strptime(str(value).strip(), API_DATE_FORMAT).strftime(DB_DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_record(stock_id: str, row: dict) -> tuple | None:
+    """API row -> table row (None if it has no usable NEWS_ID)."""
+    news_id = _to_int(row.get("NEWS_ID"))
+    if news_id is None:
+        return None
+    date_time = _to_db_date(row.get("DATE_TIME"))
+    texts = [row.get(field) for field in TEXT_FIELDS]
+    return (stock_id, news_id, date_time, int(date_time[:4]) if date_time else None,
+            *(None if v is None else str(v) for v in texts))
+
+
+class PressStore:
+    """press_releases + press_manifest tables in the SQLite DB at db_path."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        text_columns = ", ".join(f"{c} TEXT" for c in TEXT_FIELDS.values())
+        with self._connect() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS press_releases (
+                    stock_id TEXT NOT NULL, news_id INTEGER NOT NULL, date_time TEXT, year INTEGER,
+                    {text_columns},
+                    PRIMARY KEY (stock_id, news_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_press_releases_date ON press_releases(date_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_press_releases_stock_code ON press_releases(stock_code, date_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_press_releases_year ON press_releases(year)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS press_manifest (
+                    stock_id TEXT PRIMARY KEY, status TEXT, row_count INTEGER,
+                    newest_date_time TEXT, rows_added INTEGER, updated_at TEXT
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=120)
+
+    def newest_dates(self) -> dict[str, str]:
+        """stockId -> newest stored DATE_TIME ("YYYY-MM-DD HH:MM") for stocks with rows."""
+        with self._connect() as conn:
+            return dict(conn.execute(
+                "SELECT stock_id, newest_date_time FROM press_manifest WHERE row_count > 0 AND newest_date_time IS NOT NULL"
+            ))
+
+    def monthly_counts(self) -> dict[str, dict[str, int]]:
+        """stockId -> {"YYYY-MM": stored rows} (filings per month of each stock's history)."""
+        counts: dict[str, dict[str, int]] = {}
+        with self._connect() as conn:
+            for stock_id, month, n in conn.execute(
+                "SELECT stock_id, substr(date_time, 1, 7), COUNT(*) FROM press_releases "
+                "WHERE date_time IS NOT NULL GROUP BY 1, 2"
+            ):
+                counts.setdefault(stock_id, {})[month] = n
+        return counts
+
+    def stored_ids(self) -> set[str]:
+        """stockIds that have at least one stored press release."""
+        with self._connect() as conn:
+            return {r[0] for r in conn.execute("SELECT stock_id FROM press_manifest WHERE row_count > 0")}
+
+    def write_batch(self, results: list[tuple[str, list | None]]) -> list[dict]:
+        """
+        Store (stock_id, rows) results in one transaction; rows=None marks a failed fetch.
+        Rows already stored (same stock_id and NEWS_ID) are ignored.
+        Returns one summary record per result: stock_id, status (saved/skipped/failed), row_count.
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        placeholders = ", ".join("?" * len(COLUMNS))
+        summary = []
+        with self._connect() as conn:
+            for stock_id, rows in results:
+                if rows is None:
+                    conn.execute(
+                        "INSERT INTO press_manifest (stock_id, status, row_count, rows_added, updated_at) "
+                        "VALUES (?, 'failed', 0, 0, ?) "
+                        "ON CONFLICT(stock_id) DO UPDATE SET status = 'failed', rows_added = 0, updated_at = excluded.updated_at",
+                        (stock_id, now),
+                    )
+                    summary.append({"stock_id": stock_id, "status": "failed", "row_count": 0})
+                    continue
+                records = [r for r in (to_record(stock_id, row) for row in rows) if r is not None]
+                before = conn.total_changes
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO press_releases ({', '.join(COLUMNS)}) VALUES ({placeholders})", records
+                )
+                added = conn.total_changes - before
+                count, newest = conn.execute(
+                    "SELECT COUNT(*), MAX(date_time) FROM press_releases WHERE stock_id = ?", (stock_id,)
+                ).fetchone()
+                status = "saved" if added else "skipped"
+                conn.execute(
+                    "INSERT OR REPLACE INTO press_manifest VALUES (?, ?, ?, ?, ?, ?)",
+                    (stock_id, status, count, newest, added, now),
+                )
+                summary.append({"stock_id": stock_id, "status": status, "row_count": added})
+        return summary
+
+    def import_csv(self, stock_id: str, csv_file) -> int:
+        """Load a legacy press_releases_<stockId>.csv; returns rows added."""
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        return self.write_batch([(stock_id, rows)])[0]["row_count"]
+
+
+class PressWriter:
+    """
+    Single writer thread for a PressStore. Workers call submit(); results are
+    committed in batches of up to BATCH_ROWS rows. close() flushes and returns
+    the summary records of everything submitted.
+    """
+
+    def __init__(self, store: PressStore, on_result=None):
+        self.store = store
+        self.on_result = on_result  # called with each summary record (from the writer thread)
+        self.summary: list[dict] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=1000)
+        self._thread = threading.Thread(target=self._run, name="press-writer", daemon=True)
+        self._error: BaseException | None = None
+        self._thread.start()
+
+    def submit(self, stock_id: str, rows: list | None):
+        if self._error is not None:
+            raise RuntimeError(f"press writer stopped: {self._error}")
+        self._queue.put((stock_id, rows))
+
+    def close(self) -> list[dict]:
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.summary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        batch, batch_rows, done = [], 0, False
+        while not done:
+            try:
+                item = self._queue.get(timeout=FLUSH_INTERVAL if batch else None)
+            except queue.Empty:
+                item = ...  # timeout: flush what we have
+            if item is None:
+                done = True
+            elif item is not ...:
+                batch.append(item)
+                batch_rows += len(item[1] or ())
+                if batch_rows < BATCH_ROWS:
+                    continue
+            if batch and self._error is None:
+                try:
+                    for record in self.store.write_batch(batch):
+                        self.summary.append(record)
+                        if self.on_result:
+                            self.on_result(record)
+                except Exception as e:  # keep draining so submit() never blocks forever
+                    self._error = e
+            batch, batch_rows = [], 0
@@ -1,6 +1,7 @@
 
 # hongkong/helpers/query_list_builder.py
 import csv
+import sqlite3
 from pathlib import Path
 from typing import Iterable, Set, Tuple
 
@@ -49,6 +50,19 @@ def _already_downloaded_ids(save_dir: str | Path, pattern: str = "press_releases
                 ids.add(sid)
     return ids
 
+def _stored_ids(db_path: str | Path | None) -> Set[str]:
+    """
+    Return stockIds with stored rows in the press_manifest table
+    (helpers/press_store.py). Empty if the DB or table does not exist.
+    """
+    if not db_path or not Path(db_path).exists():
+        return set()
+    try:
+        with sqlite3.connect(db_path) as conn:
+            return {r[0] for r in conn.execute("SELECT stock_id FROM press_manifest WHERE row_count > 0")}
+    except sqlite3.OperationalError:
+        return set()
+
 # ----------------------------
 # Build pending query list (preserve order)
 # ----------------------------
@@ -60,11 +74,17 @@ def build_query_list(
     skip_existing: bool = True,
     existing_save_dir: str | Path = "data/press",
     existing_pattern: str = "press_releases_*.csv",
+    refresh_existing: bool = False,
+    existing_db_path: str | Path | None = None,
 ) -> Tuple[int, int, int, int]:
     """
     Creates a pending query list from a full list and an ignore list.
     Preserves the original order from full_list_file.
-    Optionally excludes IDs that already have CSVs in `existing_save_dir`.
+    Optionally excludes IDs that already have CSVs in `existing_save_dir`
+    or stored rows in the press store at `existing_db_path`.
+    With refresh_existing=True, IDs that already have CSVs are queued again
+    (even if listed as done in the ignore list) so the downloader can fetch
+    their newer filings incrementally; skip_existing is then ignored.
 
     Returns: (total_full, total_ignore, total_existing, total_pending)
     """
@@ -80,10 +100,15 @@ def build_query_list(
 
     # Sets for ignore/existing checks
     ignore_ids   = _read_ids(ignore_list_file)
-    existing_ids = _already_downloaded_ids(existing_save_dir, existing_pattern) if skip_existing else set()
+    existing_ids = set()
+    if skip_existing or refresh_existing:
+        existing_ids = _already_downloaded_ids(existing_save_dir, existing_pattern) | _stored_ids(existing_db_path)
 
     # Filter while preserving order
-    pending_ordered = [sid for sid in full_ids_list if sid not in ignore_ids and sid not in existing_ids]
+    if refresh_existing:
+        pending_ordered = [sid for sid in full_ids_list if sid in existing_ids or sid not in ignore_ids]
+    else:
+        pending_ordered = [sid for sid in full_ids_list if sid not in ignore_ids and sid not in existing_ids]
 
     # Write pending exactly in this order
     _write_ids_preserve_order(output_pending_file, pending_ordered)
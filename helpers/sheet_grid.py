@@ -0,0 +1,99 @@
+# ============================================================
+# helpers/sheet_grid.py
+#
+# Normalized layer for the HKEX workbooks (data/normalized/):
+# - every sheet is stored as one Parquet file holding the raw cell grid
+#   (header=None: no header row, no dropped rows or columns)
+# - first sheet  : data/normalized/<stem>.parquet
+# - other sheets : data/normalized/sheets/<stem>.<n>.parquet
+# Written by modules/hkex_xlsx_converter.py, read by the bronze modules.
+#
+# Columns holding one kind of value keep their Arrow type. Mixed columns
+# (e.g. header text above numbers) are split into one typed column per kind
+# ("3:str", "3:int", ...) and merged back on read, so cells come back as the
+# same Python values pandas read from the workbook.
+# ============================================================
+
+from datetime import date, datetime, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+NORMALIZED_DIR = Path("./data/normalized")
+SUFFIX = ".parquet"
+KIND_SEP = ":"
+
+
+def sheet_path(stem: str, index: int = 0, base_dir: Path = NORMALIZED_DIR) -> Path:
+    """Parquet file for sheet `index` of workbook `stem`."""
+    if index == 0:
+        return base_dir / f"{stem}{SUFFIX}"
+    return base_dir / "sheets" / f"{stem}.{index}{SUFFIX}"
+
+
+def _kind(value) -> str | None:
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, (int, np.integer)):
+        return "int"
+    if isinstance(value, (float, np.floating)):
+        return "float"
+    if isinstance(value, (datetime, date, np.datetime64)):
+        return "datetime"
+    if isinstance(value, time):
+        return "time"
+    return "str"
+
+
+def _grid_table(df: pd.DataFrame) -> pa.Table:
+    arrays, names = [], []
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        kinds = col.map(_kind) if col.dtype == object else None
+        if kinds is None or kinds.nunique() <= 1:
+            arrays.append(pa.array(col, from_pandas=True))
+            names.append(str(i))
+            continue
+        for kind in sorted(k for k in kinds.dropna().unique()):
+            part = col.where(kinds == kind, None)
+            if kind == "str":
+                part = part.map(lambda v: None if v is None else str(v))
+            arrays.append(pa.array(part.tolist(), from_pandas=True))
+            names.append(f"{i}{KIND_SEP}{kind}")
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def write_sheet(df: pd.DataFrame, path: Path):
+    """Store a header=None sheet DataFrame at `path` (written to a temp file, then replaced)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(_grid_table(df), tmp)
+    tmp.replace(path)
+
+
+def read_sheet(path: Path) -> pd.DataFrame:
+    """The cell grid stored at `path`, as pd.read_excel(..., header=None) returns it."""
+    table = pq.read_table(path)
+    columns: dict[int, pd.Series] = {}
+    for name, chunked in zip(table.column_names, table.columns):
+        index, _, kind = name.partition(KIND_SEP)
+        if pa.types.is_null(chunked.type):
+            series = pd.Series(np.nan, index=pd.RangeIndex(table.num_rows))  # empty column
+        else:
+            series = chunked.to_pandas()
+        if series.dtype == object:
+            series = series.where(series.notna(), np.nan)  # empty cells are NaN, not None
+        if not kind:
+            columns[int(index)] = series
+            continue
+        merged = columns.setdefault(int(index), pd.Series(np.nan, index=series.index, dtype=object))
+        mask = series.notna()
+        values = series[mask].astype("int64") if kind == "int" else series[mask]  # int + nulls reads as float
+        merged[mask] = values.astype(object)
+    return pd.DataFrame({i: columns[i] for i in sorted(columns)}, index=pd.RangeIndex(table.num_rows))
@@ -0,0 +1,111 @@
+# ============================================================
+# helpers/table_regions.py
+#
+# Table detection for the normalized sheets (header=None cell grids):
+# - SheetMask: the sheet's non-empty mask, computed once with NumPy
+# - TableSpec: declarative description of one table layout
+#     min_cells   : a header row has at least this many non-empty cells
+#     header_row  : fixed header row (None: the first row with min_cells)
+#     skip_rows   : rows between the header and the first data row
+#     stop_column : data ends at the first row blank in this column
+#                   (None: data runs to the end of the sheet)
+# - Region: header row, first data row and stop row of one table
+#
+# Lookups run on precomputed row indexes (np.flatnonzero + searchsorted),
+# so finding every table of a sheet never iterates over its rows in Python.
+# ============================================================
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    min_cells: int = 3
+    skip_rows: int = 0
+    stop_column: int | None = 0
+    header_row: int | None = None
+
+
+@dataclass(frozen=True)
+class Region:
+    header: int
+    data_start: int
+    stop: int | None  # first row after the data (None: end of sheet)
+
+    @property
+    def rows(self) -> slice:
+        """Positional slice of the data rows."""
+        return slice(self.data_start, self.stop)
+
+
+class SheetMask:
+    """Non-empty cell mask of a grid, with the row indexes TableSpec lookups need."""
+
+    def __init__(self, grid: pd.DataFrame):
+        self.mask = grid.notna().to_numpy()
+        self.n_rows, self.n_cols = self.mask.shape
+        self.filled = self.mask.sum(axis=1)
+        self._headers: dict[int, np.ndarray] = {}
+        self._blanks: dict[int, np.ndarray] = {}
+
+    def blank_rows(self) -> np.ndarray:
+        """Rows with no non-empty cell (table separators)."""
+        return np.flatnonzero(self.filled == 0)
+
+    def _header_rows(self, min_cells: int) -> np.ndarray:
+        if min_cells not in self._headers:
+            self._headers[min_cells] = np.flatnonzero(self.filled >= min_cells)
+        return self._headers[min_cells]
+
+    def _blank_in(self, column: int) -> np.ndarray:
+        if column not in self._blanks:
+            self._blanks[column] = (np.flatnonzero(~self.mask[:, column]) if column < self.n_cols
+                                    else np.arange(self.n_rows))
+        return self._blanks[column]
+
+    def find(self, spec: TableSpec = TableSpec(), start: int = 0) -> Region | None:
+        """
+        The first table matching `spec` whose header is at or after row `start`.
+        With spec.header_row, only that row is accepted (None if it has fewer
+        than min_cells non-empty cells).
+        """
+        if spec.header_row is not None:
+            if spec.header_row < start or spec.header_row >= self.n_rows \
+                    or self.filled[spec.header_row] < spec.min_cells:
+                return None
+            header = spec.header_row
+        else:
+            headers = self._header_rows(spec.min_cells)
+            i = np.searchsorted(headers, start)
+            if i == len(headers):
+                return None
+            header = int(headers[i])
+        data_start = header + 1 + spec.skip_rows
+        stop = None
+        if spec.stop_column is not None:
+            blanks = self._blank_in(spec.stop_column)
+            j = np.searchsorted(blanks, data_start)
+            stop = int(blanks[j]) if j < len(blanks) else None
+        return Region(header, data_start, stop)
+
+    def regions(self, spec: TableSpec = TableSpec()) -> list[Region]:
+        """Every table matching `spec`, top to bottom (each search starts after the previous stop)."""
+        found, start = [], 0
+        while (region := self.find(spec, start)) is not None:
+            found.append(region)
+            if region.stop is None:
+                break
+            start = region.stop + 1
+        return found
+
+    def layout(self, specs: list[TableSpec], start: int = 0) -> list[Region | None]:
+        """One region per spec, each searched after the previous one's stop (None once one is missing)."""
+        found = []
+        for spec in specs:
+            region = self.find(spec, start) if start is not None else None
+            found.append(region)
+            start = region.stop + 1 if region is not None and region.stop is not None else None
+        return found
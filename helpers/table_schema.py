@@ -0,0 +1,170 @@
+# ============================================================
+# helpers/table_schema.py
+#
+# Column types of the bronze and silver tables (data/bronze/, data/silver/):
+# - SCHEMAS maps a table name (its file stem) to {column: type}
+#     STOCK_CODE : Int32 (nullable)
+#     CATEGORY   : pandas categorical (stock_type, national_agency, ...)
+#     DATE       : datetime64, parsed from dates or day-first date strings
+#     NUMBER     : Float64 (nullable)
+#     TEXT       : pandas string
+# - write_table() enforces the schema and stores the table as Parquet,
+#   read_table() reads it back with the same dtypes, so consumers no longer
+#   re-infer types from CSV text (stages hand tables over through
+#   helpers/artifacts.py, which uses both)
+# - sql_frame() prepares a table for SQLite: dates as ISO text (YYYY-MM-DD),
+#   categories as plain text; INDEXED columns get an index after loading
+#
+# Cells that do not parse as their column's type become null; their text is
+# kept in a "<column>_raw" text column next to it (added only when needed).
+# Undeclared columns are kept; object columns among them are stored as text.
+# ============================================================
+
+from pathlib import Path
+
+import pandas as pd
+
+STOCK_CODE = "Int32"
+CATEGORY = "category"
+DATE = "date"
+NUMBER = "Float64"
+TEXT = "string"
+
+# Columns indexed when a table is loaded into SQLite (join keys of the views)
+INDEXED = ["stock_code"]
+
+# ----------------------------
+# Bronze
+# ----------------------------
+MAIN_BRONZE = {
+    "source_file": CATEGORY, "stock_code": STOCK_CODE, "company": TEXT,
+    "prospectus_date": DATE, "listing_date": DATE, "sponsors": TEXT,
+    "reporting_accountant": TEXT, "valuers": TEXT, "funds_raised": NUMBER,
+    "subscription_price": NUMBER, "offer_location": CATEGORY,
+}
+
+GEM_BRONZE = {
+    "source_file": CATEGORY, "listing_date": DATE, "stock_code": STOCK_CODE, "company": TEXT,
+    "offer_price": NUMBER, "subscription_ratio": NUMBER, "funds_raised": NUMBER,
+    "shrout_at_listing": NUMBER, "mcap_at_listing": NUMBER, "industry": CATEGORY,
+    "place_of_incorporation": CATEGORY, "listing_method": CATEGORY, "sponsors": TEXT,
+    "reporting_accountant": TEXT,
+}
+
+ISINO_BRONZE = {
+    "company": TEXT, "isin": TEXT, "stock_code": STOCK_CODE, "stock_type": CATEGORY,
+    "place_of_incorporation": CATEGORY, "national_agency": CATEGORY, "hkex_co_name": TEXT,
+}
+
+# ----------------------------
+# Silver (bronze joined with ISINO bronze; clashing ISINO columns get "_isino")
+# ----------------------------
+def _joined(left: dict, right: dict) -> dict:
+    joined = dict(left)
+    for column, kind in right.items():
+        if column == "stock_code":
+            continue
+        joined[f"{column}_isino" if column in left else column] = kind
+    return joined
+
+
+MAIN_SILVER = _joined(
+    {**{c: k for c, k in MAIN_BRONZE.items() if c not in ("funds_raised", "offer_location")},
+     "funds_raised_hk": NUMBER, "funds_raised_intl": NUMBER, "funds_raised_sg": NUMBER},
+    ISINO_BRONZE,
+)
+
+GEM_SILVER = _joined(GEM_BRONZE, ISINO_BRONZE)
+
+SCHEMAS = {
+    "main_bronze": MAIN_BRONZE,
+    "gem_bronze": GEM_BRONZE,
+    "isino_bronze": ISINO_BRONZE,
+    "isino_stock_types": {"stock_type": CATEGORY, "description": TEXT},
+    "isino_national_agencies": {"national_agency": CATEGORY, "description": TEXT},
+    "main_silver": MAIN_SILVER,
+    "gem_silver": GEM_SILVER,
+}
+
+
+# ----------------------------
+# Enforcement
+# ----------------------------
+def _as_type(col: pd.Series, kind: str) -> pd.Series:
+    if kind == DATE:
+        if pd.api.types.is_datetime64_any_dtype(col):
+            return col
+        # ISO text (dates written by pandas) first, other text is day-first (HKEX style)
+        text = col.where(col.isna(), col.astype(str))
+        iso = pd.to_datetime(text, errors="coerce", format="ISO8601")
+        return iso.fillna(pd.to_datetime(text.where(iso.isna()), errors="coerce", format="mixed", dayfirst=True))
+    if kind in (STOCK_CODE, NUMBER):
+        values = col if pd.api.types.is_numeric_dtype(col) else pd.to_numeric(col, errors="coerce")
+        return values.astype(kind)
+    if kind == CATEGORY and isinstance(col.dtype, pd.CategoricalDtype):
+        return col
+    return col.where(col.isna(), col.astype(str)).astype(kind)  # categories are text, whatever the cells held
+
+
+def enforce(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    `df` with the column types of table `name`. Values that do not parse become
+    null, and their original text is kept in "<column>_raw".
+    """
+    df = df.copy()
+    for column, kind in SCHEMAS[name].items():
+        if column in df.columns:
+            typed = _as_type(df[column], kind)
+            lost_mask = df[column].notna() & typed.isna()
+            lost = int(lost_mask.sum())
+            if lost:
+                raw = f"{column}_raw"
+                print(f"⚠️  {name}.{column}: {lost} values are not {kind}, kept as text in {raw}")
+                text = df[column].astype(str).where(lost_mask).astype(TEXT)
+                if raw in df.columns:
+                    df[raw] = df[raw].astype(TEXT).fillna(text)
+                else:
+                    df.insert(df.columns.get_loc(column) + 1, raw, text)
+            df[column] = typed
+    for column in df.columns:
+        if column not in SCHEMAS[name] and df[column].dtype == object:
+            df[column] = df[column].astype(TEXT)  # mixed cells cannot be stored as one Arrow type
+    return df
+
+
+# ----------------------------
+# Parquet storage
+# ----------------------------
+def write_parquet(df: pd.DataFrame, path):
+    """Store an already typed frame at `path` (written to a temp file, then replaced)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(path)
+
+
+def write_table(df: pd.DataFrame, path) -> pd.DataFrame:
+    """Enforce the schema named by the file stem and store `df` at `path`; returns the typed frame."""
+    df = enforce(df, Path(path).stem)
+    write_parquet(df, path)
+    return df
+
+
+def read_table(path) -> pd.DataFrame:
+    """The table stored at `path`, with the column types of its schema."""
+    path = Path(path)
+    df = pd.read_parquet(path)
+    return enforce(df, path.stem) if path.stem in SCHEMAS else df
+
+
+def sql_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` as SQLite stores it: dates as YYYY-MM-DD text, categories and strings as plain text."""
+    df = df.copy()
+    for column in df.columns:
+        col = df[column]
+        if pd.api.types.is_datetime64_any_dtype(col):
+            df[column] = col.dt.strftime("%Y-%m-%d").astype(object).where(col.notna(), None)
+        elif isinstance(col.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            df[column] = col.astype(object).where(col.notna(), None)
+    return df
@@ -0,0 +1,197 @@
+# ============================================================
+# helpers/telemetry.py
+#
+# Per-stage telemetry and the persisted run ledger:
+# - StageMetrics : thread-safe counters a module fills in while it runs
+#                  (rows_in, rows_out, bytes_downloaded, api_calls, ...)
+# - measure()    : wall time, CPU time and peak RSS (process stages) around a stage call
+# - RunLedger    : `_run_ledger` table in the SQLite DB, one row per stage
+#                  per run, plus a regression report against past runs
+# ============================================================
+
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource  # Unix only; peak RSS is reported as None elsewhere
+except ImportError:
+    resource = None
+
+COUNTERS = ("rows_in", "rows_out", "bytes_downloaded", "bytes_written", "shards", "api_calls", "cache_hits")
+
+
+# ------------------------------------------------------------
+# Counters
+# ------------------------------------------------------------
+class StageMetrics:
+    """Counters shared by a module's worker threads (e.g. METRICS.add("bytes_downloaded", n))."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+
+    def add(self, key: str, n: int = 1):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + int(n)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(func, kwargs: dict, whole_process: bool = False):
+    """
+    Call func(**kwargs) and return (value, metrics).
+
+    whole_process=True (process stages, one stage per worker) measures the
+    CPU time and peak RSS of the whole process; thread stages only measure
+    their own thread's CPU time, and their peak_rss_mb is None (ru_maxrss is
+    the high-water mark of the whole process since it started, not the stage's).
+    """
+    cpu_clock = time.process_time if whole_process else time.thread_time
+    wall0, cpu0 = time.perf_counter(), cpu_clock()
+    value = func(**kwargs)
+    metrics = {
+        "wall_s": time.perf_counter() - wall0,
+        "cpu_s": cpu_clock() - cpu0,
+        "peak_rss_mb": peak_rss_mb() if whole_process else None,
+    }
+    return value, metrics
+
+
+def bytes_written(outputs: list[str], since: float) -> int:
+    """Size of declared output files modified after `since` (tables are ignored)."""
+    total = 0
+    for resource_name in outputs:
+        if resource_name.startswith("table:"):
+            continue
+        if any(ch in resource_name for ch in "*?["):
+            paths = Path(".").glob(resource_name)
+        elif Path(resource_name).is_dir():
+            paths = Path(resource_name).rglob("*")
+        else:
+            paths = [Path(resource_name)]
+        for p in paths:
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            if p.is_file() and st.st_mtime >= since:
+                total += st.st_size
+    return total
+
+
+# ------------------------------------------------------------
+# Run ledger
+# ------------------------------------------------------------
+class RunLedger:
+    """Append-only `_run_ledger` table with one row per stage execution."""
+
+    def __init__(self, db_path: str, run_id: str | None = None):
+        self.db_path = db_path
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS _run_ledger (
+                    run_id TEXT, workflow TEXT, stage TEXT, status TEXT, started_at TEXT,
+                    wall_s REAL, cpu_s REAL, peak_rss_mb REAL,
+                    rows_in INTEGER, rows_out INTEGER, bytes_downloaded INTEGER, bytes_written INTEGER,
+                    shards INTEGER, api_calls INTEGER, cache_hits INTEGER
+                )
+            """)
+            # Ledgers created before a counter existed get its column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(_run_ledger)")}
+            for key in COUNTERS:
+                if key not in columns:
+                    conn.execute(f"ALTER TABLE _run_ledger ADD COLUMN {key} INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_run_ledger_stage ON _run_ledger(workflow, stage)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=120)
+
+    def record(self, workflow: str, stage: str, status: str, metrics: dict):
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO _run_ledger (run_id, workflow, stage, status, started_at, wall_s, cpu_s, peak_rss_mb, "
+                f"{', '.join(COUNTERS)}) VALUES ({', '.join('?' * (8 + len(COUNTERS)))})",
+                (
+                    self.run_id, workflow, stage, status, datetime.now().isoformat(timespec="seconds"),
+                    metrics.get("wall_s"), metrics.get("cpu_s"), metrics.get("peak_rss_mb"),
+                    *(metrics.get(k) for k in COUNTERS),
+                ),
+            )
+
+    def compare(self, workflow: str, runs: int = 5, threshold_pct: float = 25.0) -> list[dict]:
+        """
+        Compare the latest run of `workflow` with the median wall time of the
+        previous `runs` runs. Skipped/failed executions are ignored.
+        """
+        with self._connect() as conn:
+            run_ids = [r[0] for r in conn.execute(
+                "SELECT run_id FROM _run_ledger WHERE workflow = ? AND status = 'success' "
+                "GROUP BY run_id ORDER BY MAX(started_at) DESC LIMIT ?",
+                (workflow, runs + 1),
+            )]
+            if not run_ids:
+                return []
+            latest, previous = run_ids[0], run_ids[1:]
+            rows = conn.execute(
+                f"SELECT run_id, stage, wall_s FROM _run_ledger WHERE workflow = ? AND status = 'success' "
+                f"AND run_id IN ({','.join('?' * len(run_ids))})",
+                (workflow, *run_ids),
+            ).fetchall()
+
+        current: dict[str, float] = {}
+        history: dict[str, list[float]] = {}
+        for run_id, stage, wall in rows:
+            if run_id == latest:
+                current[stage] = wall
+            elif run_id in previous:
+                history.setdefault(stage, []).append(wall)
+
+        report = []
+        for stage, wall in current.items():
+            past = history.get(stage, [])
+            median = statistics.median(past) if past else None
+            change = (wall / median - 1) * 100 if median else None
+            report.append({
+                "stage": stage, "wall_s": wall, "median_s": median, "runs": len(past),
+                "change_pct": change, "regressed": change is not None and change > threshold_pct,
+            })
+        return sorted(report, key=lambda r: r["change_pct"] if r["change_pct"] is not None else float("-inf"), reverse=True)
+
+
+def print_comparison(report: list[dict], threshold_pct: float, only_regressions: bool = False):
+    """Pretty-print RunLedger.compare() output."""
+    rows = [r for r in report if r["regressed"]] if only_regressions else report
+    if not rows:
+        if not only_regressions:
+            print("ℹ️ No runs in the ledger yet.")
+        return
+    print("\n" + "=" * 60)
+    print(f"📈 Stage timings vs median of previous runs (flag > {threshold_pct:.0f}% slower)")
+    print("=" * 60)
+    width = max(len(r["stage"]) for r in rows)
+    for r in rows:
+        if r["median_s"] is None:
+            print(f"{r['stage'].ljust(width)} {r['wall_s']:.1f}s (no history)")
+            continue
+        flag = "⚠️ SLOWER" if r["regressed"] else "✅"
+        print(f"{r['stage'].ljust(width)} {r['wall_s']:.1f}s vs {r['median_s']:.1f}s "
+              f"({r['change_pct']:+.0f}%, n={r['runs']}) {flag}")
+    print("=" * 60 + "\n")
@@ -0,0 +1,99 @@
+# ============================================================
+# helpers/workbook_cache.py
+#
+# Parse-once access to the normalized sheets (helpers/sheet_grid.py) that
+# several modules read (isino.parquet: ISINO bronze, stock types, national
+# agencies). load() returns the cell grid plus its non-empty mask
+# (helpers/table_regions.py), from which table regions are looked up:
+# - memoized per process, keyed on (path, mtime, size)
+# - persisted to CACHE_DIR as a pickle with the same key, so the next stage
+#   (or the next run) skips the read and the mask computation
+# ============================================================
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from helpers import sheet_grid
+from helpers.table_regions import Region, SheetMask, TableSpec
+
+CACHE_DIR = Path(os.getenv("WORKBOOK_CACHE_DIR", "data/cache/workbooks"))
+
+_lock = threading.Lock()
+_memo: dict[str, "Workbook"] = {}
+
+
+@dataclass
+class Workbook:
+    path: str
+    key: tuple
+    grid: pd.DataFrame
+    sheet: SheetMask = field(init=False)
+
+    def __post_init__(self):
+        self.sheet = SheetMask(self.grid)
+
+    def region(self, index: int = 0, spec: TableSpec = TableSpec()) -> Region | None:
+        """The index-th table matching `spec` (None if the sheet has fewer)."""
+        found = self.sheet.regions(spec)
+        return found[index] if index < len(found) else None
+
+    def table(self, index: int = 0, spec: TableSpec = TableSpec()) -> pd.DataFrame | None:
+        """Data rows of the index-th table matching `spec`."""
+        region = self.region(index, spec)
+        return None if region is None else self.grid.iloc[region.rows].copy()
+
+
+def _key(path: Path) -> tuple:
+    st = path.stat()
+    return str(path.resolve()), st.st_mtime_ns, st.st_size
+
+
+def _cache_file(path: Path) -> Path:
+    digest = hashlib.sha1(str(path.resolve()).encode()).hexdigest()[:12]
+    return CACHE_DIR / f"{path.stem}-{digest}.pkl"
+
+
+def _read_cache(path: Path, key: tuple) -> Workbook | None:
+    try:
+        with open(_cache_file(path), "rb") as f:
+            cached = pickle.load(f)
+    except Exception:  # missing, partial or from another pandas version
+        return None
+    return cached if isinstance(cached, Workbook) and cached.key == key else None
+
+
+def _write_cache(path: Path, workbook: Workbook):
+    target = _cache_file(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temp name: stages reading the same workbook may run concurrently
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(workbook, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+
+
+def load(path) -> Workbook:
+    """The normalized sheet at `path` with its non-empty mask, parsed at most once per change."""
+    path = Path(path)
+    key = _key(path)
+    with _lock:
+        workbook = _memo.get(key[0])
+        if workbook is not None and workbook.key == key:
+            return workbook
+        workbook = _read_cache(path, key)
+        if workbook is None:
+            grid = sheet_grid.read_sheet(path)
+            workbook = Workbook(str(path), key, grid)
+            try:
+                _write_cache(path, workbook)
+            except OSError:
+                pass  # the cache is an optimization only
+        _memo[key[0]] = workbook
+        return workbook
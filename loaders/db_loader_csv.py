@@ -1,30 +1,76 @@
 import sqlite3
+import sys
 import pandas as pd
 from pathlib import Path
 
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import artifacts, auditor_index, table_schema
+
 # ----------------------------
 # Main process
 # ----------------------------
-def csv_loader(csv_file: str, table_name: str, db_path: str):
+def _table_exists(conn, table_name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+    ).fetchone() is not None
+
+
+def _keys(df: pd.DataFrame, key_columns: list[str]) -> list[tuple]:
+    # Same normalization for CSV text and SQLite values ("00005" == 5, NaN == "")
+    return [auditor_index.row_key(row, key_columns) for row in df[key_columns].to_dict("records")]
+
+
+def _create_indexes(conn, table_name: str, columns):
+    for column in columns:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "ix_{table_name}_{column}" ON "{table_name}" ("{column}")')
+
+
+def csv_loader(path: str, table_name: str, db_path: str, key_columns: list[str] | None = None):
     """
-    csv_file : Path to the CSV file (can include folder, e.g., data/silver/file.csv)
+    path : Path to the CSV file (can include folder, e.g., data/raw/file.csv), or to a
+           typed Parquet table (helpers/table_schema.py: dates stored as YYYY-MM-DD text,
+           stock_code as INTEGER with an index)
     table_name : SQLite table name
     db_path : Path to SQLite database
+    key_columns : Append mode: only CSV rows whose key is not in the table yet are
+                  inserted, and existing rows are left alone (None replaces the table)
     """
-    csv_path = Path(csv_file)
-    if not csv_path.exists():
+    csv_path = Path(path)
+    if not csv_path.exists() and not artifacts.has(csv_path):
         print(f"❌ CSV file not found: {csv_path}")
         return 0
 
-    df = pd.read_csv(csv_path)
-    print(f"📦 Loaded CSV: {csv_path.name} ({len(df)} rows)")
-
-    # ----------------------------
-    # Save to SQLite
-    # ----------------------------
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
     with sqlite3.connect(db_path) as conn:
-        df.to_sql(table_name, conn, if_exists="replace", index=False)
+        append = bool(key_columns) and _table_exists(conn, table_name)
+
+        if csv_path.suffix == ".parquet":
+            # Handed over in memory when the producing stage ran in this process
+            df = table_schema.sql_frame(artifacts.fetch(csv_path, copy=False))
+            print(f"📦 Loaded Parquet: {csv_path.name} ({len(df)} rows)")
+        else:
+            # Appended rows are read as text (no "00005" -> 5.0 inference to match keys against);
+            # SQLite's column affinity still stores "00005" as 5 in an INTEGER column
+            df = pd.read_csv(csv_path, dtype=str) if append else pd.read_csv(csv_path)
+            print(f"📦 Loaded CSV: {csv_path.name} ({len(df)} rows)")
+
+        # ----------------------------
+        # Save to SQLite
+        # ----------------------------
+        if append:
+            columns = ", ".join(f'"{c}"' for c in key_columns)
+            stored = pd.read_sql(f'SELECT {columns} FROM "{table_name}"', conn)
+            known = set(_keys(stored, key_columns))
+            df = df[[key not in known for key in _keys(df, key_columns)]]
+            if not df.empty:
+                df.to_sql(table_name, conn, if_exists="append", index=False)
+            print(f"➕ Appended {len(df)} new rows to {table_name}")
+        else:
+            df.to_sql(table_name, conn, if_exists="replace", index=False)
+        _create_indexes(conn, table_name, [c for c in table_schema.INDEXED if c in df.columns])
 
     return len(df)
 
@@ -33,4 +79,4 @@ def csv_loader(csv_file: str, table_name: str, db_path: str):
 # Entry point
 # ----------------------------
 if __name__ == "__main__":
-    csv_loader("data/silver/gem_silver.csv", "gem_silver", "data/hongkong.db")
+    csv_loader("data/silver/gem_silver.parquet", "gem_silver", "data/hongkong.db")
@@ -77,7 +77,8 @@ def wrds_loader(sql_file: str, table_name: str, db_path: str, isin_list_file: st
         return None
 
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(db_path) as conn:
+    # Generous busy timeout: other pipeline stages may be writing to the same database
+    with sqlite3.connect(db_path, timeout=120) as conn:
         final_df.to_sql(table_name, conn, if_exists="replace", index=False)
     print(f"✅ Saved {len(final_df)} rows to '{table_name}'")
     return len(final_df)
\ No newline at end of file
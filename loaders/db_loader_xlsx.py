@@ -1,7 +1,13 @@
 import sqlite3
-import pandas as pd
+import sys
 from pathlib import Path
 
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import excel_reader
+
 # ----------------------------
 # Main process
 # ----------------------------
@@ -16,7 +22,7 @@ def xlsx_loader(xlsx_file: str, table_name: str, db_path: str):
         print(f"❌ XLSX file not found: {xlsx_path}")
         return 0
 
-    df = pd.read_excel(xlsx_path)
+    df = excel_reader.read_excel(xlsx_path, header=0)
     print(f"📦 Loaded XLSX: {xlsx_path.name} ({len(df)} rows)")
 
     # ----------------------------
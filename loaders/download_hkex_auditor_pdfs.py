@@ -3,33 +3,62 @@
 # download_hkex_auditor_pdfs.py
 #
 # Downloads all PDF files linked in HKEX Auditor Reports table
+# (rows come from helpers/auditor_index.py, shared with the CSV stage)
 # Parallelized with skip-if-exists logic and summary of skips
+# PDFs are streamed to .part files (resumed on the next run) and
+# only renamed into place once complete, then kept in the blob store
+# (helpers/blob_store.py); a deleted PDF is restored from it, not re-downloaded
+# Only this run's new index rows (plus files missing from disk) are queued;
+# PDFs of rows already in auditor_reports.csv are not re-checked
 # ============================================================
 
 import os
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import sys
+from pathlib import Path
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import auditor_index, http_client
+from helpers.blob_store import BlobStore
+from helpers.telemetry import StageMetrics
 
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
-BASE_URL = "https://www3.hkexnews.hk/reports/auditorreport/ncms/auditorreport_anntdate_des.htm"
+BASE_URL = auditor_index.URL
 SAVE_DIR = "./data/raw/auditor_pdfs"
 MAX_WORKERS = 8  # adjust based on system/network
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 # ------------------------------------------------------------
 # Helpers
 # ------------------------------------------------------------
-def download_file(pdf_url, save_path):
+def is_complete_pdf(path):
+    """Cheap check for the %%EOF trailer (catches files truncated by older, non-atomic runs)."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(os.path.getsize(path) - 1024, 0))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+
+def download_file(pdf_url, save_path, store):
+    if not os.path.exists(save_path) and store.restore(save_path):
+        return "SKIPPED"  # content already held
     if os.path.exists(save_path):
-        return "SKIPPED"
+        if is_complete_pdf(save_path):
+            store.put(save_path)  # no-op once stored
+            return "SKIPPED"
+        # Truncated file: downloaded again (no validator to resume it safely)
     try:
-        resp = requests.get(pdf_url, timeout=60)
-        resp.raise_for_status()
-        with open(save_path, "wb") as f:
-            f.write(resp.content)
+        http_client.download(pdf_url, save_path, timeout=60, metrics=METRICS)
+        store.put(save_path)
         return "DOWNLOADED"
     except Exception as e:
         return f"FAILED: {e}"
@@ -41,38 +70,44 @@ def download_auditor_pdfs() -> bool:
     os.makedirs(SAVE_DIR, exist_ok=True)
     print("\n📡 Fetching HKEX Auditor Reports links...")
     try:
-        r = requests.get(BASE_URL, timeout=30)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-
-        # Locate table and extract links
-        table = soup.find("table")
-        if not table:
+        # Same sync as download_hkex_auditor_reports.py (fetched and parsed once per run)
+        rows, result, full = auditor_index.sync(metrics=METRICS)
+        if result == "missing":
+            print("❌ Auditor Reports page not found.")
+            return False
+        if full and not rows:
             print("❌ No table found on page.")
             return False
 
-        links = []
-        for a in table.find_all("a", href=True):
-            href = a["href"]
-            if href.lower().endswith(".pdf"):
-                full_url = urljoin(BASE_URL, href)
-                links.append(full_url)
+        # New rows, then known rows whose PDF is no longer on disk
+        if not full and os.path.exists(auditor_index.CSV_PATH):
+            rows = rows + [r for r in auditor_index.read_csv()
+                           if r["hyperlink"] and not os.path.exists(os.path.join(SAVE_DIR, os.path.basename(r["pdf_path"])))]
+        # Every PDF href of a parsed row (CSV rows only know their first link)
+        links = list(dict.fromkeys(
+            urljoin(BASE_URL, href)
+            for r in rows
+            for href in r.get("pdf_links", [r["hyperlink"]])
+            if href.lower().endswith(".pdf")
+        ))
 
-        print(f"🔗 Found {len(links)} PDF links.")
+        print(f"🔗 Found {len(links)} PDF links to fetch.")
         if not links:
-            return False
+            return True
 
         skipped_count = 0
         downloaded_count = 0
         failed_count = 0
 
-        # Parallel download
+        # Parallel download (one pooled connection per worker)
+        http_client.configure(pool_size=MAX_WORKERS)
+        store = BlobStore()
         with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
             futures = []
             for pdf_url in links:
                 filename = os.path.basename(pdf_url.split("?")[0])
                 save_path = os.path.join(SAVE_DIR, filename)
-                futures.append(executor.submit(download_file, pdf_url, save_path))
+                futures.append(executor.submit(download_file, pdf_url, save_path, store))
 
             for i, future in enumerate(as_completed(futures), start=1):
                 result = future.result()
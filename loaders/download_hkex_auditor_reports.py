@@ -4,78 +4,55 @@
 #
 # Scrapes HKEX Auditor Reports table and saves as CSV
 # Adds 'pdf_path' column with relative path for portability
+# The page is cached next to the CSV and only re-fetched when it changed;
+# fetching and parsing live in helpers/auditor_index.py (shared with the PDF downloader)
+# Only rows newer than the CSV's are parsed and appended (AUDITOR_FULL_SYNC=1 rebuilds it)
 # ============================================================
 
 import os
 import requests
-from bs4 import BeautifulSoup
-import csv
+import sys
+from pathlib import Path
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import auditor_index
+from helpers.telemetry import StageMetrics
 
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
-URL = "https://www3.hkexnews.hk/reports/auditorreport/ncms/auditorreport_anntdate_des.htm"
-SAVE_DIR = "./data/raw"
-SAVE_PATH = os.path.join(SAVE_DIR, "auditor_reports.csv")
+URL = auditor_index.URL
+SAVE_DIR = auditor_index.SAVE_DIR
+SAVE_PATH = auditor_index.CSV_PATH
+HTML_PATH = auditor_index.HTML_PATH  # cached page (+ .metadata sidecar)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 # ------------------------------------------------------------
 # Core logic
 # ------------------------------------------------------------
 def fetch_auditor_reports() -> bool:
-    os.makedirs(SAVE_DIR, exist_ok=True)
     print("\n📡 Fetching HKEX Auditor Reports table...")
     try:
-        r = requests.get(URL, timeout=30)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-
-        # Locate table
-        table = soup.find("table")
-        if not table:
+        # Shared with download_hkex_auditor_pdfs.py: one fetch and parse per run
+        data, result, full = auditor_index.sync(metrics=METRICS)
+        if result == "missing":
+            print("❌ Auditor Reports page not found.")
+            return False
+        if full and not data:
             print("❌ No table found on page.")
             return False
+        if not data:
+            print(f"✅ Auditor Reports up to date → {SAVE_PATH.replace(os.sep, '/')}")
+            return True
 
-        rows = table.find_all("tr")
-        data = []
-
-        for row in rows[1:]:  # skip header
-            tds = row.find_all("td")
-            cols = [td.get_text(strip=True) for td in tds]
-
-            if len(cols) < 3:
-                continue
-
-            # Extract hyperlink and derive relative PDF path
-            link_tag = row.find("a", href=True)
-            link = link_tag["href"] if link_tag else ""
-            raw_name = os.path.basename(link.split("?")[0]) if link else ""
-            # derive document_name (basename without extension) to match other tables
-            document_name = os.path.splitext(raw_name)[0] if raw_name else ""
-            pdf_path = f"data/raw/auditor_pdfs/{raw_name}" if raw_name else ""
-
-            data.append([
-                cols[0],  # stock_code
-                cols[1],  # listed_company_name
-                cols[2],  # announcement_date
-                link,     # hyperlink
-                pdf_path, # relative path for portability
-                document_name  # extracted document_name (no extension)
-            ])
-
-        # Save to CSV
-        with open(SAVE_PATH, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "stock_code",
-                "listed_company_name",
-                "announcement_date",
-                "hyperlink",
-                "pdf_path",
-                "document_name"
-            ])
-            writer.writerows(data)
+        # Save to CSV (new rows are appended; their order in the file does not matter)
+        auditor_index.write_csv(data, SAVE_PATH, append=not full)
 
-        print(f"✅ Saved {len(data)} rows → {SAVE_PATH.replace(os.sep, '/')}")
+        METRICS.add("rows_out", len(data))
+        print(f"✅ {'Saved' if full else 'Appended'} {len(data)} rows → {SAVE_PATH.replace(os.sep, '/')}")
         return True
 
     except requests.exceptions.RequestException as e:
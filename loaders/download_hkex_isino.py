@@ -1,6 +1,15 @@
 import os
-import json
 import requests
+import sys
+from pathlib import Path
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import http_client
+from helpers.blob_store import BlobStore
+from helpers.telemetry import StageMetrics
 
 # ----------------------------
 # Configuration
@@ -12,6 +21,7 @@ FILES = {
 }
 
 SAVE_DIR = "./data/raw"
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 
 # ----------------------------
@@ -25,59 +35,35 @@ def format_size(n: int) -> str:
     return f"{n:.1f} TB"
 
 
-def load_metadata(path: str):
-    if not os.path.exists(path):
-        return {}
-    try:
-        with open(path, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-
-def save_metadata(path: str, headers: dict):
-    meta = {k: headers[k] for k in ("ETag", "Last-Modified") if k in headers}
-    with open(path, "w") as f:
-        json.dump(meta, f)
-    return meta
-
-
 # ----------------------------
 # Core download logic
 # ----------------------------
-def fetch_file(name: str, url: str) -> bool:
+def fetch_file(name: str, url: str, store: BlobStore | None = None) -> bool:
     os.makedirs(SAVE_DIR, exist_ok=True)
 
     save_path = os.path.join(SAVE_DIR, f"{name}.xls")
-    meta_path = save_path + ".metadata"
-
-    meta = load_metadata(meta_path)
-    headers = {
-        "If-None-Match": meta.get("ETag", ""),
-        "If-Modified-Since": meta.get("Last-Modified", "")
-    }
+    if not os.path.exists(save_path) and store is not None:
+        store.restore(save_path)  # deleted locally: the conditional GET can still answer 304
 
     print(f"\n📡 Checking HKEX {name} source...")
 
     try:
-        r = requests.get(url, headers=headers, timeout=30)
+        # Conditional GET against the .metadata sidecar (ETag / Last-Modified)
+        result = http_client.fetch_if_modified(url, save_path, timeout=30, metrics=METRICS)
+        size = os.path.getsize(save_path) if os.path.exists(save_path) else 0
 
-        # Not modified
-        if r.status_code == 304:
-            size = os.path.getsize(save_path) if os.path.exists(save_path) else 0
+        if result == "not_modified":
             print(f"✅ {name} up to date ({format_size(size)})")
             return True
+        if result == "missing":
+            print(f"❌ Download failed for {name}: not found")
+            return False
 
-        r.raise_for_status()
-
-        # Save file
-        with open(save_path, "wb") as f:
-            f.write(r.content)
-
-        meta = save_metadata(meta_path, r.headers)
-
+        if store is not None:
+            store.put(save_path)
+        meta = http_client.load_metadata(save_path + http_client.META_SUFFIX)
         print(f"✅ Downloaded updated {name} → {save_path}")
-        print(f"📦 Size: {format_size(len(r.content))}")
+        print(f"📦 Size: {format_size(size)}")
         if "Last-Modified" in meta:
             print(f"🕒 Last modified (server): {meta['Last-Modified']}")
 
@@ -92,6 +78,7 @@ def fetch_file(name: str, url: str) -> bool:
 # Entry point
 # ----------------------------
 if __name__ == "__main__":
-    results = [fetch_file(name, url) for name, url in FILES.items()]
+    store = BlobStore()
+    results = [fetch_file(name, url, store) for name, url in FILES.items()]
     if not all(results):
         raise SystemExit(1)
@@ -1,6 +1,18 @@
-import requests
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import requests
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import http_client
+from helpers.blob_store import BlobStore
+from helpers.telemetry import StageMetrics
 
 # ----------------------------
 # Configuration
@@ -8,9 +20,10 @@ from datetime import datetime
 save_dir = Path("./data/raw")
 save_dir.mkdir(parents=True, exist_ok=True)
 
-MAX_CONSECUTIVE_MISSING = 3
-MAX_CACHED_CHECKS = 2  # how many cached URLs to test quickly
 CURRENT_YEAR = datetime.now().year
+RECHECK_FROM_YEAR = CURRENT_YEAR - 1  # older years are final once resolved in the map
+MAX_WORKERS = 8  # concurrent year probes
+RESOLUTION_FILE = save_dir / "listings_resolution.json"  # board -> year -> working file name (null = none)
 
 main_years = {
     "new": range(2020, CURRENT_YEAR + 1),
@@ -24,137 +37,167 @@ gem_long = range(2024, CURRENT_YEAR + 1)
 
 main_base = "https://www2.hkexnews.hk/-/media/HKEXnews/Homepage/New-Listings/New-Listing-Information/New-Listing-Report/Main/"
 gem_base = "https://www2.hkexnews.hk/-/media/HKEXnews/Homepage/New-Listings/New-Listing-Information/New-Listing-Report/GEM/"
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 
 # ----------------------------
-# Helper function
+# Helper functions
 # ----------------------------
-def download_file(url, filename):
-    """Download a file if available."""
-    if filename.exists():
-        return "cached"
-
+def download_file(url, filename, store=None):
+    """
+    Download a file if available, or confirm the local copy is current (one conditional GET).
+    New downloads are added to `store` (helpers/blob_store.py).
+    Returns "downloaded", "cached", "missing" (404/410), "redirected" or "error".
+    """
     try:
-        head = requests.head(url, timeout=10)
-        if head.status_code != 200:
-            return "missing"
+        # Redirects are not followed (same as the old HEAD check)
+        result = http_client.fetch_if_modified(url, filename, timeout=20, allow_redirects=False, metrics=METRICS)
+        if result == "downloaded" and store is not None:
+            store.put(filename)
+    except requests.exceptions.RequestException:
+        return "error"  # other HTTP errors and connection failures: retried next run
+    return {"not_modified": "cached", "downloaded": "downloaded"}.get(result, result)
+
 
-        resp = requests.get(url, timeout=20)
-        if resp.status_code == 200:
-            with open(filename, "wb") as f:
-                f.write(resp.content)
-            return "downloaded"
-        return "failed"
-    except Exception:
-        return "error"
+def load_resolution():
+    try:
+        with open(RESOLUTION_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_resolution(resolution):
+    tmp = RESOLUTION_FILE.with_name(RESOLUTION_FILE.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(resolution, f, indent=2, sort_keys=True)
+    os.replace(tmp, RESOLUTION_FILE)
+
+
+def local_file(url, year, save_prefix):
+    ext = url.split(".")[-1].lower()
+    return save_dir / f"{save_prefix}_{year}.{ext}"
+
+
+def candidate_urls(label, base_url, year_ranges, year):
+    """URL variants HKEX has used for a board/year, in the order they are tried."""
+    urls = []
+    if label == "Main Board":
+        if year in year_ranges["new"]:
+            urls.append(f"{base_url}NLR{year}_Eng.xlsx")
+        if year in year_ranges["middle"]:
+            urls.append(f"{base_url}NLR{year}_Eng.xls")
+        if year in year_ranges["old"]:
+            urls += [f"{base_url}{year}.XLS", f"{base_url}{year}.xls"]
+    else:
+        if year in gem_short:
+            short = str(year)[-2:]
+            urls += [f"{base_url}e_newlistings{short}.xls", f"{base_url}e_newlistings{short}.XLS"]
+        if year in gem_special:
+            urls += [f"{base_url}e_newlistings.xls", f"{base_url}e_newlistings.XLS"]
+        if year in gem_long:
+            urls.append(f"{base_url}e_newlistings{year}.xlsx")
+    return urls
+
+
+def resolve_year(year, urls, save_prefix, store=None):
+    """
+    Try the variants of one year in order; returns (year, working_url or None, result).
+    The result is "missing" only when every variant answered 404/410, and
+    "error" when any variant failed otherwise.
+    """
+    results = []
+    for url in urls:
+        result = download_file(url, local_file(url, year, save_prefix), store)
+        if result in ("downloaded", "cached"):
+            return year, url, result
+        results.append(result)
+    if any(local_file(url, year, save_prefix).exists() for url in urls):
+        return year, None, "cached"  # withdrawn upstream: keep the local copy
+    if "error" in results:
+        return year, None, "error"
+    return year, None, "missing" if all(r == "missing" for r in results) else "redirected"
 
 
 # ----------------------------
 # Main logic
 # ----------------------------
-def process_section(label, base_url, year_ranges, save_prefix):
-    """Generic section handler (Main Board or GEM)."""
-    summary = {"downloaded": 0, "cached": 0, "missing": 0, "failed": 0, "error": 0}
-    cached_urls = []
-    consec_missing = 0
+def process_section(label, base_url, year_ranges, save_prefix, resolution, store=None):
+    """
+    Generic section handler (Main Board or GEM).
+
+    `resolution` (persisted in RESOLUTION_FILE) remembers which URL variant
+    worked for each year. Resolved years before RECHECK_FROM_YEAR cost no
+    request while their file is on disk (or can be restored from `store`);
+    unresolved years and the current and prior year are probed concurrently.
+    """
+    summary = {"downloaded": 0, "cached": 0, "missing": 0, "redirected": 0, "failed": 0, "error": 0}
+    known = resolution.setdefault(label, {})
 
     start_year = 1994 if label == "Main Board" else 1999
-    years = range(start_year, CURRENT_YEAR + 1)
-
-    for year in years:
-        urls = []
-
-        if label == "Main Board":
-            if year in year_ranges["new"]:
-                urls.append(f"{base_url}NLR{year}_Eng.xlsx")
-            if year in year_ranges["middle"]:
-                urls.append(f"{base_url}NLR{year}_Eng.xls")
-            if year in year_ranges["old"]:
-                urls += [f"{base_url}{year}.XLS", f"{base_url}{year}.xls"]
-        else:
-            if year in gem_short:
-                short = str(year)[-2:]
-                urls += [f"{base_url}e_newlistings{short}.xls", f"{base_url}e_newlistings{short}.XLS"]
-            if year in gem_special:
-                urls += [f"{base_url}e_newlistings.xls", f"{base_url}e_newlistings.XLS"]
-            if year in gem_long:
-                urls.append(f"{base_url}e_newlistings{year}.xlsx")
-            if year == 2023:
+    probes = []
+    for year in range(start_year, CURRENT_YEAR + 1):
+        urls = candidate_urls(label, base_url, year_ranges, year)
+        if not urls:
+            continue  # no report published (e.g. GEM 2023)
+
+        key = str(year)
+        url = base_url + known[key] if known.get(key) else None
+        if key in known and year < RECHECK_FROM_YEAR:
+            if url is None:
+                summary["missing"] += 1
                 continue
+            path = local_file(url, year, save_prefix)
+            if path.exists() or (store is not None and store.restore(path)):
+                summary["cached"] += 1
+                continue
+            urls = [url]  # file deleted locally: fetch it from the known URL
+
+        elif url is not None:
+            # Recheck: try the known variant first
+            urls = [url] + [u for u in urls if u != url]
+        probes.append((year, urls))
+
+    http_client.configure(pool_size=MAX_WORKERS)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(lambda probe: resolve_year(probe[0], probe[1], save_prefix, store), probes))
 
-        success = False
-        for url in urls:
-            ext = url.split(".")[-1].lower()
-            filename = save_dir / f"{save_prefix}_{year}.{ext}"
-            result = download_file(url, filename)
-            summary[result] = summary.get(result, 0) + 1
-
-            if result == "cached":
-                cached_urls.append((label, year, url))
-
-            if result in ("downloaded", "cached"):
-                success = True
-                break
-
-        if not success:
-            consec_missing += 1
-            if consec_missing >= MAX_CONSECUTIVE_MISSING:
-                break
-        else:
-            consec_missing = 0
-
-    return summary, cached_urls
-
-
-def quick_check_cached(cached_urls, label):
-    """Fast sanity check for cached URLs (soft warnings only)."""
-    if not cached_urls:
-        return
-
-    print(f"   🔍 Checking cached URLs for {label}...")
-    checked = 0
-    broken = 0
-    for lbl, year, url in cached_urls:
-        if checked >= MAX_CACHED_CHECKS:
-            break
-        try:
-            r = requests.head(url, timeout=3)
-            if r.status_code != 200:
-                print(f"      ⚠️  Broken cached URL ({lbl} {year}): {url}")
-                broken += 1
-        except Exception:
-            print(f"      ⚠️  Broken cached URL ({lbl} {year}): {url}")
-            broken += 1
-        checked += 1
-
-    if broken > 0:
-        print(f"⚠️  {label}: {broken}/{checked} cached URLs returned invalid responses (soft warning).")
+    for year, url, result in results:
+        key = str(year)
+        summary[result] += 1
+        if url is not None:
+            known[key] = url[len(base_url):]
+        elif result == "missing":
+            # Only a 404/410 on every variant settles a year as having no file;
+            # redirects and errors leave it unresolved so it is probed again
+            known.setdefault(key, None)
+
+    return summary
 
 
 def download_all():
     """Download all Main Board and GEM listing files with compact summary output."""
-    print("\n📘 Downloading Main Board reports...")
-    main_summary, main_cached = process_section("Main Board", main_base, main_years, "Main")
+    resolution = load_resolution()
+    store = BlobStore()
 
-    if len(main_cached) >= MAX_CACHED_CHECKS:
-        quick_check_cached(main_cached, "Main Board")
+    print("\n📘 Downloading Main Board reports...")
+    main_summary = process_section("Main Board", main_base, main_years, "Main", resolution, store)
 
     print("💎 Downloading GEM reports...")
-    gem_summary, gem_cached = process_section("GEM", gem_base, main_years, "GEM")
+    gem_summary = process_section("GEM", gem_base, main_years, "GEM", resolution, store)
 
-    if len(gem_cached) >= MAX_CACHED_CHECKS:
-        quick_check_cached(gem_cached, "GEM")
+    save_resolution(resolution)
 
     # --- Final Summary ---
     print("\n📊 Download Summary:")
     print(f"  📘 Main Board: "
           f"{main_summary['downloaded']} new, "
           f"{main_summary['cached']} cached, "
-          f"{main_summary['missing']} missing")
+          f"{main_summary['missing'] + main_summary['redirected']} missing")
     print(f"  💎 GEM: "
           f"{gem_summary['downloaded']} new, "
           f"{gem_summary['cached']} cached, "
-          f"{gem_summary['missing']} missing")
+          f"{gem_summary['missing'] + gem_summary['redirected']} missing")
 
     total_failures = (
         main_summary["failed"] + main_summary["error"] +
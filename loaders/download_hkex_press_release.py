@@ -1,11 +1,22 @@
 
-import requests
+import asyncio
 import json
+import os
+import random
 import pandas as pd
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import time
-import random
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import http_client
+from helpers.press_store import DB_DATE_FORMAT, PressStore, PressWriter
+from helpers.telemetry import StageMetrics
 
 # ----------------------------
 # Configuration
@@ -23,16 +34,55 @@ HEADERS = {
 }
 
 FROM_DATE = "19990401"
-TO_DATE = "20251124"
+TO_DATE = os.getenv("PRESS_TO_DATE") or datetime.now().strftime("%Y%m%d")
+# Incremental mode: stocks already in the store are only queried from their newest stored DATE_TIME
+INCREMENTAL = os.getenv("PRESS_INCREMENTAL", "1") not in ("0", "false", "False")
+# press_releases / press_manifest tables (helpers/press_store.py); press_main.py sets this from DB_PATH
+DB_PATH = os.getenv("PRESS_DB_PATH") or os.getenv("DB_PATH", "data/hongkong.db")
 ROW_RANGE = "10000"
-MAX_WORKERS = 10  # Adjust based on your network/API tolerance
-RETRIES = 3
-summary_records = []  # Collect results for summary CSV
+# Headline-category filters, ";"-separated: a preset (see CATEGORY_PRESETS), a category
+# name or code from the HKEX taxonomy ("Annual Report", "40100"), or explicit query
+# parameters ("t1code=40000,t2code=40100"). Empty = every headline.
+# Incremental start dates are per stock, not per category: run once with
+# PRESS_INCREMENTAL=0 after adding a category to backfill its older filings.
+CATEGORIES = [c.strip() for c in os.getenv("PRESS_CATEGORIES", "").split(";") if c.strip()]
+CATEGORY_PARALLEL = os.getenv("PRESS_CATEGORY_PARALLEL", "1") not in ("0", "false", "False")  # one request per category at once
+CATEGORY_PRESETS = {
+    "results": ["Final Results", "Interim Results", "Quarterly Results"],
+    "annual_reports": ["Annual Report"],
+}
+# Headline-category taxonomy of the title search page, cached in CATEGORY_DIR (conditional GET)
+CATEGORY_URLS = {
+    "tierone": "https://www1.hkexnews.hk/ncms/script/eds/tierone_e.json",
+    "tiertwogrp": "https://www1.hkexnews.hk/ncms/script/eds/tiertwogrp_e.json",
+    "tiertwo": "https://www1.hkexnews.hk/ncms/script/eds/tiertwo_e.json",
+}
+CATEGORY_DIR = save_dir / "categories"
+# Each taxonomy file is a JSON list of objects with these fields (tier-two entries name their tier-one parent)
+TAXONOMY_FIELDS = {
+    "tierone": ("code", "name"),
+    "tiertwogrp": ("code", "name"),
+    "tiertwo": ("code", "name", "t1code"),
+}
+# Truncated responses are split into date shards: years, then quarters, then months
+SHARD_PERIODS = (12, 3, 1)  # shard length in months, coarsest first
+SHARD_WORKERS = 4  # parallel shard requests per stock in fetch_press_releases (asyncio engine uses the limiter)
+# Full runs split a window up front when the stock's stored history already holds this share of ROW_RANGE
+PRESHARD_FILL = 0.8
+MAX_WORKERS = 10  # starting concurrency; the AIMD limiter adjusts it while running
+MAX_CONCURRENCY = int(os.getenv("PRESS_MAX_CONCURRENCY", "64"))  # upper bound for the limiter
+LATENCY_TARGET = float(os.getenv("PRESS_LATENCY_TARGET", "8"))  # seconds; slower responses stop growth
+QUEUE_SIZE = 100  # stock IDs buffered ahead of the workers
+RETRIES = 3  # attempts per stock (backoff handled by helpers/http_client.py / the AIMD engine)
+latest_dates = {}  # stockId -> newest stored DATE_TIME ("YYYY-MM-DD HH:MM"), loaded by run_parallel
+monthly_counts = {}  # stockId -> {"YYYY-MM": stored rows}, loaded by run_parallel for full runs (PRESS_INCREMENTAL=0)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
+FILTERS = None  # resolved CATEGORIES (list of query-parameter dicts), see category_filters()
 
 # ----------------------------
 # Fetch with retry
 # ----------------------------
-def fetch_press_releases(stock_id):
+def build_params(stock_id, from_date=FROM_DATE, to_date=None, category=None):
     params = {
         "sortDir": "0",
         "sortByOptions": "DateTime",
@@ -40,8 +90,8 @@ def fetch_press_releases(stock_id):
         "market": "SEHK", # SEHK = Main Board; GEM = Growth Enterprise Market
         "stockId": stock_id,
         "documentType": "-1",
-        "fromDate": FROM_DATE,
-        "toDate": TO_DATE,
+        "fromDate": from_date,
+        "toDate": to_date or TO_DATE,
         "title": "",
         "searchType": "0",
         "t1code": "-2",
@@ -50,79 +100,476 @@ def fetch_press_releases(stock_id):
         "rowRange": ROW_RANGE,
         "lang": "E"
     }
+    params.update(category or {})  # t1code / t2Gcode / t2code / documentType overrides
+    return params
 
-    for attempt in range(RETRIES):
+
+def _fetch_window(stock_id, from_date, to_date, category):
+    try:
+        resp = http_client.get(API_URL, headers=HEADERS, params=build_params(stock_id, from_date, to_date, category), timeout=40,
+                               attempts=RETRIES, metrics=METRICS)
+        if resp.status_code == 200:
+            return resp.json()
+        print(f"⚠️ {stock_id}: HTTP {resp.status_code}")
+    except Exception as e:
+        print(f"⚠️ {stock_id}: Request failed after {RETRIES} attempts ({e})")
+    return None
+
+
+def fetch_press_releases(stock_id, from_date=None, to_date=None, category=None):
+    """
+    Fetch one stock's filings between from_date and to_date (YYYYMMDD; default: its
+    incremental start date and TO_DATE). With several category filters, each one is
+    a separate request (parallel with CATEGORY_PARALLEL). Windows the stored history
+    shows to be too large are fetched as date shards straight away (see presplit);
+    truncated responses are re-fetched as date shards. Shards run in parallel and are
+    merged (see split_window / merge_shards).
+    """
+    from_date = from_date or start_date(stock_id)
+    to_date = to_date or TO_DATE
+    filters = [category] if category is not None else category_filters()
+    if len(filters) > 1:
+        def fetch(c):
+            return fetch_press_releases(stock_id, from_date, to_date, c)[1]
+        if CATEGORY_PARALLEL:
+            with ThreadPoolExecutor(max_workers=min(SHARD_WORKERS, len(filters))) as pool:
+                parts = list(pool.map(fetch, filters))
+        else:
+            parts = [fetch(c) for c in filters]
+        return stock_id, merge_shards(parts)
+    category = filters[0]
+
+    shards = presplit(stock_id, from_date, to_date, category)
+    if not shards:
+        data = _fetch_window(stock_id, from_date, to_date, category)
+        shards = split_window(from_date, to_date) if is_truncated(data) else []
+        if not shards:
+            if is_truncated(data):
+                print(f"⚠️ {stock_id}: {from_date}-{to_date} still truncated at {ROW_RANGE} rows")
+            return stock_id, data
+    METRICS.add("shards", len(shards))
+    with ThreadPoolExecutor(max_workers=min(SHARD_WORKERS, len(shards))) as pool:
+        parts = list(pool.map(lambda window: fetch_press_releases(stock_id, *window, category)[1], shards))
+    return stock_id, merge_shards(parts)
+
+
+# ----------------------------
+# Headline categories
+# ----------------------------
+def parse_taxonomy(tier, data):
+    """
+    Entries of one taxonomy file as tuples of its TAXONOMY_FIELDS (all strings).
+    Raises ValueError if the file is not a list of objects carrying those fields.
+    """
+    fields = TAXONOMY_FIELDS[tier]
+    if not isinstance(data, list):
+        raise ValueError(f"Category taxonomy {tier}: expected a JSON list, got {type(data).__name__}")
+    entries = []
+    for item in data:
+        if not isinstance(item, dict) or any(item.get(k) in (None, "") for k in fields):
+            raise ValueError(f"Category taxonomy {tier}: entry without {'/'.join(fields)}: {str(item)[:100]}")
+        entries.append(tuple(str(item[k]).strip() for k in fields))
+    return entries
+
+
+def load_taxonomy():
+    """
+    {tier: [entry, ...]} (see parse_taxonomy) from the cached taxonomy files, refreshed
+    with a conditional GET. A cached copy is used if HKEX cannot be reached; a file
+    in an unexpected layout raises ValueError.
+    """
+    CATEGORY_DIR.mkdir(parents=True, exist_ok=True)
+    taxonomy = {}
+    for tier, url in CATEGORY_URLS.items():
+        path = CATEGORY_DIR / f"{tier}.json"
         try:
-            resp = requests.get(API_URL, headers=HEADERS, params=params, timeout=40)
-            if resp.status_code == 200:
-                return stock_id, resp.json()
+            http_client.fetch_if_modified(url, path, headers=HEADERS, timeout=20, metrics=METRICS)
         except Exception as e:
-            print(f"⚠️ {stock_id}: Attempt {attempt+1} failed ({e})")
-        time.sleep(2 ** attempt + random.random())  # backoff
-    return stock_id, None
+            print(f"⚠️ Category taxonomy {tier}: refresh failed ({e}){'; using cached copy' if path.exists() else ''}")
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                data = json.load(f)
+        except OSError:
+            taxonomy[tier] = []
+            continue
+        except ValueError as e:
+            raise ValueError(f"Category taxonomy {tier}: {path} is not valid JSON ({e})") from e
+        taxonomy[tier] = parse_taxonomy(tier, data)
+    return taxonomy
+
+
+def resolve_categories(specs, taxonomy=None):
+    """
+    CATEGORIES specs -> list of query-parameter dicts (one request each).
+    Raises ValueError for names/codes that are not in the taxonomy.
+    """
+    filters = []
+    for spec in specs:
+        if "=" in spec:
+            filters.append(dict(part.strip().split("=", 1) for part in spec.split(",") if "=" in part))
+            continue
+        for name in CATEGORY_PRESETS.get(spec.lower(), [spec]):
+            if taxonomy is None:
+                taxonomy = load_taxonomy()
+            key = name.lower()
+            match = None
+            for code, label, t1code in taxonomy.get("tiertwo", []):
+                if key in (code.lower(), label.lower()):
+                    match = {"t1code": t1code, "t2Gcode": "-2", "t2code": code}
+                    break
+            for code, label in taxonomy.get("tierone", []) if match is None else []:
+                if key in (code.lower(), label.lower()):
+                    match = {"t1code": code, "t2Gcode": "-2", "t2code": "-2"}
+                    break
+            for code, label in taxonomy.get("tiertwogrp", []) if match is None else []:
+                if key == label.lower():
+                    match = {"t1code": "-2", "t2Gcode": code, "t2code": "-2"}
+                    break
+            if match is None:
+                raise ValueError(f"Unknown press-release category '{name}' (not in {CATEGORY_DIR})")
+            filters.append(match)
+    # Same filter listed twice (e.g. preset + its member) -> one request
+    unique = []
+    for f in filters:
+        if f not in unique:
+            unique.append(f)
+    return unique or [{}]
+
+
+def category_filters():
+    """Resolved CATEGORIES ([{}] = no filter); resolved once per process."""
+    global FILTERS
+    if FILTERS is None:
+        FILTERS = resolve_categories(CATEGORIES)
+    return FILTERS
 
 
 # ----------------------------
-# Save CSV only if records exist
+# Date shards
 # ----------------------------
-def download_press_releases(stock_id):
-    stock_id, data = fetch_press_releases(stock_id)
+def _rows(data):
+    """Parsed "result" rows of a response (None if missing or invalid)."""
     if not data or "result" not in data:
-        summary_records.append({"stock_id": stock_id, "status": "failed", "row_count": 0})
-        return False
+        return None
+    try:
+        return json.loads(data["result"]) or []
+    except (TypeError, json.JSONDecodeError):
+        return None
 
+
+def is_truncated(data):
+    """True if the response hit rowRange or the server reports more rows than it returned."""
+    rows = _rows(data)
+    if rows is None:
+        return False
+    if data.get("hasNextRow") or len(rows) >= int(ROW_RANGE):
+        return True
     try:
-        results = json.loads(data["result"])
-    except json.JSONDecodeError:
-        summary_records.append({"stock_id": stock_id, "status": "failed", "row_count": 0})
+        return int(data.get("recordCnt") or 0) > len(rows)
+    except (TypeError, ValueError):
         return False
 
-    if not results:
-        print(f"ℹ️ {stock_id}: No press releases found")
-        summary_records.append({"stock_id": stock_id, "status": "skipped", "row_count": 0})
-        return False
 
-    # Save CSV only
-    df = pd.DataFrame(results)
-    csv_file = save_dir / f"press_releases_{stock_id}.csv"
-    df.to_csv(csv_file, index=False)
+def split_window(from_date, to_date):
+    """
+    Split [from_date, to_date] (YYYYMMDD) into calendar years, or quarters if it is
+    within one year, or months if it is within one quarter. Newest shard first (the
+    API sorts newest first). Empty list if the window is a single month.
+    """
+    start = datetime.strptime(from_date, "%Y%m%d").date()
+    end = datetime.strptime(to_date, "%Y%m%d").date()
+    for months in SHARD_PERIODS:
+        first = (start.year * 12 + start.month - 1) // months
+        last = (end.year * 12 + end.month - 1) // months
+        if first == last:
+            continue
+        shards = []
+        for period in range(first, last + 1):
+            lo = date((period * months) // 12, (period * months) % 12 + 1, 1)
+            nxt = (period + 1) * months
+            hi = date(nxt // 12, nxt % 12 + 1, 1) - timedelta(days=1)
+            shards.append((max(lo, start).strftime("%Y%m%d"), min(hi, end).strftime("%Y%m%d")))
+        return shards[::-1]
+    return []
+
+
+def presplit(stock_id, from_date, to_date, category=None):
+    """
+    Date shards for a window whose stored history (monthly_counts) already fills
+    PRESHARD_FILL of ROW_RANGE, so the oversized response is never downloaded; []
+    otherwise. Category-filtered windows are not pre-split (the history counts
+    every headline).
+    """
+    counts = monthly_counts.get(stock_id)
+    if not counts or category:
+        return []
+    lo = f"{from_date[:4]}-{from_date[4:6]}"
+    hi = f"{to_date[:4]}-{to_date[4:6]}"
+    known = sum(n for month, n in counts.items() if lo <= month <= hi)
+    return split_window(from_date, to_date) if known >= int(ROW_RANGE) * PRESHARD_FILL else []
+
+
+def _row_time(row):
+    try:
+        return datetime.strptime(row["DATE_TIME"], "%d/%m/%Y %H:%M")
+    except (KeyError, TypeError, ValueError):
+        return datetime.min
+
+
+def merge_shards(parts):
+    """
+    Merge shard (or category) responses into one response: rows deduplicated on
+    NEWS_ID, newest first. None if any part failed, so a stock is never saved with
+    a gap in its history.
+    """
+    merged, seen = [], set()
+    for data in parts:
+        rows = _rows(data)
+        if rows is None:
+            return None
+        for row in rows:
+            key = row.get("NEWS_ID") if isinstance(row, dict) else None
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            merged.append(row)
+    merged.sort(key=_row_time, reverse=True)  # stable: shards are already in order
+    return {"result": json.dumps(merged), "recordCnt": len(merged), "hasNextRow": False}
 
-    print(f"✅ {stock_id}: {len(df)} rows saved")
-    summary_records.append({"stock_id": stock_id, "status": "saved", "row_count": len(df)})
-    return True
 
 # ----------------------------
-# Parallel Execution
+# Incremental state
 # ----------------------------
-def run_parallel(stock_ids):
-    start = time.time()
-    success_count = 0
-    fail_count = 0
-    skipped_count = 0
+def load_state(store):
+    """
+    Newest stored filing per stock (and, for full runs, its filings per month),
+    importing legacy per-stock CSVs into the store once.
+    """
+    known = store.newest_dates()
+    for csv_file in sorted(save_dir.glob("press_releases_*.csv")):
+        sid = csv_file.stem.replace("press_releases_", "")
+        if sid and sid not in known:
+            print(f"ℹ️ {sid}: importing {store.import_csv(sid, csv_file)} rows from {csv_file.name}")
+    latest_dates.clear()
+    latest_dates.update(store.newest_dates())
+    monthly_counts.clear()
+    if not INCREMENTAL:  # incremental windows start at the newest filing and are never large
+        monthly_counts.update(store.monthly_counts())
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {executor.submit(download_press_releases, sid): sid for sid in stock_ids}
 
-        for i, future in enumerate(as_completed(futures), 1):
-            sid = futures[future]
+def start_date(stock_id):
+    """fromDate for a stock: the day of its newest stored filing (incremental) or FROM_DATE."""
+    newest = latest_dates.get(stock_id) if INCREMENTAL else None
+    if not newest:
+        return FROM_DATE
+    # Same day inclusive: later filings that day are picked up, repeats are dropped by NEWS_ID
+    return datetime.strptime(newest, DB_DATE_FORMAT).strftime("%Y%m%d")
+
+# ----------------------------
+# Hand results to the store writer
+# ----------------------------
+def save_press_releases(stock_id, data, writer):
+    """Queue a response for the single store writer (rows=None records a failed fetch)."""
+    rows = None
+    if data and "result" in data:
+        try:
+            rows = json.loads(data["result"]) or []
+        except json.JSONDecodeError:
+            rows = None
+    writer.submit(stock_id, rows)
+
+
+def report_result(record):
+    """PressWriter callback: one line per stored stock."""
+    if record["status"] == "saved":
+        METRICS.add("rows_out", record["row_count"])
+        print(f"✅ {record['stock_id']}: {record['row_count']} rows saved")
+    elif record["status"] == "skipped":
+        print(f"ℹ️ {record['stock_id']}: No new press releases")
+
+
+def download_press_releases(stock_id, writer):
+    stock_id, data = fetch_press_releases(stock_id)
+    save_press_releases(stock_id, data, writer)
+
+# ----------------------------
+# Adaptive concurrency (AIMD)
+# ----------------------------
+class AimdLimiter:
+    """
+    Concurrency window for the asyncio engine (TCP-style AIMD):
+    +1 slot per window of healthy responses, halved on 429/5xx/timeouts.
+    At most one cut per round trip so a burst of errors counts once.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=MAX_CONCURRENCY, latency_target=LATENCY_TARGET):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.latency_target = latency_target
+        self.rtt = None  # smoothed latency of healthy responses
+        self.in_flight = 0
+        self.peak = int(self.limit)
+        self._last_cut = 0.0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            while self.in_flight >= int(self.limit):
+                await self._cond.wait()
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency):
+        self.rtt = latency if self.rtt is None else 0.8 * self.rtt + 0.2 * latency
+        if latency <= self.latency_target:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.peak = max(self.peak, int(self.limit))
+
+    def on_throttle(self):
+        now = time.monotonic()
+        if now - self._last_cut >= (self.rtt or 0.0):
+            self.limit = max(self.minimum, self.limit / 2)
+            self._last_cut = now
+
+
+def _fetch_once(stock_id, from_date, to_date, category):
+    """
+    Single request for the asyncio engine (retries and pacing are done by the engine).
+    Returns (data, throttled): throttled is True for 429/5xx, timeouts and connection errors.
+    """
+    try:
+        resp = http_client.get(API_URL, headers=HEADERS, params=build_params(stock_id, from_date, to_date, category),
+                               timeout=40, attempts=1, metrics=METRICS)
+    except Exception as e:
+        print(f"⚠️ {stock_id}: Request failed ({e})")
+        return None, True
+    if resp.status_code == 200:
+        try:
+            return resp.json(), False
+        except ValueError:
+            print(f"⚠️ {stock_id}: Invalid JSON response")
+            return None, False
+    print(f"⚠️ {stock_id}: HTTP {resp.status_code}")
+    return None, resp.status_code == 429 or resp.status_code >= 500
+
+
+async def _fetch_async(stock_id, limiter, from_date, to_date, category=None):
+    filters = [category] if category is not None else category_filters()
+    if len(filters) > 1:
+        if CATEGORY_PARALLEL:
+            parts = await asyncio.gather(*(_fetch_async(stock_id, limiter, from_date, to_date, c) for c in filters))
+        else:
+            parts = [await _fetch_async(stock_id, limiter, from_date, to_date, c) for c in filters]
+        return merge_shards(parts)
+    category = filters[0]
+
+    shards = presplit(stock_id, from_date, to_date, category)
+    if shards:
+        METRICS.add("shards", len(shards))
+        parts = await asyncio.gather(*(_fetch_async(stock_id, limiter, lo, hi, category) for lo, hi in shards))
+        return merge_shards(parts)
+
+    data = None
+    for attempt in range(RETRIES):
+        async with limiter:
+            start = time.monotonic()
+            data, throttled = await asyncio.to_thread(_fetch_once, stock_id, from_date, to_date, category)
+            latency = time.monotonic() - start
+        if not throttled:
+            limiter.on_success(latency)
+            break
+        limiter.on_throttle()
+        if attempt < RETRIES - 1:
+            # Back off outside the limiter so other IDs keep the slot busy
+            await asyncio.sleep(http_client.BACKOFF_BASE * 2 ** attempt + random.random())
+
+    shards = split_window(from_date, to_date) if is_truncated(data) else []
+    if not shards:
+        if is_truncated(data):
+            print(f"⚠️ {stock_id}: {from_date}-{to_date} still truncated at {ROW_RANGE} rows")
+        return data
+    # Shards share the limiter with every other stock, so a heavy filer cannot flood the API
+    METRICS.add("shards", len(shards))
+    parts = await asyncio.gather(*(_fetch_async(stock_id, limiter, lo, hi, category) for lo, hi in shards))
+    return merge_shards(parts)
+
+
+async def _download_async(stock_id, limiter, writer):
+    data = await _fetch_async(stock_id, limiter, start_date(stock_id), TO_DATE)
+    # Blocks only while the writer's queue is full
+    await asyncio.to_thread(save_press_releases, stock_id, data, writer)
+
+
+async def run_async(stock_ids, writer):
+    """
+    Download all stock IDs with a bounded queue and an AIMD concurrency window;
+    results go to `writer` (a PressWriter). Returns the peak concurrency.
+    """
+    # helpers/http_client.py caps requests per host (HTTP_MAX_PER_HOST); never aim above it
+    limiter = AimdLimiter(MAX_WORKERS, maximum=min(MAX_CONCURRENCY, http_client.MAX_PER_HOST))
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    counts = {"done": 0}
+
+    # Blocking HTTP/CSV work runs in threads; size them for the limiter's ceiling
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=limiter.maximum + 4))
+    http_client.configure(pool_size=limiter.maximum)
+
+    async def producer():
+        for sid in stock_ids:
+            await queue.put(sid)  # waits while the queue is full (backpressure)
+        for _ in range(limiter.maximum):
+            await queue.put(None)
+
+    async def worker():
+        while True:
+            sid = await queue.get()
+            if sid is None:
+                return
             try:
-                result = future.result()
-                if result:
-                    success_count += 1
-                else:
-                    skipped_count += 1
+                await _download_async(sid, limiter, writer)
             except Exception as e:
                 print(f"❌ Exception for {sid}: {e}")
-                fail_count += 1
+                writer.submit(sid, None)
+            counts["done"] += 1
+            if counts["done"] % 50 == 0:
+                print(f"Progress: {counts['done']}/{len(stock_ids)} processed "
+                      f"(concurrency {int(limiter.limit)})")
 
-            if i % 50 == 0:
-                print(f"Progress: {i}/{len(stock_ids)} processed")
+    # Idle workers just wait on the queue; the limiter decides how many requests run
+    await asyncio.gather(producer(), *(worker() for _ in range(limiter.maximum)))
+    return limiter.peak
+
+# ----------------------------
+# Parallel Execution
+# ----------------------------
+def run_parallel(stock_ids):
+    start = time.time()
+    filters = category_filters()  # unknown categories fail before any download
+    if filters != [{}]:
+        print(f"ℹ️ Category filters: {filters}")
+    store = PressStore(DB_PATH)
+    load_state(store)
+    writer = PressWriter(store, on_result=report_result)
+    try:
+        peak = asyncio.run(run_async(stock_ids, writer))
+    finally:
+        summary_records = writer.close()  # flushes the last batch
 
     elapsed = time.time() - start
-    print(f"\n✅ Done! Saved: {success_count}, Skipped (0 records): {skipped_count}, Fail: {fail_count}, Time: {elapsed:.2f}s")
+    statuses = [r["status"] for r in summary_records]
+    print(f"\n✅ Done! Saved: {statuses.count('saved')}, Skipped (0 records): {statuses.count('skipped')}, "
+          f"Fail: {statuses.count('failed')}, Time: {elapsed:.2f}s, Peak concurrency: {peak}")
 
-    # Save summary CSV
-    summary_df = pd.DataFrame(summary_records)
+    # Save summary CSV (this run's stocks; the full per-stock state is the press_manifest table)
+    summary_df = pd.DataFrame(summary_records, columns=["stock_id", "status", "row_count"])
     summary_file = save_dir / "press_summary.csv"
     summary_df.to_csv(summary_file, index=False)
     print(f"📊 Summary CSV saved to {summary_file}")
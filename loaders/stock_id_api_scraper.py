@@ -1,11 +1,33 @@
 
-import requests
+# ============================================================
+# stock_id_api_scraper.py
+#
+# Maps HKEX stock codes to the stockIds used by titleSearchServlet, via the
+# prefix.do autocomplete endpoint. prefix.do returns every stock whose code
+# starts with the queried digits (up to PREFIX_LIMIT entries), so codes are
+# covered by walking a prefix trie: a prefix is only split into longer ones
+# when its reply came back full (and, if it is a code itself that the reply
+# left out, looked up exactly). Replies are cached in the `_stock_prefix_cache`
+# table of the SQLite DB for STOCK_PREFIX_TTL_HOURS.
+# ============================================================
+
+import bisect
 import json
+import os
+import sqlite3
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 import time
-import threading
 from pathlib import Path
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import http_client
+from helpers.telemetry import StageMetrics
 
 # ===== Configuration =====
 API_URL = "https://www1.hkexnews.hk/search/prefix.do"
@@ -19,14 +41,12 @@ DEFAULT_MAX_WORKERS = 8
 DEFAULT_INPUT_PATH = Path("data/stock_codes.txt")
 DEFAULT_OUTPUT_FULL = Path("data/stock_mapping_filtered.csv")
 DEFAULT_OUTPUT_PARTIAL = Path("data/stock_mapping_partial.csv")
-
-# Shared state (will be reset in run_scrape)
-results = []
-seen_stockIds = set()
-seen_codes = set()
-codes_lock = threading.Lock()
-ids_lock = threading.Lock()
-results_lock = threading.Lock()
+DB_PATH = os.getenv("DB_PATH", "data/hongkong.db")
+PREFIX_LIMIT = int(os.getenv("STOCK_PREFIX_LIMIT", "10"))  # most entries prefix.do returns; a reply this long may be cut off
+CACHE_TTL_HOURS = float(os.getenv("STOCK_PREFIX_TTL_HOURS", "24"))  # 0 disables the cache
+MAX_CODE = 99999  # HKEX stock codes are at most five digits
+CODE_DIGITS = len(str(MAX_CODE))  # a zero-padded query this long matches one code only
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 # ===== Helpers =====
 def parse_jsonp(raw_text: str) -> dict:
@@ -46,95 +66,182 @@ def parse_jsonp(raw_text: str) -> dict:
 def classify_market(actual_code: int) -> str:
     return "GEM" if 8000 <= actual_code <= 8999 else "SEHK"
 
-def fetch_stock_info(code: int):
-    with codes_lock:
-        if code in seen_codes:
-            print(f"⏩ Skipping API call for {code}")
-            return
-        seen_codes.add(code)
-
+def fetch_prefix(prefix: str) -> list | None:
+    """stockInfo entries prefix.do returns for `prefix` (None on failure)."""
     params = {
         "callback": "callback",
         "lang": "EN",
         "type": "A",
-        "name": str(code),
+        "name": prefix,
         "market": "SEHK"
     }
     try:
-        resp = requests.get(API_URL, headers=HEADERS, params=params, timeout=15)
+        resp = http_client.get(API_URL, headers=HEADERS, params=params, timeout=15, metrics=METRICS)
         if resp.status_code != 200:
-            print(f"❌ HTTP {resp.status_code} for code {code}")
-            return
-        data = parse_jsonp(resp.text)
-        stock_info = data.get("stockInfo", []) or []
-
-        with codes_lock:
-            for item in stock_info:
-                returned_code = int(item.get("code"))
-                seen_codes.add(returned_code)
-
-        for item in stock_info:
-            stock_id = item.get("stockId")
-            actual_code = int(item.get("code"))
-            with ids_lock:
-                if stock_id in seen_stockIds:
-                    continue
-                seen_stockIds.add(stock_id)
-            row = {
-                "stock_code": actual_code,
-                "stockId": stock_id,
-                "name": item.get("name"),
-                "market": classify_market(actual_code)
-            }
-            with results_lock:
-                results.append(row)
+            print(f"❌ HTTP {resp.status_code} for prefix {prefix}")
+            return None
+        return parse_jsonp(resp.text).get("stockInfo", []) or []
     except Exception as e:
-        print(f"⚠️ Error for code {code}: {e}")
+        print(f"⚠️ Error for prefix {prefix}: {e}")
+        return None
+
+
+class PrefixCache:
+    """prefix.do replies in the `_stock_prefix_cache` table, reused for ttl_hours."""
+
+    def __init__(self, db_path: str = DB_PATH, ttl_hours: float = CACHE_TTL_HOURS):
+        self.db_path = db_path
+        self.ttl_hours = ttl_hours
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(db_path, timeout=120) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS _stock_prefix_cache (
+                    prefix TEXT PRIMARY KEY, stock_info TEXT NOT NULL, fetched_at TEXT NOT NULL
+                )
+            """)
+
+    def load(self) -> dict[str, list]:
+        """prefix -> stockInfo for replies younger than the TTL."""
+        if self.ttl_hours <= 0:
+            return {}
+        cutoff = (datetime.now() - timedelta(hours=self.ttl_hours)).isoformat(timespec="seconds")
+        with sqlite3.connect(self.db_path, timeout=120) as conn:
+            rows = conn.execute("SELECT prefix, stock_info FROM _stock_prefix_cache WHERE fetched_at >= ?", (cutoff,))
+            return {prefix: json.loads(info) for prefix, info in rows}
+
+    def save(self, replies: dict[str, list]):
+        now = datetime.now().isoformat(timespec="seconds")
+        with sqlite3.connect(self.db_path, timeout=120) as conn:
+            conn.executemany("INSERT OR REPLACE INTO _stock_prefix_cache VALUES (?, ?, ?)",
+                             [(p, json.dumps(info), now) for p, info in replies.items()])
+
+
+# ===== Prefix planner =====
+def _span(targets: list[str], prefix: str) -> tuple[int, int]:
+    """Index range of the (sorted) targets starting with `prefix`."""
+    return bisect.bisect_left(targets, prefix), bisect.bisect_left(targets, prefix + "\x7f")
+
+
+def child_prefixes(prefix: str, targets: list[str]) -> list[str]:
+    """
+    Narrower queries covering the targets under `prefix`: one per next digit that
+    has targets, extended to the longest prefix those targets share (a lone
+    target is queried by its full code).
+    """
+    children = []
+    for digit in "0123456789":
+        lo, hi = _span(targets, prefix + digit)
+        if lo < hi:
+            children.append(os.path.commonprefix([targets[lo], targets[hi - 1]]))
+    return children
+
+
+def exact_query(code: str) -> str:
+    """Query for one code: zero-padded to CODE_DIGITS, so no longer code shares it."""
+    return code.zfill(CODE_DIGITS)
+
+
+def plan_queries(targets: list[str], fetch):
+    """
+    Walk the prefix trie over `targets` (sorted code strings without leading zeros)
+    level by level. fetch(prefixes) -> {prefix: stockInfo or None}. A full reply
+    (PREFIX_LIMIT entries) is split into child prefixes that still have targets
+    not seen in any reply; anything shorter covers its whole subtree. The children
+    of a full reply do not cover the prefix itself ("12" is in none of "120".."129"),
+    so a prefix that is a target missing from its reply gets an exact_query.
+    Yields (prefix, stockInfo) for every successful reply.
+    """
+    target_set = set(targets)
+    seen = set()
+    frontier = child_prefixes("", targets)
+    while frontier:
+        replies = fetch(frontier)
+        frontier = []
+        for prefix, info in replies.items():
+            if info is None:
+                continue  # failed: its subtree stays unresolved for this run
+            seen.update(str(int(item.get("code"))) for item in info)
+            yield prefix, info
+            if len(info) >= PREFIX_LIMIT:
+                if prefix in target_set and prefix not in seen and len(prefix) < CODE_DIGITS:
+                    frontier.append(exact_query(prefix))
+                for child in child_prefixes(prefix, targets):
+                    lo, hi = _span(targets, child)
+                    if any(t not in seen for t in targets[lo:hi]):
+                        frontier.append(child)
+
+
+def fetch_level(prefixes: list[str], cached: dict, max_workers: int) -> dict:
+    """Replies for one trie level: cached ones first, the rest from prefix.do in parallel."""
+    replies = {p: cached[p] for p in prefixes if p in cached}
+    METRICS.add("cache_hits", len(replies))
+    todo = [p for p in prefixes if p not in replies]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_prefix, p): p for p in todo}
+        for future in as_completed(futures):
+            replies[futures[future]] = future.result()
+    METRICS.add("api_calls", len(todo))
+    return replies
 
 # ===== Public API =====
 def run_scrape(input_path=DEFAULT_INPUT_PATH,
                output_full=DEFAULT_OUTPUT_FULL,
                output_partial=DEFAULT_OUTPUT_PARTIAL,
-               max_workers=DEFAULT_MAX_WORKERS) -> Path:
-    global results, seen_stockIds, seen_codes, codes_lock, ids_lock, results_lock
-    results = []
-    seen_stockIds = set()
-    seen_codes = set()
-    codes_lock = threading.Lock()
-    ids_lock = threading.Lock()
-    results_lock = threading.Lock()
-
+               max_workers=DEFAULT_MAX_WORKERS,
+               db_path=DB_PATH) -> Path:
+    """
+    Resolve the codes in input_path (one per line), or every code up to MAX_CODE
+    when input_path is None, and write the stock_code -> stockId mapping CSV.
+    """
     start_time = time.time()
-    if not input_path.exists():
-        raise FileNotFoundError(f"Input file not found: {input_path}")
+    if input_path is None:
+        codes = range(1, MAX_CODE + 1)
+        source = "the full code range"
+    else:
+        if not input_path.exists():
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+        with input_path.open("r", encoding="utf-8") as f:
+            codes = [int(line.strip()) for line in f if line.strip()]
+        source = str(input_path)
+    targets = sorted({str(c) for c in codes if c > 0})
 
-    with input_path.open("r", encoding="utf-8") as f:
-        raw_codes = [int(line.strip()) for line in f if line.strip()]
+    results = {}  # stockId -> row
+    cache = PrefixCache(db_path)
+    cached = cache.load()
+    queries = 0
+    print(f"🔎 Starting scrape for {len(targets)} codes from {source} ...")
+    try:
+        http_client.configure(pool_size=max_workers)
 
-    stock_codes = []
-    seen_tmp = set()
-    for c in raw_codes:
-        if c not in seen_tmp:
-            seen_tmp.add(c)
-            stock_codes.append(c)
+        def fetch(prefixes):
+            replies = fetch_level(prefixes, cached, max_workers)
+            fresh = {p: info for p, info in replies.items() if info is not None and p not in cached}
+            if fresh:
+                cache.save(fresh)
+                cached.update(fresh)
+            return replies
 
-    print(f"🔎 Starting scrape for {len(stock_codes)} codes from {input_path} ...")
-    try:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(fetch_stock_info, code) for code in stock_codes]
-            total = len(futures)
-            for i, _ in enumerate(as_completed(futures), start=1):
-                if i % 100 == 0 or i == total:
-                    with results_lock:
-                        print(f"Progress: {i}/{total} | Rows: {len(results)}")
+        for prefix, stock_info in plan_queries(targets, fetch):
+            queries += 1
+            for item in stock_info:
+                actual_code = int(item.get("code"))
+                results.setdefault(item.get("stockId"), {
+                    "stock_code": actual_code,
+                    "stockId": item.get("stockId"),
+                    "name": item.get("name"),
+                    "market": classify_market(actual_code)
+                })
+            if queries % 100 == 0:
+                print(f"Progress: {queries} prefixes | Rows: {len(results)}")
     except KeyboardInterrupt:
         print("\n⚠️ Interrupted by user. Saving partial results...")
     finally:
-        df = pd.DataFrame(results)
+        df = pd.DataFrame(list(results.values()))
         out_path = output_full if len(df) else output_partial
         df.to_csv(out_path, index=False)
+        METRICS.add("rows_out", len(df))
         elapsed = time.time() - start_time
-        print(f"\n✅ Done! Collected {len(df)} rows in {elapsed:.2f}s")
+        print(f"\n✅ Done! Collected {len(df)} rows from {queries} prefix queries in {elapsed:.2f}s")
         return out_path
 
 if __name__ == "__main__":
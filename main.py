@@ -1,4 +1,3 @@
-
 # ============================================================
 # main.py
 #
@@ -6,31 +5,29 @@
 # - Downloads and cleans HKEX data, pushes into SQLite database
 # - Downloads WRDS data, pushes into SQLite database
 # - Downloads WRDS data filtered by ISINs in HKEX, pushes into SQLite database
+#
+# Every stage declares the files and tables it reads and writes.
+# helpers/pipeline.py derives the dependency graph from those
+# declarations and runs independent stages concurrently.
 # ============================================================
 
-import runpy
+import argparse
 import time
 import os
-from contextlib import contextmanager, redirect_stdout, redirect_stderr
-from io import StringIO
 from pathlib import Path
 from dotenv import load_dotenv
 from loaders.db_loader_csv import csv_loader
 from loaders.db_loader_wrds import wrds_loader
 from loaders.db_run_sql import run_sql_file
 from loaders.db_to_file_loader import export_sql_file
+from helpers.pipeline import run_pipeline, run_script
+from helpers.build_manifest import BuildManifest
+from helpers.telemetry import RunLedger, print_comparison
 
 # ------------------------------------------------------------
-# Silent mode context manager
+# Silent mode (suppress output of loaders/scripts)
 # ------------------------------------------------------------
 SILENT_MODE = False  # set True to suppress output of loaders/scripts
-@contextmanager
-def suppress_output():
-    if SILENT_MODE:
-        with StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
-            yield
-    else:
-        yield
 
 # ------------------------------------------------------------
 # Load environment variables
@@ -40,34 +37,76 @@ DB_PATH = os.getenv("DB_PATH", "data/hongkong.db")  # fallback if .env not found
 OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "xlsx")  # csv, xlsx, or txt
 
 # ------------------------------------------------------------
-# Scripts to run (downloaders and data cleaners)
+# Concurrency and memory budget for the stage runner
 # ------------------------------------------------------------
+PIPELINE_MAX_THREADS = int(os.getenv("PIPELINE_MAX_THREADS", "8"))
+PIPELINE_MAX_PROCESSES = int(os.getenv("PIPELINE_MAX_PROCESSES", str(min(4, os.cpu_count() or 1))))
+PIPELINE_MEMORY_MB = int(os.getenv("PIPELINE_MEMORY_MB", "4096"))
+
+# ------------------------------------------------------------
+# Regression detection (run ledger in the SQLite DB)
+# ------------------------------------------------------------
+COMPARE_RUNS = int(os.getenv("PIPELINE_COMPARE_RUNS", "5"))            # previous runs in the median
+COMPARE_THRESHOLD_PCT = float(os.getenv("PIPELINE_COMPARE_PCT", "25"))  # flag stages this much slower
+
+# ------------------------------------------------------------
+# Scripts to run (downloaders and data cleaners)
+#   executor  : "thread" for network stages, "process" for pandas/PDF stages;
+#               the bronze and silver stages are "thread" stages so their tables
+#               are handed over in memory (helpers/artifacts.py) and written to
+#               disk in the background (main/GEM bronze parse in their own pool)
+#   memory_mb : budget reserved while the stage runs
+#   always_run: remote sources are always fetched; everything else is skipped
+#               when its inputs and code hash the same as in the last run
+# data/blobs/ (helpers/blob_store.py) and data/cache/ (helpers/workbook_cache.py)
+# are shared by several stages and safe to write concurrently, so they are not
+# declared as outputs
+# ------------------------------------------------------------
+ISIN_RAW = ["data/raw/isino.xls", "data/raw/isinsehk.xls", "data/raw/secstkorder.xls"]
+ISIN_NORMALIZED = ["data/normalized/isino.parquet", "data/normalized/isinsehk.parquet", "data/normalized/secstkorder.parquet"]
+
 scripts = [
-    "loaders/download_hkex_isino.py",
-    "loaders/download_hkex_listings.py",
-    "loaders/download_hkex_auditor_reports.py",
-    "loaders/download_hkex_auditor_pdfs.py",
-    "modules/hkex_xlsx_converter.py",
-    "modules/hkex_isino_bronze.py",
-    "modules/hkex_isino_stock_types.py",
-    "modules/hkex_isino_national_agencies.py",
-    "modules/hkex_main_bronze.py",
-    "modules/hkex_gem_bronze.py",
-    "modules/hkex_main_silver.py",
-    "modules/hkex_gem_silver.py",
+    {"script": "loaders/download_hkex_isino.py", "executor": "thread", "always_run": True, "memory_mb": 64,
+     "inputs": [], "outputs": ISIN_RAW},
+    {"script": "loaders/download_hkex_listings.py", "executor": "thread", "always_run": True, "memory_mb": 64,
+     "inputs": [], "outputs": ["data/raw/Main_*", "data/raw/GEM_*", "data/raw/listings_resolution.json"]},
+    {"script": "loaders/download_hkex_auditor_reports.py", "executor": "thread", "always_run": True, "memory_mb": 128,
+     "inputs": [], "outputs": ["data/raw/auditor_reports.csv", "data/raw/auditor_reports.htm"]},
+    {"script": "loaders/download_hkex_auditor_pdfs.py", "executor": "thread", "always_run": True, "memory_mb": 256,
+     "inputs": ["data/raw/auditor_reports.csv"], "outputs": ["data/raw/auditor_pdfs/"]},
+    {"script": "modules/hkex_xlsx_converter.py", "executor": "process", "memory_mb": 1024,
+     "inputs": ISIN_RAW + ["data/raw/Main_*", "data/raw/GEM_*"],
+     "outputs": ISIN_NORMALIZED + ["data/normalized/Main_*.parquet", "data/normalized/GEM_*.parquet",
+                                   "data/normalized/sheets/"]},
+    {"script": "modules/hkex_isino_bronze.py", "executor": "thread", "memory_mb": 512,
+     "inputs": ISIN_NORMALIZED, "outputs": ["data/bronze/isino_bronze.parquet"]},
+    {"script": "modules/hkex_isino_stock_types.py", "executor": "thread", "memory_mb": 256,
+     "inputs": ["data/normalized/isino.parquet"], "outputs": ["data/bronze/isino_stock_types.parquet"]},
+    {"script": "modules/hkex_isino_national_agencies.py", "executor": "thread", "memory_mb": 256,
+     "inputs": ["data/normalized/isino.parquet"], "outputs": ["data/bronze/isino_national_agencies.parquet"]},
+    {"script": "modules/hkex_main_bronze.py", "executor": "thread", "memory_mb": 512,
+     "inputs": ["data/normalized/Main_*.parquet"], "outputs": ["data/bronze/main_bronze.parquet"]},
+    {"script": "modules/hkex_gem_bronze.py", "executor": "thread", "memory_mb": 512,
+     "inputs": ["data/normalized/GEM_*.parquet"], "outputs": ["data/bronze/gem_bronze.parquet"]},
+    {"script": "modules/hkex_main_silver.py", "executor": "thread", "memory_mb": 512,
+     "inputs": ["data/bronze/main_bronze.parquet", "data/bronze/isino_bronze.parquet"], "outputs": ["data/silver/main_silver.parquet"]},
+    {"script": "modules/hkex_gem_silver.py", "executor": "thread", "memory_mb": 512,
+     "inputs": ["data/bronze/gem_bronze.parquet", "data/bronze/isino_bronze.parquet"], "outputs": ["data/silver/gem_silver.parquet"]},
 ]
 
 # ------------------------------------------------------------
-# Files and tables for CSV loader (pushes clean csv-files into SQLite Database)
+# Files and tables for CSV loader (pushes clean csv-files and typed Parquet tables into SQLite Database)
 # ------------------------------------------------------------
 CSV_LOADERS = [
-    {"csv_file": "data/silver/gem_silver.csv", "table_name": "hkex_gem"},
-    {"csv_file": "data/silver/main_silver.csv", "table_name": "hkex_main"},
-    {"csv_file": "data/bronze/isino_bronze.csv", "table_name": "hkex_isin"},
-    {"csv_file": "data/bronze/isino_stock_types.csv", "table_name": "desc_hkex_stock_types"},
-    {"csv_file": "data/bronze/isino_national_agencies.csv", "table_name": "desc_hkex_national_agencies"},
-    {"csv_file": "data/raw/auditor_reports.csv", "table_name": "hkex_auditor_reports"},
-    {"csv_file": "data/processed/auditor_opinion_flags.csv", "table_name": "auditor_opinion_flags"},
+    {"table_file": "data/silver/gem_silver.parquet", "table_name": "hkex_gem"},
+    {"table_file": "data/silver/main_silver.parquet", "table_name": "hkex_main"},
+    {"table_file": "data/bronze/isino_bronze.parquet", "table_name": "hkex_isin"},
+    {"table_file": "data/bronze/isino_stock_types.parquet", "table_name": "desc_hkex_stock_types"},
+    {"table_file": "data/bronze/isino_national_agencies.parquet", "table_name": "desc_hkex_national_agencies"},
+    # Append-only: keeps pdf_path updates made by rename_pdfs
+    {"table_file": "data/raw/auditor_reports.csv", "table_name": "hkex_auditor_reports",
+     "key_columns": ["stock_code", "announcement_date", "hyperlink"]},
+    {"table_file": "data/processed/auditor_opinion_flags.csv", "table_name": "auditor_opinion_flags"},
 ]
 
 # ------------------------------------------------------------
@@ -77,6 +116,7 @@ ISIN_EXPORT_QUERY_FILE = "models/db_export/select_union_hkex_isin.sql"
 ISIN_EXPORT_OUTPUT = "data/processed/isin_list.txt"
 STOCK_CODE_EXPORT_QUERY_FILE = "models/db_export/select_union_hkex_stock_code.sql"
 STOCK_CODE_EXPORT_OUTPUT = "data/processed/stock_code_list.txt"
+CODE_EXPORT_TABLES = ["table:hkex_gem", "table:hkex_isin", "table:hkex_main"]
 
 # ------------------------------------------------------------
 # WRDS loaders configuration (downloads data from WRDS and pushes into SQLite Database)
@@ -92,224 +132,269 @@ WRDS_LOADERS = [
 # DB dependent scripts (run after WRDS loaders)
 # ------------------------------------------------------------
 DB_DEPENDENT_SCRIPTS = [
-    "modules/auditor_opinion_flags.py",
-    "modules/rename_pdfs_by_stock_code.py",
+    {"script": "modules/auditor_opinion_flags.py", "executor": "process", "memory_mb": 512,
+     "inputs": ["table:hkex_auditor_reports", "data/raw/auditor_reports_sliced/"],
+     "outputs": ["data/processed/auditor_opinion_flags.csv"]},
+    {"script": "modules/rename_pdfs_by_stock_code.py", "executor": "thread", "memory_mb": 64, "locks": ["sqlite"],
+     "inputs": ["table:hkex_auditor_reports", "data/raw/auditor_pdfs/"],
+     "outputs": ["table:hkex_auditor_reports", "data/processed/auditor_pdfs/"]},
 ]
 
 # ------------------------------------------------------------
 # Database queries (table and view creation)
 # ------------------------------------------------------------
-# Order matters: create `hkex_all_stock_code_isin` first, then `hkex_dataset` and `hkex_document_dataset` which depend on it
+# Dependencies come from the declared tables: `hkex_all_stock_code_isin` is created
+# before `hkex_dataset` and `hkex_document_dataset`, which depend on it
 DB_QUERIES = [
-    "models/db_init/cv_hkex_all_stock_code_isin.sql",
-    "models/db_init/cv_hkex_dataset.sql",
-    "models/db_init/cv_hkex_document_dataset.sql",
-    "models/db_init/cv_non_match_funda_q_170.sql",    
-    "models/db_init/cv_non_match_hkex_isin.sql",
+    {"sql_file": "models/db_init/cv_hkex_all_stock_code_isin.sql",
+     "inputs": ["table:hkex_gem", "table:hkex_isin", "table:hkex_main"], "outputs": ["table:hkex_all_stock_code_isin"]},
+    {"sql_file": "models/db_init/cv_hkex_dataset.sql",
+     "inputs": ["table:funda_q_isin", "table:hkex_all_stock_code_isin"], "outputs": ["table:hkex_dataset"]},
+    {"sql_file": "models/db_init/cv_hkex_document_dataset.sql",
+     "inputs": ["table:auditor_opinion_flags", "table:hkex_all_stock_code_isin", "table:hkex_auditor_reports"],
+     "outputs": ["table:hkex_document_dataset"]},
+    {"sql_file": "models/db_init/cv_non_match_funda_q_170.sql",
+     "inputs": ["table:funda_q_170", "table:hkex_all_stock_code_isin"], "outputs": ["table:non_match_funda_q_170"]},
+    {"sql_file": "models/db_init/cv_non_match_hkex_isin.sql",
+     "inputs": ["table:funda_q_170", "table:hkex_all_stock_code_isin"], "outputs": ["table:non_match_hkex_isin"]},
 ]
 
 # ------------------------------------------------------------
 # Export Queries (export views/tables into folder data/processed. OUTPUT_FORMAT from environment variables)
 # ------------------------------------------------------------
 EXPORT_SQLS = [
-    "models/db_export/select_hkex_dataset.sql",
-    "models/db_export/select_hkex_document_dataset.sql",
-    "models/db_export/select_hkex_dataset_hkex_document_exists.sql",
-    "models/db_export/select_hkex_isin.sql",
-    "models/db_export/select_non_match_funda_q_170.sql",
-    "models/db_export/select_non_match_hkex_isin.sql",
+    {"sql_file": "models/db_export/select_hkex_dataset.sql", "inputs": ["table:hkex_dataset"]},
+    {"sql_file": "models/db_export/select_hkex_document_dataset.sql", "inputs": ["table:hkex_document_dataset"]},
+    {"sql_file": "models/db_export/select_hkex_dataset_hkex_document_exists.sql",
+     "inputs": ["table:hkex_dataset", "table:hkex_document_dataset"]},
+    {"sql_file": "models/db_export/select_hkex_isin.sql", "inputs": ["table:hkex_isin"]},
+    {"sql_file": "models/db_export/select_non_match_funda_q_170.sql", "inputs": ["table:non_match_funda_q_170"]},
+    {"sql_file": "models/db_export/select_non_match_hkex_isin.sql", "inputs": ["table:non_match_hkex_isin"]},
 ]
 
-# ------------------------------------------------------------
-# Main run
-# ------------------------------------------------------------
-print("\n🚀 Starting main run sequence...\n")
-results = []
-loader_results = []
-start_total = time.time()
 
 # ------------------------------------------------------------
-# Run scripts
+# Stage functions (raise on failure so the runner records it)
 # ------------------------------------------------------------
-for script in scripts:
-    print(f"▶️ {script}")
-    start = time.time()
-    try:
-        with suppress_output():
-            runpy.run_path(script, run_name="__main__")
-        elapsed = time.time() - start
-        print(f"✅ Done: {script} ({elapsed:.1f}s)")
-        results.append((script, "✅ Success", elapsed))
-    except Exception as e:
-        elapsed = time.time() - start
-        print(f"❌ Failed: {script} ({elapsed:.1f}s) → {e}")
-        results.append((script, f"❌ Failed ({e})", elapsed))
-    print("-" * 60)
+def load_csv(table_file, table_name, key_columns=None):
+    return csv_loader(table_file, table_name, db_path=DB_PATH, key_columns=key_columns)
 
-# ------------------------------------------------------------
-# Run CSV loaders
-# ------------------------------------------------------------
-print("\n📦 Starting CSV loaders...\n")
-for loader in CSV_LOADERS:
-    csv_file = loader["csv_file"]
-    table_name = loader["table_name"]
-    print(f"▶️ CSV Loader: {table_name}")
-    start = time.time()
-    try:
-        with suppress_output():
-            rows_loaded = csv_loader(csv_file, table_name, db_path=DB_PATH)
-        elapsed = time.time() - start
-        loader_results.append((f"CSV Loader: {table_name}", "✅ Success", rows_loaded, elapsed))
-        print(f"✅ Loaded {rows_loaded} rows into table '{table_name}' ({elapsed:.1f}s)\n")
-    except Exception as e:
-        elapsed = time.time() - start
-        loader_results.append((f"CSV Loader: {table_name}", f"❌ Failed ({e})", 0, elapsed))
-        print(f"❌ Failed CSV loader '{table_name}': {e}\n")
-    print("-" * 60)
 
-# ------------------------------------------------------------
-# Export ISIN list BEFORE WRDS loaders
-# ------------------------------------------------------------
-print("\n📄 Exporting unique ISINs...\n")
-start = time.time()
-try:
-    with suppress_output():
-        export_sql_file(ISIN_EXPORT_QUERY_FILE, db_path=DB_PATH, output_format='txt', output_file=ISIN_EXPORT_OUTPUT)
-    elapsed = time.time() - start
+def export_code_list(sql_file, output_file):
+    export_sql_file(sql_file, db_path=DB_PATH, output_format="txt", output_file=output_file)
     # Count lines in the file
-    with open(ISIN_EXPORT_OUTPUT, 'r') as f:
-        num_isins = len(f.readlines())
-    loader_results.append(("ISIN Export", "✅ Success", num_isins, elapsed))
-    print(f"✅ Exported {num_isins} ISINs to {ISIN_EXPORT_OUTPUT} ({elapsed:.1f}s)")
-except Exception as e:
-    elapsed = time.time() - start
-    loader_results.append(("ISIN Export", f"❌ Failed ({e})", 0, elapsed))
-    print(f"❌ ISIN export failed: {e}")
+    with open(output_file, "r") as f:
+        return len(f.readlines())
 
-# ------------------------------------------------------------
-# Export Stock Code list AFTER ISIN export
-# ------------------------------------------------------------
-print("\n📄 Exporting unique Stock Codes...\n")
-start = time.time()
-try:
-    with suppress_output():
-        export_sql_file(STOCK_CODE_EXPORT_QUERY_FILE, db_path=DB_PATH, output_format='txt', output_file=STOCK_CODE_EXPORT_OUTPUT)
-    elapsed = time.time() - start
-    # Count lines in the file
-    with open(STOCK_CODE_EXPORT_OUTPUT, 'r') as f:
-        num_stock_codes = len(f.readlines())
-    loader_results.append(("Stock Code Export", "✅ Success", num_stock_codes, elapsed))
-    print(f"✅ Exported {num_stock_codes} stock codes to {STOCK_CODE_EXPORT_OUTPUT} ({elapsed:.1f}s)")
-except Exception as e:
-    elapsed = time.time() - start
-    loader_results.append(("Stock Code Export", f"❌ Failed ({e})", 0, elapsed))
-    print(f"❌ Stock Code export failed: {e}")
 
-# ------------------------------------------------------------
-# Run WRDS loaders
-# ------------------------------------------------------------
-print("\n📦 Starting WRDS loaders...\n")
-for loader in WRDS_LOADERS:
-    sql_file = loader["sql_file"]
-    table_name = loader["table_name"]
-    isin_file = loader.get("isin_list_file")
-    print(f"▶️ WRDS Loader: {table_name}")
-    start = time.time()
-    try:
-        with suppress_output():
-            rows_loaded = wrds_loader(sql_file, table_name, db_path=DB_PATH, isin_list_file=isin_file)
-        elapsed = time.time() - start
-        if rows_loaded is None:
-            status = "❌ Failed"
-            rows_loaded = 0
-        else:
-            status = "✅ Success"
-        loader_results.append((f"WRDS Loader: {table_name}", status, rows_loaded, elapsed))
-        print(f"{status} ({rows_loaded} rows, {elapsed:.1f}s)\n")
-    except Exception as e:
-        elapsed = time.time() - start
-        loader_results.append((f"WRDS Loader: {table_name}", f"❌ Failed ({e})", 0, elapsed))
-        print(f"❌ Failed WRDS loader '{table_name}': {e}\n")
-    print("-" * 60)
+def load_wrds(sql_file, table_name, isin_list_file=None):
+    rows_loaded = wrds_loader(sql_file, table_name, db_path=DB_PATH, isin_list_file=isin_list_file)
+    if rows_loaded is None:
+        raise RuntimeError("no rows loaded")
+    return rows_loaded
+
+
+def run_query(sql_file):
+    if not run_sql_file(sql_file, db_path=DB_PATH):
+        raise RuntimeError("query failed")
+    return 0
+
+
+def export_view(sql_file):
+    export_sql_file(sql_file, db_path=DB_PATH, output_dir=Path("data/processed"), output_format=OUTPUT_FORMAT)
+    return 0
+
+
+def export_output_path(sql_file):
+    stem = Path(sql_file).stem
+    return f"data/processed/{stem.replace('select_', '')}.{OUTPUT_FORMAT}"
 
-# ------------------------------------------------------------
-# Run DB dependent scripts (after WRDS loaders)
-# ------------------------------------------------------------
-print("\n🔍 Running DB dependent scripts...\n")
-for script in DB_DEPENDENT_SCRIPTS:
-    print(f"▶️ {script}")
-    start = time.time()
-    try:
-        with suppress_output():
-            runpy.run_path(script, run_name="__main__")
-        elapsed = time.time() - start
-        print(f"✅ Done: {script} ({elapsed:.1f}s)")
-        results.append((script, "✅ Success", elapsed))
-    except Exception as e:
-        elapsed = time.time() - start
-        print(f"❌ Failed: {script} ({elapsed:.1f}s) → {e}")
-        results.append((script, f"❌ Failed ({e})", elapsed))
-    print("-" * 60)
 
 # ------------------------------------------------------------
-# Run database queries
+# Stage graph
 # ------------------------------------------------------------
-if DB_QUERIES:
-    print("\n📚 Running database queries...\n")
-    for sql_file in DB_QUERIES:
-        print(f"▶️ {sql_file}")
-        start = time.time()
-        with suppress_output():
-            success = run_sql_file(sql_file, db_path=DB_PATH)
-        elapsed = time.time() - start
-        status = "✅ Success" if success else "❌ Failed"
-        loader_results.append((f"Query: {Path(sql_file).name}", status, 0, elapsed))
-        print(f"{status} ({elapsed:.1f}s)\n")
-    print("-" * 60)
+def build_stages() -> list[dict]:
+    """Translate the configuration lists above into runner stages (order = original run order)."""
+    stages = []
+
+    def script_stage(entry):
+        return {
+            "name": entry["script"],
+            "group": "script",
+            "func": run_script,
+            "kwargs": {"path": entry["script"]},
+            "inputs": [entry["script"]] + entry.get("inputs", []),
+            "outputs": entry.get("outputs", []),
+            "executor": entry.get("executor", "thread"),
+            "memory_mb": entry.get("memory_mb", 256),
+            "locks": entry.get("locks", []),
+            "always_run": entry.get("always_run", False),
+        }
+
+    stages += [script_stage(entry) for entry in scripts]
+
+    for loader in CSV_LOADERS:
+        stages.append({
+            "name": f"CSV Loader: {loader['table_name']}",
+            "group": "loader",
+            "func": load_csv,
+            "kwargs": {"table_file": loader["table_file"], "table_name": loader["table_name"],
+                       "key_columns": loader.get("key_columns")},
+            "inputs": [loader["table_file"]],
+            "outputs": [f"table:{loader['table_name']}"],
+            "memory_mb": 256,
+            "locks": ["sqlite"],
+        })
+
+    for label, sql_file, output in (
+        ("ISIN Export", ISIN_EXPORT_QUERY_FILE, ISIN_EXPORT_OUTPUT),
+        ("Stock Code Export", STOCK_CODE_EXPORT_QUERY_FILE, STOCK_CODE_EXPORT_OUTPUT),
+    ):
+        stages.append({
+            "name": label,
+            "group": "loader",
+            "func": export_code_list,
+            "kwargs": {"sql_file": sql_file, "output_file": output},
+            "inputs": [sql_file] + CODE_EXPORT_TABLES,
+            "outputs": [output],
+            "memory_mb": 64,
+        })
+
+    for loader in WRDS_LOADERS:
+        isin_file = loader.get("isin_list_file")
+        stages.append({
+            "name": f"WRDS Loader: {loader['table_name']}",
+            "group": "loader",
+            "func": load_wrds,
+            "kwargs": {"sql_file": loader["sql_file"], "table_name": loader["table_name"], "isin_list_file": isin_file},
+            "inputs": [loader["sql_file"]] + ([isin_file] if isin_file else []),
+            "outputs": [f"table:{loader['table_name']}"],
+            "memory_mb": 1024,
+            "always_run": True,
+            # No "sqlite" lock: the WRDS query is long and remote; the final write waits on SQLite's busy timeout
+        })
+
+    stages += [script_stage(entry) for entry in DB_DEPENDENT_SCRIPTS]
+
+    for query in DB_QUERIES:
+        stages.append({
+            "name": f"Query: {Path(query['sql_file']).name}",
+            "group": "query",
+            "func": run_query,
+            "kwargs": {"sql_file": query["sql_file"]},
+            "inputs": [query["sql_file"]] + query["inputs"],
+            "outputs": query["outputs"],
+            "memory_mb": 64,
+            "locks": ["sqlite"],
+        })
+
+    for export in EXPORT_SQLS:
+        stages.append({
+            "name": f"Export: {export['sql_file']}",
+            "group": "export",
+            "func": export_view,
+            "kwargs": {"sql_file": export["sql_file"]},
+            "inputs": [export["sql_file"]] + export["inputs"],
+            "outputs": [export_output_path(export["sql_file"])],
+            "memory_mb": 512,
+        })
+
+    return stages
+
 
 # ------------------------------------------------------------
 # Summary
 # ------------------------------------------------------------
-print("\n" + "=" * 60)
-print("🏁 Run summary")
-print("=" * 60)
-max_len_scripts = max(len(str(s)) for s, _, _ in results)
-for script, status, _ in results:
-    print(f"{str(script).ljust(max_len_scripts)} {status}")
-if loader_results:
+def format_metrics(m: dict) -> str:
+    parts = []
+    if m.get("cpu_s") is not None:
+        parts.append(f"cpu {m['cpu_s']:.1f}s")
+    if m.get("peak_rss_mb") is not None:
+        parts.append(f"rss {m['peak_rss_mb']:.0f}MB")
+    if m.get("rows_out"):
+        parts.append(f"{m['rows_out']} rows")
+    if m.get("bytes_downloaded"):
+        parts.append(f"↓{m['bytes_downloaded'] / 1e6:.1f}MB")
+    if m.get("bytes_written"):
+        parts.append(f"↑{m['bytes_written'] / 1e6:.1f}MB")
+    return ", " + ", ".join(parts) if parts else ""
+
+
+def print_summary(results, start_total):
+    scripts_res = [r for r in results if r["group"] == "script"]
+    loaders_res = [r for r in results if r["group"] in ("loader", "query")]
+    exports_res = [r for r in results if r["group"] == "export"]
+
+    def status(r):
+        if r.get("skipped"):
+            return "⏩ Skipped (unchanged)"
+        return "✅ Success" if r["ok"] else f"❌ Failed ({r['error']})"
+
+    print("\n" + "=" * 60)
+    print("🏁 Run summary")
+    print("=" * 60)
+    if scripts_res:
+        max_len_scripts = max(len(r["name"]) for r in scripts_res)
+        for r in scripts_res:
+            print(f"{r['name'].ljust(max_len_scripts)} {status(r)} ({r['elapsed']:.1f}s{format_metrics(r['metrics'])})")
+    if loaders_res:
+        print("-" * 60)
+        max_len_loaders = max(len(r["name"]) for r in loaders_res)
+        for r in loaders_res:
+            rows = r["value"] if isinstance(r["value"], int) else 0
+            print(f"{r['name'].ljust(max_len_loaders)} {status(r)} ({rows} rows, {r['elapsed']:.1f}s)")
+    skipped_count = sum(1 for r in results if r.get("skipped"))
+    success_count = sum(1 for r in scripts_res if r["ok"])
+    fail_count = len(scripts_res) - success_count
+    loader_success = sum(1 for r in loaders_res if r["ok"])
+    loader_fail = len(loaders_res) - loader_success
+    query_success = sum(1 for r in loaders_res if r["group"] == "query" and r["ok"])
+    query_fail = sum(1 for r in loaders_res if r["group"] == "query" and not r["ok"])
+    export_fail = sum(1 for r in exports_res if not r["ok"])
     print("-" * 60)
-    max_len_loaders = max(len(s) for s, _, _, _ in loader_results)
-    for loader_name, status, rows, elapsed in loader_results:
-        print(f"{loader_name.ljust(max_len_loaders)} {status} ({rows} rows, {elapsed:.1f}s)")
-success_count = sum(1 for _, status, _ in results if "✅" in status)
-fail_count = len(results) - success_count
-loader_success = sum(1 for _, status, _, _ in loader_results if "✅" in status)
-loader_fail = len(loader_results) - loader_success
-query_success = sum(1 for loader_name, status, _, _ in loader_results if "Query:" in str(loader_name) and "✅" in str(status))
-query_fail = sum(1 for loader_name, status, _, _ in loader_results if "Query:" in str(loader_name) and "❌" in str(status))
-print("-" * 60)
-print(f"✅ Scripts successful: {success_count} ❌ Failed: {fail_count}")
-print(f"✅ Loaders successful: {loader_success} ❌ Failed: {loader_fail}")
-if query_success + query_fail > 0:
-    print(f"✅ Queries successful: {query_success} ❌ Failed: {query_fail}")
-print(f"⏱️ Total runtime: {time.time() - start_total:.1f}s")
-print("=" * 60 + "\n")
-if fail_count + loader_fail > 0:
-    print("⚠️ Some scripts/loaders failed. Please check the log above.\n")
+    print(f"✅ Scripts successful: {success_count} ❌ Failed: {fail_count}")
+    print(f"✅ Loaders successful: {loader_success} ❌ Failed: {loader_fail}")
+    if query_success + query_fail > 0:
+        print(f"✅ Queries successful: {query_success} ❌ Failed: {query_fail}")
+    if exports_res:
+        print(f"✅ Exports successful: {len(exports_res) - export_fail} ❌ Failed: {export_fail}")
+    if skipped_count:
+        print(f"⏩ Stages skipped (unchanged since last run): {skipped_count}")
+    print(f"⏱️ Total runtime: {time.time() - start_total:.1f}s")
+    print("=" * 60 + "\n")
+    if fail_count + loader_fail > 0:
+        print("⚠️ Some scripts/loaders failed. Please check the log above.\n")
+
 
 # ------------------------------------------------------------
-# Export views to CSV/XLSX
+# Main run
 # ------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the HKEX/WRDS pipeline.")
+    parser.add_argument("--force", action="store_true", help="Re-run every stage even if its inputs are unchanged.")
+    parser.add_argument("--compare", action="store_true", help="Report stage timings of the last run against previous runs and exit.")
+    parser.add_argument("--runs", type=int, default=COMPARE_RUNS, help="Number of previous runs for the median (default: %(default)s).")
+    parser.add_argument("--threshold", type=float, default=COMPARE_THRESHOLD_PCT, help="Percent slower that counts as a regression (default: %(default)s).")
+    args = parser.parse_args()
+
+    ledger = RunLedger(DB_PATH)
+    if args.compare:
+        report = ledger.compare("main", runs=args.runs, threshold_pct=args.threshold)
+        print_comparison(report, args.threshold)
+        raise SystemExit(1 if any(r["regressed"] for r in report) else 0)
 
-print("\n📤 Exporting views to CSV/XLSX...\n")
-for sql_file in EXPORT_SQLS:
-    print(f"▶ Export: {sql_file}")
-    start = time.time()
-    try:
-        with suppress_output():
-            export_sql_file(sql_file, db_path=DB_PATH, output_dir=Path("data/processed"), output_format=OUTPUT_FORMAT)
-        elapsed = time.time() - start
-        print(f"✅ Export completed ({elapsed:.1f}s)\n")
-    except Exception as e:
-        elapsed = time.time() - start
-        print(f"❌ Export failed for {sql_file}: {e} ({elapsed:.1f}s)\n")
\ No newline at end of file
+    print("\n🚀 Starting main run sequence...\n")
+    start_total = time.time()
+    results = run_pipeline(
+        build_stages(),
+        max_threads=PIPELINE_MAX_THREADS,
+        max_processes=PIPELINE_MAX_PROCESSES,
+        memory_budget_mb=PIPELINE_MEMORY_MB,
+        silent=SILENT_MODE,
+        manifest=BuildManifest(DB_PATH, run_id=ledger.run_id),
+        force=args.force,
+        ledger=ledger,
+    )
+    print_summary(results, start_total)
+    # Only flag regressions here; `python main.py --compare` prints the full report
+    print_comparison(ledger.compare("main", runs=args.runs, threshold_pct=args.threshold), args.threshold, only_regressions=True)
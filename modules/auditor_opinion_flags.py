@@ -13,6 +13,13 @@ import sqlite3
 import pandas as pd
 import re
 from pathlib import Path
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers.telemetry import StageMetrics
 
 # ------------------------------------------------------------
 # Configuration
@@ -21,6 +28,7 @@ DB_PATH = "data/hongkong.db"
 PDF_DIR = "data/raw/auditor_pdfs"
 TEXT_DIR = "data/raw/auditor_reports_sliced"
 OUTPUT_CSV = "data/processed/auditor_opinion_flags.csv"
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 # Regex patterns (case-insensitive). We prefer searching `.txt` files in TEXT_DIR;
 # fall back to PDF extraction when a `.txt` is missing.
@@ -153,6 +161,7 @@ def scan_opinions(stock_codes=None):
         working_df.to_csv(OUTPUT_CSV, index=False)
         
         processed_count += 1
+        METRICS.add("rows_out")
         
         # Progress output every 50 files
         if processed_count % 50 == 0:
@@ -1,13 +1,23 @@
 from pathlib import Path
 import pandas as pd
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import artifacts, parallel_parse, sheet_grid
+from helpers.table_regions import SheetMask, TableSpec
+from helpers.telemetry import StageMetrics
 
 
 # ----------------------------
 # Configuration
 # ----------------------------
 BASE_DIR = Path("./data/normalized")
-OUTPUT_PATH = Path("./data/bronze/gem_bronze.csv")
+OUTPUT_PATH = Path("./data/bronze/gem_bronze.parquet")
 OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 COLUMNS = [
     "source_file", "listing_date", "stock_code", "company", "offer_price", "subscription_ratio",
@@ -15,21 +25,28 @@ COLUMNS = [
     "place_of_incorporation", "listing_method", "sponsors", "reporting_accountant",
 ]
 
+# Sheet layout: title rows, the header row at row 9 (must hold >= 8 labels), one
+# sub-header row, then data to the end of the sheet (cut at the 'Total' row below)
+GEM_TABLE = TableSpec(min_cells=8, skip_rows=1, stop_column=None, header_row=9)
+
 
 # ----------------------------
 # Helper functions
 # ----------------------------
 def clean_and_transform(file_path: Path) -> pd.DataFrame:
     """Clean and standardize a single GEM listing Excel file."""
-    df_raw = pd.read_excel(file_path, engine="openpyxl", header=None)
+    df_raw = sheet_grid.read_sheet(file_path)
     df_raw = df_raw.replace(r'[\r\n]+', ' ', regex=True)
 
     # Locate header row and columns
-    header_row = df_raw.iloc[9].astype(str).str.strip()
+    region = SheetMask(df_raw).find(GEM_TABLE)
+    if region is None:
+        raise ValueError(f"{file_path.name}: no header at row {GEM_TABLE.header_row}.")
+    header_row = df_raw.iloc[region.header].astype(str).str.strip()
     valid_cols = [i for i, val in enumerate(header_row) if val and val.lower() != "nan"]
 
     # Extract data rows
-    df = df_raw.iloc[11:, valid_cols].reset_index(drop=True)
+    df = df_raw.iloc[region.rows, valid_cols].reset_index(drop=True)
     df.columns = header_row[valid_cols]
 
     # Stop before the 'Total' row
@@ -56,21 +73,24 @@ def clean_and_transform(file_path: Path) -> pd.DataFrame:
 
 
 def process_gem_bronze():
-    """Combine all GEM normalized Excel files into one bronze CSV."""
-    combined = pd.DataFrame(columns=COLUMNS)
-    any_skipped = False
-
-    files = sorted(BASE_DIR.glob("GEM_*.xlsx"))
+    """Combine all GEM normalized sheets into one bronze CSV."""
+    files = sorted(BASE_DIR.glob("GEM_*.parquet"))
     print(f"🔍 Found {len(files)} GEM files to process.")
 
-    for file in files:
-        try:
-            df_cleaned = clean_and_transform(file)
-            combined = pd.concat([combined, df_cleaned], ignore_index=True)
-        except Exception:
-            any_skipped = True
+    # Parsed in parallel; unchanged files come from the per-file cache
+    results, stats = parallel_parse.parse_files(files, "modules.hkex_gem_bronze:clean_and_transform", "gem")
+    print(f"⚙️ Parsed {stats['parsed']}, cached {stats['cached']}, failed {stats['failed']}")
+    for path, _, error in results:
+        if error is not None:
+            print(f"❌ {path.name}: {error}")
+    any_skipped = stats["failed"] > 0
+
+    # One concat in file order
+    frames = [df for _, df, _ in results if df is not None and not df.empty]
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
 
-    combined.to_csv(OUTPUT_PATH, index=False)
+    artifacts.publish(combined, OUTPUT_PATH)  # handed to the silver stage, written in the background
+    METRICS.add("rows_out", len(combined))
     print(f"✅ Combined {len(combined)} rows → {OUTPUT_PATH}")
 
     if any_skipped:
@@ -1,35 +1,38 @@
 from pathlib import Path
 import pandas as pd
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import artifacts
+from helpers.telemetry import StageMetrics
 
 
 # ----------------------------
 # Configuration
 # ----------------------------
-BRONZE_GEM = Path("data/bronze/gem_bronze.csv")
-BRONZE_ISINO = Path("data/bronze/isino_bronze.csv")
-OUTPUT_PATH = Path("data/silver/gem_silver.csv")
+BRONZE_GEM = Path("data/bronze/gem_bronze.parquet")
+BRONZE_ISINO = Path("data/bronze/isino_bronze.parquet")
+OUTPUT_PATH = Path("data/silver/gem_silver.parquet")
 OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 
 # ----------------------------
 # Helper functions
 # ----------------------------
 def load_bronze_data() -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Load GEM and ISINO bronze datasets."""
-    df_gem = pd.read_csv(BRONZE_GEM)
-    df_isino = pd.read_csv(BRONZE_ISINO)
+    """Load GEM and ISINO bronze datasets (typed: stock_code is Int32 in both)."""
+    df_gem = artifacts.fetch(BRONZE_GEM)
+    df_isino = artifacts.fetch(BRONZE_ISINO)
+    METRICS.add("rows_in", len(df_gem) + len(df_isino))
     print(f"📦 Loaded {BRONZE_GEM.name}: {len(df_gem)} rows")
     print(f"📦 Loaded {BRONZE_ISINO.name}: {len(df_isino)} rows")
     return df_gem, df_isino
 
 
-def prepare_for_join(df_gem: pd.DataFrame, df_isino: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Ensure stock_code columns are numeric in both datasets."""
-    df_gem["stock_code"] = pd.to_numeric(df_gem["stock_code"], errors="coerce").astype("Int64")
-    df_isino["stock_code"] = pd.to_numeric(df_isino["stock_code"], errors="coerce").astype("Int64")
-    return df_gem, df_isino
-
-
 def join_datasets(df_gem: pd.DataFrame, df_isino: pd.DataFrame) -> pd.DataFrame:
     """Inner join GEM bronze with ISINO bronze on stock_code."""
     df_joined = df_gem.merge(df_isino, on="stock_code", how="inner", suffixes=("", "_isino"))
@@ -39,7 +42,8 @@ def join_datasets(df_gem: pd.DataFrame, df_isino: pd.DataFrame) -> pd.DataFrame:
 
 def save_to_silver(df: pd.DataFrame):
     """Save joined dataset to silver layer."""
-    df.to_csv(OUTPUT_PATH, index=False)
+    artifacts.publish(df, OUTPUT_PATH)
+    METRICS.add("rows_out", len(df))
     print(f"✅ Saved to {OUTPUT_PATH}")
 
 
@@ -48,7 +52,6 @@ def save_to_silver(df: pd.DataFrame):
 # ----------------------------
 def process_gem_silver():
     df_gem, df_isino = load_bronze_data()
-    df_gem, df_isino = prepare_for_join(df_gem, df_isino)
     df_joined = join_datasets(df_gem, df_isino)
     save_to_silver(df_joined)
 
@@ -1,6 +1,15 @@
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import artifacts, workbook_cache
+from helpers.table_regions import TableSpec
+from helpers.telemetry import StageMetrics
 
 # ----------------------------
 # Configuration
@@ -8,10 +17,10 @@ import numpy as np
 pd.set_option("future.no_silent_downcasting", True)
 
 BASE_DIR = Path("./data/normalized")
-FILE_PATH = BASE_DIR / "isino.xlsx"
-FILE_PATH_SEHK = BASE_DIR / "isinsehk.xlsx"
-SEC_FILE_PATH = BASE_DIR / "secstkorder.xlsx"
-OUTPUT_PATH = Path("./data/bronze/isino_bronze.csv")
+FILE_PATH = BASE_DIR / "isino.parquet"
+FILE_PATH_SEHK = BASE_DIR / "isinsehk.parquet"
+SEC_FILE_PATH = BASE_DIR / "secstkorder.parquet"
+OUTPUT_PATH = Path("./data/bronze/isino_bronze.parquet")
 
 COLUMNS = [
     "company", "isin", "stock_code", "stock_type",
@@ -20,35 +29,23 @@ COLUMNS = [
 
 SEC_COLUMNS = ["stock_code", "hkex_co_name"]
 
+# Table layouts: header row (>= min_cells non-empty), data up to the first blank in column 0
+ISIN_TABLE = TableSpec(min_cells=3)
+SEC_TABLE = TableSpec(min_cells=2)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
+
 
 # ----------------------------
 # Shared cleaning function
 # ----------------------------
-def clean_and_transform_df(df_raw):
+def clean_and_transform_df(df_data):
     """
-    Clean and transform a DataFrame containing ONE table.
-    df_raw should already be trimmed down so the first table
-    begins at its first header row.
+    Clean and transform the data rows of ONE table: the rows after its
+    header row, up to the first blank in col 0 (ISIN_TABLE).
     """
-
-    # Detect first header row (>=3 non-empty cells)
-    start_row = None
-    for i, row in df_raw.iterrows():
-        if row.notna().sum() >= 3:
-            start_row = i
-            break
-
-    if start_row is None:
+    if df_data is None:
         raise ValueError("No valid data table found.")
 
-    # Skip the header row
-    df_data = df_raw.iloc[start_row + 1:].copy()
-
-    # Stop at first blank in col 0
-    stop_index = df_data[df_data.iloc[:, 0].isna()].index.min()
-    if pd.notna(stop_index):
-        df_data = df_data.loc[:stop_index - 1]
-
     # Trim to available columns (max 6)
     df_data = df_data.iloc[:, :6]
 
@@ -76,8 +73,7 @@ def clean_and_transform_df(df_raw):
 # ISINO file (normal)
 # ----------------------------
 def clean_and_transform(file_path):
-    df_raw = pd.read_excel(file_path, engine="openpyxl", header=None)
-    return clean_and_transform_df(df_raw)
+    return clean_and_transform_df(workbook_cache.load(file_path).table(0, ISIN_TABLE))
 
 
 # ----------------------------
@@ -85,35 +81,20 @@ def clean_and_transform(file_path):
 # ----------------------------
 def preprocess_sehk_and_clean(file_path):
     """
-    1. Load raw Excel
-    2. Find Table 1 header
-    3. Skip everything until blank row after table 1
-    4. Pass remaining DataFrame into shared clean function
+    1. Load the sheet and its table regions (parsed once, helpers/workbook_cache.py)
+    2. Find Table 1 and the blank row that ends it
+    3. Pass the table after it into the shared clean function
     """
-    df_raw = pd.read_excel(file_path, engine="openpyxl", header=None)
-
-    # Find header of table 1
-    first_header = None
-    for i, row in df_raw.iterrows():
-        if row.notna().sum() >= 3:
-            first_header = i
-            break
+    workbook = workbook_cache.load(file_path)
 
-    if first_header is None:
+    first_table = workbook.region(0, ISIN_TABLE)
+    if first_table is None:
         raise ValueError("ISINSEHK: Could not find first table header.")
-
-    # Find first blank after table 1
-    df_after_first = df_raw.iloc[first_header + 1:].copy()
-    blank_after_first = df_after_first[df_after_first.iloc[:, 0].isna()].index.min()
-
-    if pd.isna(blank_after_first):
+    if first_table.stop is None:
         raise ValueError("ISINSEHK: Could not find end of first table.")
 
-    # Slice everything AFTER the blank row
-    df_second_table_candidate = df_after_first.loc[blank_after_first + 1:].copy()
-
-    # Process as normal table
-    return clean_and_transform_df(df_second_table_candidate)
+    # Process the next table as normal
+    return clean_and_transform_df(workbook.table(1, ISIN_TABLE))
 
 
 # ----------------------------
@@ -123,26 +104,10 @@ def clean_and_transform_sec(file_path):
     """
     Clean the SEC stock name file (2-column table)
     """
-    df_raw = pd.read_excel(file_path, engine="openpyxl", header=None)
-
-    # Detect first row with >=2 non-empty cells
-    start_row = None
-    for i, row in df_raw.iterrows():
-        if row.notna().sum() >= 2:
-            start_row = i
-            break
-
-    if start_row is None:
+    df_data = workbook_cache.load(file_path).table(0, SEC_TABLE)
+    if df_data is None:
         raise ValueError("SEC table not found.")
 
-    # Skip header row
-    df_data = df_raw.iloc[start_row + 1:].copy()
-
-    # Stop at first blank row in column 0
-    stop_index = df_data[df_data.iloc[:, 0].isna()].index.min()
-    if pd.notna(stop_index):
-        df_data = df_data.loc[:stop_index - 1]
-
     # Take only first 2 columns
     df_data = df_data.iloc[:, :2]
 
@@ -180,8 +145,9 @@ def convert_isino():
         df_combined = df_combined.merge(df_sec, on="stock_code", how="left")
 
         # Step 4: Export
-        OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-        df_combined.to_csv(OUTPUT_PATH, index=False)
+        artifacts.publish(df_combined, OUTPUT_PATH)  # handed to the silver stages, written in the background
+        METRICS.add("rows_in", len(df_main) + len(df_sehk) + len(df_sec))
+        METRICS.add("rows_out", len(df_combined))
 
         print(f"✅ ISINO: {len(df_main)} rows")
         print(f"✅ ISINSEHK (2nd table): {len(df_sehk)} rows")
@@ -1,54 +1,52 @@
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import artifacts, workbook_cache
+from helpers.table_regions import TableSpec
+from helpers.telemetry import StageMetrics
 
 
 # ----------------------------
 # Configuration
 # ----------------------------
 BASE_DIR = Path("./data/normalized")
-FILE_PATH = BASE_DIR / "isino.xlsx"
+FILE_PATH = BASE_DIR / "isino.parquet"
 
-OUTPUT_PATH = Path("./data/bronze/isino_national_agencies.csv")
+OUTPUT_PATH = Path("./data/bronze/isino_national_agencies.parquet")
 OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 # Silence FutureWarning from pandas replace downcasting
 pd.set_option('future.no_silent_downcasting', True)
 
+# Sheet layout: the ISIN table (data up to the first blank in column 0), then after
+# blank rows a title row, a header row, and agency rows up to the first blank in column 1
+MAIN_TABLE = TableSpec(min_cells=3)
+AGENCY_TABLE = TableSpec(min_cells=1, skip_rows=1, stop_column=1)
+
 
 # ----------------------------
 # Main logic
 # ----------------------------
 def parse_national_agencies(file_path: Path) -> pd.DataFrame:
     """Extract national agency definitions from the ISINO Excel file."""
-    df_raw = pd.read_excel(file_path, engine="openpyxl", header=None)
-
-    # Find start of main table
-    start_row = next((i for i, row in df_raw.iterrows() if row.notna().sum() >= 3), None)
-    if start_row is None:
+    workbook = workbook_cache.load(file_path)  # shared parse and non-empty mask
+    main_table, agency_table = workbook.sheet.layout([MAIN_TABLE, AGENCY_TABLE])
+    if main_table is None:
         raise ValueError("Could not detect the start of the main table.")
-
-    # Find blank row after main data
-    df_after_header = df_raw.iloc[start_row + 1:]
-    stop_index = df_after_header[df_after_header.iloc[:, 0].isna()].index.min()
-    if pd.isna(stop_index):
+    if main_table.stop is None:
         raise ValueError("Could not find the blank row after the main data.")
-
-    # Skip blank rows to locate second table
-    pos = int(stop_index) + 1
-    while pos < len(df_raw) and df_raw.iloc[pos].isna().all():
-        pos += 1
-
-    header_idx = pos + 1
-    data_start = header_idx + 1
-    if header_idx >= len(df_raw) or data_start >= len(df_raw):
+    if agency_table is None or agency_table.data_start >= len(workbook.grid):
         raise ValueError("Second table header/data region not found where expected.")
 
-    # Pull first two columns and stop when col 2 is blank
-    data_block = df_raw.iloc[data_start:, :2].copy()
-    first_blank_col2 = data_block[data_block.iloc[:, 1].isna()].index.min()
-    if pd.notna(first_blank_col2):
-        data_block = data_block.loc[:first_blank_col2 - 1]
+    # Pull first two columns
+    data_block = workbook.grid.iloc[agency_table.rows, :2].copy()
 
     # Clean up
     data_block = data_block.dropna(how="all", subset=[0, 1])
@@ -64,7 +62,8 @@ def parse_national_agencies(file_path: Path) -> pd.DataFrame:
 def extract_national_agencies():
     """Wrapper: parse and save national agency definitions."""
     df_out = parse_national_agencies(FILE_PATH)
-    df_out.to_csv(OUTPUT_PATH, index=False)
+    artifacts.publish(df_out, OUTPUT_PATH)
+    METRICS.add("rows_out", len(df_out))
     print(f"✅ Parsed {len(df_out)} national agency entries → {OUTPUT_PATH}")
 
 
@@ -1,15 +1,24 @@
 from pathlib import Path
 import pandas as pd
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import artifacts, workbook_cache
+from helpers.telemetry import StageMetrics
 
 
 # ----------------------------
 # Configuration
 # ----------------------------
 BASE_DIR = Path("./data/normalized")
-FILE_PATH = BASE_DIR / "isino.xlsx"
+FILE_PATH = BASE_DIR / "isino.parquet"
 
-OUTPUT_PATH = Path("./data/bronze/isino_stock_types.csv")
+OUTPUT_PATH = Path("./data/bronze/isino_stock_types.parquet")
 OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 
 # ----------------------------
@@ -17,7 +26,7 @@ OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 # ----------------------------
 def extract_stock_types():
     """Extract stock type definitions from the ISINO Excel file."""
-    df_raw = pd.read_excel(FILE_PATH, engine="openpyxl", header=None)
+    df_raw = workbook_cache.load(FILE_PATH).grid  # parsed once, shared with the other ISINO modules
 
     # Row 17 (index 16) contains the stock type definitions
     stock_type_row = str(df_raw.iloc[16, 0]).strip()
@@ -44,8 +53,9 @@ def extract_stock_types():
     # Create DataFrame
     df_types = pd.DataFrame(parsed, columns=["stock_type", "description"])
 
-    # Save to CSV
-    df_types.to_csv(OUTPUT_PATH, index=False)
+    # Hand over (typed Parquet written in the background)
+    artifacts.publish(df_types, OUTPUT_PATH)
+    METRICS.add("rows_out", len(df_types))
 
     print(f"✅ Parsed {len(df_types)} stock type entries → {OUTPUT_PATH}")
 
@@ -1,14 +1,23 @@
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import artifacts, parallel_parse, sheet_grid
+from helpers.telemetry import StageMetrics
 
 
 # ----------------------------
 # Configuration
 # ----------------------------
 BASE_DIR = Path("./data/normalized")
-OUTPUT_PATH = Path("./data/bronze/main_bronze.csv")
+OUTPUT_PATH = Path("./data/bronze/main_bronze.parquet")
 OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 COLUMNS = [
     "source_file", "stock_code", "company", "prospectus_date", "listing_date",
@@ -23,9 +32,35 @@ pd.set_option('future.no_silent_downcasting', True)
 # ----------------------------
 # Helper functions
 # ----------------------------
+def fill_continuation_codes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give (b)/(c) offer rows (last column) the stock_code (column 1) of their (a) row:
+    a (b)/(c) row right after an (a) row takes that row's code, a (c) row right after
+    a (b) row takes the code two rows up. Codes are resolved through chains of
+    continuation rows by pointer jumping instead of a row-by-row loop.
+    """
+    offer = df.iloc[:, -1].astype(str).str.strip().to_numpy()
+    pos = np.arange(len(df))
+    prev = np.concatenate([[""], offer[:-1]]) if len(df) else offer
+    continuation = np.isin(offer, ["(b)", "(c)"]) & (pos > 0)
+    after_a = continuation & (prev == "(a)")
+    after_b = continuation & ~after_a & (offer == "(c)") & (prev == "(b)") & (pos > 1)
+
+    source = pos.copy()
+    source[after_a] -= 1
+    source[after_b] -= 2
+    while not np.array_equal(source[source], source):
+        source = source[source]
+
+    if (source != pos).any():
+        df = df.copy()
+        df.iloc[:, 1] = df.iloc[:, 1].to_numpy()[source]
+    return df
+
+
 def clean_and_transform(file_path: Path) -> pd.DataFrame:
     """Clean and standardize a single Main Board listing file."""
-    df = pd.read_excel(file_path, engine="openpyxl", header=None, skiprows=1)
+    df = sheet_grid.read_sheet(file_path).iloc[1:].reset_index(drop=True)  # skip the title row
     df = df.iloc[:, :11]
     df = df.iloc[1:]  # Trim away the first row
 
@@ -49,14 +84,7 @@ def clean_and_transform(file_path: Path) -> pd.DataFrame:
 
     # Fill stock_code for continuation rows (offer types b/c)
     if df.shape[1] >= 11:
-        for i in range(len(df)):
-            offer_type = str(df.iloc[i, -1]).strip()
-            prev_offer = str(df.iloc[i - 1, -1]).strip() if i > 0 else ""
-            if offer_type in ("(b)", "(c)") and i > 0:
-                if prev_offer == "(a)":
-                    df.iat[i, 1] = df.iat[i - 1, 1]
-                elif offer_type == "(c)" and prev_offer == "(b)" and i > 1:
-                    df.iat[i, 1] = df.iat[i - 2, 1]
+        df = fill_continuation_codes(df)
 
     # Drop first column (index) and insert source_file
     if df.shape[1] > 1:
@@ -76,35 +104,38 @@ def clean_and_transform(file_path: Path) -> pd.DataFrame:
     return df
 
 
-def process_main_bronze():
-    """Combine all Main Board normalized Excel files into one bronze CSV."""
-    combined = None
-    any_skipped = False
+def parse_file(file_path: Path) -> pd.DataFrame:
+    """One year file, ready to combine (run in worker processes by parallel_parse)."""
+    df_cleaned = clean_and_transform(file_path)
+
+    # Drop all-NaN columns defensively
+    return df_cleaned.dropna(axis=1, how="all")
 
-    files = sorted(BASE_DIR.glob("Main_*.xlsx"))
-    print(f"🔍 Found {len(files)} files to process.")
 
-    for file in files:
-        try:
-            df_cleaned = clean_and_transform(file)
+def process_main_bronze():
+    """Combine all Main Board normalized sheets into one bronze CSV."""
+    files = sorted(BASE_DIR.glob("Main_*.parquet"))
+    print(f"🔍 Found {len(files)} files to process.")
 
-            # Drop all-NaN columns defensively
-            df_cleaned = df_cleaned.dropna(axis=1, how="all")
+    # Parsed in parallel; unchanged files come from the per-file cache
+    results, stats = parallel_parse.parse_files(files, "modules.hkex_main_bronze:parse_file", "main")
+    print(f"⚙️ Parsed {stats['parsed']}, cached {stats['cached']}, failed {stats['failed']}")
+    for path, _, error in results:
+        if error is not None:
+            print(f"❌ {path.name}: {error}")
+    any_skipped = stats["failed"] > 0
 
-            # ✅ Avoid concat with empty DataFrame (prevents FutureWarning)
-            if combined is None:
-                combined = df_cleaned
-            else:
-                combined = pd.concat([combined, df_cleaned], ignore_index=True)
-        except Exception:
-            any_skipped = True
+    # One concat in file order (✅ empty frames left out: prevents FutureWarning)
+    frames = [df for _, df, _ in results if df is not None and not df.empty]
+    combined = pd.concat(frames, ignore_index=True) if frames else None
 
     # Handle case where no files were successfully processed
     if combined is None or combined.empty:
         print("⚠️ No valid data processed; no file saved.")
         return
 
-    combined.to_csv(OUTPUT_PATH, index=False)
+    artifacts.publish(combined, OUTPUT_PATH)  # handed to the silver stage, written in the background
+    METRICS.add("rows_out", len(combined))
     print(f"✅ Combined {len(combined)} rows → {OUTPUT_PATH}")
 
     if any_skipped:
@@ -1,14 +1,23 @@
 from pathlib import Path
 import pandas as pd
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import artifacts
+from helpers.telemetry import StageMetrics
 
 
 # ----------------------------
 # Configuration
 # ----------------------------
-BRONZE_MAIN = Path("data/bronze/main_bronze.csv")
-BRONZE_ISINO = Path("data/bronze/isino_bronze.csv")
-OUTPUT_PATH = Path("data/silver/main_silver.csv")
+BRONZE_MAIN = Path("data/bronze/main_bronze.parquet")
+BRONZE_ISINO = Path("data/bronze/isino_bronze.parquet")
+OUTPUT_PATH = Path("data/silver/main_silver.parquet")
 OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 
 # ----------------------------
@@ -16,49 +25,47 @@ OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 # ----------------------------
 def load_bronze_data() -> pd.DataFrame:
     """Load the main bronze dataset."""
-    df = pd.read_csv(BRONZE_MAIN)
+    df = artifacts.fetch(BRONZE_MAIN)
+    METRICS.add("rows_in", len(df))
     print(f"📦 Loaded {BRONZE_MAIN.name}: {len(df)} rows")
     return df
 
 
 def merge_offer_rows(df: pd.DataFrame) -> pd.DataFrame:
-    """Merge (b) and (c) offer rows into their corresponding (a) parent rows."""
+    """
+    Merge (b) and (c) offer rows into their corresponding (a) parent rows.
+    A (b)/(c) row's parent is the nearest earlier row with the same stock_code
+    (groupby + shift); its funds go to funds_raised_intl / funds_raised_sg there
+    (the latest one wins) and the row is dropped. Other rows keep theirs as
+    funds_raised_hk.
+    """
     df["funds_raised_hk"] = None
     df["funds_raised_intl"] = None
     df["funds_raised_sg"] = None
 
-    rows_to_drop = []
-
-    for i in range(len(df)):
-        location = str(df.loc[i, "offer_location"]).strip()
-        funds = df.loc[i, "funds_raised"]
-
-        if location in ("(b)", "(c)"):
-            for j in range(i - 1, -1, -1):
-                if df.loc[j, "stock_code"] == df.loc[i, "stock_code"]:
-                    if location == "(b)":
-                        df.at[j, "funds_raised_intl"] = funds
-                    elif location == "(c)":
-                        df.at[j, "funds_raised_sg"] = funds
-                    rows_to_drop.append(i)
-                    break
-        else:
-            df.at[i, "funds_raised_hk"] = funds
-
-    df = df.drop(rows_to_drop).drop(columns=["funds_raised", "offer_location"])
+    location = df["offer_location"].astype(str).str.strip()
+    parent = df.index.to_series().groupby(df["stock_code"]).shift(1)
+    continuation = location.isin(["(b)", "(c)"])
+    merged = continuation & parent.notna()
+
+    df.loc[~continuation, "funds_raised_hk"] = df.loc[~continuation, "funds_raised"]
+    for offer, column in (("(b)", "funds_raised_intl"), ("(c)", "funds_raised_sg")):
+        rows = merged & (location == offer)
+        moves = pd.DataFrame({"parent": parent[rows].astype(int), "funds": df.loc[rows, "funds_raised"]})
+        moves = moves.drop_duplicates("parent", keep="last")
+        df.loc[moves["parent"].to_numpy(), column] = moves["funds"].to_numpy()
+
+    df = df[~merged].drop(columns=["funds_raised", "offer_location"])
     print(f"🧹 Merged offer rows → {len(df)} remaining")
     return df
 
 
 def join_with_isino(df: pd.DataFrame) -> pd.DataFrame:
     """Join main bronze data with ISINO bronze data."""
-    df_isino = pd.read_csv(BRONZE_ISINO)
+    df_isino = artifacts.fetch(BRONZE_ISINO)  # stock_code is Int32 on both sides
+    METRICS.add("rows_in", len(df_isino))
     print(f"📦 Loaded {BRONZE_ISINO.name}: {len(df_isino)} rows")
 
-    # Ensure numeric stock_code
-    df["stock_code"] = pd.to_numeric(df["stock_code"], errors="coerce").astype("Int64")
-    df_isino["stock_code"] = pd.to_numeric(df_isino["stock_code"], errors="coerce").astype("Int64")
-
     df_joined = df.merge(df_isino, on="stock_code", how="inner", suffixes=("", "_isino"))
     print(f"🔗 Joined datasets: {len(df_joined)} rows (−{len(df) - len(df_joined)} lost)")
     return df_joined
@@ -66,7 +73,8 @@ def join_with_isino(df: pd.DataFrame) -> pd.DataFrame:
 
 def save_to_silver(df: pd.DataFrame):
     """Save final cleaned and joined dataset to silver layer."""
-    df.to_csv(OUTPUT_PATH, index=False)
+    artifacts.publish(df, OUTPUT_PATH)
+    METRICS.add("rows_out", len(df))
     print(f"✅ Saved to {OUTPUT_PATH}")
 
 
@@ -1,31 +1,44 @@
+# ============================================================
+# hkex_xlsx_converter.py
+#
+# Normalizes the raw HKEX workbooks (data/raw/*.xls, *.xlsx) once: every sheet's
+# cell grid is stored as Parquet in data/normalized/ (helpers/sheet_grid.py),
+# which the bronze modules read instead of re-parsing Excel.
+# ============================================================
+
 from pathlib import Path
-import pandas as pd
+import sys
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import excel_reader, sheet_grid
+from helpers.telemetry import StageMetrics
 
 # ----------------------------
 # Configuration
 # ----------------------------
 RAW_DIR = Path("./data/raw")
-OUT_DIR = Path("./data/normalized")
+OUT_DIR = sheet_grid.NORMALIZED_DIR
 OUT_DIR.mkdir(parents=True, exist_ok=True)
+METRICS = StageMetrics()  # picked up by the pipeline runner (helpers/telemetry.py)
 
 # ----------------------------
 # Helper functions
 # ----------------------------
 def read_excel_file(file_path: Path):
-    """Read Excel file using openpyxl first, fallback to xlrd for old .xls."""
+    """Read every sheet (name -> DataFrame) with the first engine that can (helpers/excel_reader.py)."""
     try:
-        return pd.read_excel(file_path, header=None, engine="openpyxl")
+        return excel_reader.read_excel(file_path, sheet_name=None)
     except Exception:
-        try:
-            return pd.read_excel(file_path, header=None, engine="xlrd")
-        except Exception:
-            return None
+        return None
 
 # ----------------------------
 # Main process
 # ----------------------------
 def normalize_excel_files():
-    """Convert all Excel files in raw_dir into clean .xlsx files with summary output."""
+    """Convert all Excel files in raw_dir into Parquet sheet grids with summary output."""
     files = sorted(list(RAW_DIR.glob("*.xls")) + list(RAW_DIR.glob("*.xlsx")))
     if not files:
         print("⚠️  No Excel files found in ./data/raw — skipping normalization.")
@@ -38,18 +51,28 @@ def normalize_excel_files():
             summary["skipped"] += 1
             continue
 
-        target = OUT_DIR / (f.stem + ".xlsx")
-        if target.exists():
+        target = sheet_grid.sheet_path(f.stem, 0, OUT_DIR)
+        # Re-convert when the raw file was re-downloaded after the last conversion
+        if target.exists() and target.stat().st_mtime >= f.stat().st_mtime:
             summary["cached"] += 1
             continue
 
-        df = read_excel_file(f)
-        if df is None:
+        sheets = read_excel_file(f)
+        if not sheets:
             summary["failed"] += 1
             continue
 
         try:
-            df.to_excel(target, index=False, header=False)
+            # Drop sheet files left over from an earlier download with more sheets
+            index = len(sheets)
+            while (stale := sheet_grid.sheet_path(f.stem, index, OUT_DIR)).exists():
+                stale.unlink()
+                index += 1
+
+            # First sheet last: its file marks the workbook as converted
+            for index, df in reversed(list(enumerate(sheets.values()))):
+                sheet_grid.write_sheet(df, sheet_grid.sheet_path(f.stem, index, OUT_DIR))
+                METRICS.add("rows_out", len(df))
             summary["converted"] += 1
         except Exception:
             summary["failed"] += 1
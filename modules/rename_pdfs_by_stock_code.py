@@ -4,14 +4,22 @@ rename_pdfs_by_stock_code.py
 
 Renames PDF files in data/raw/auditor_pdfs to include stock_code prefix
 and updates the pdf_path in hkex_auditor_reports table accordingly.
+The renamed files are hardlinks to the same blob in the blob store
+(helpers/blob_store.py), so the corpus is not stored twice.
 Run this once after backing up the database and PDF folder.
 """
 
 import os
 import sqlite3
-import shutil
 import sys
 import re
+from pathlib import Path
+
+# Ensure project root in sys.path (helpers imports when run directly)
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers.blob_store import BlobStore
 
 DB_PATH = "data/hongkong.db"
 PDF_DIR = "data/raw/auditor_pdfs"
@@ -25,6 +33,7 @@ def rename_pdfs():
     os.makedirs(PDF_DIR, exist_ok=True)
     os.makedirs(RENAMED_DIR, exist_ok=True)
     
+    store = BlobStore(db_path=DB_PATH)
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
@@ -34,6 +43,7 @@ def rename_pdfs():
     
     renamed_count = 0
     skipped_count = 0
+    updates = []  # (new_pdf_path, pdf_path)
     for row in rows:
         stock_code, pdf_path, document_name = row
         filename = os.path.basename(pdf_path)
@@ -50,27 +60,29 @@ def rename_pdfs():
             new_filename = f"[c{stock_code}]-[{date}]-[{remaining_stem}]-[{stem}]{extension}"
             new_pdf_path = os.path.join("data", "processed", "auditor_pdfs", new_filename).replace(os.sep, "/")
             
-            # Copy file if it exists (keep original)
+            # Link file if it exists (keep original; both names share one blob)
             old_full_path = os.path.join(PDF_DIR, filename)
             new_full_path = os.path.join(RENAMED_DIR, new_filename)
             if os.path.exists(new_full_path):
                 skipped_count += 1
                 continue
             if os.path.exists(old_full_path):
-                shutil.copy(old_full_path, new_full_path)
+                store.link(old_full_path, new_full_path)
                 if os.path.exists(new_full_path):
-                    print(f"📁 Copied: {filename} -> {new_filename}")
-                    # Update DB
-                    cursor.execute("UPDATE hkex_auditor_reports SET pdf_path = ? WHERE pdf_path = ?", (new_pdf_path, pdf_path))
+                    print(f"📁 Linked: {filename} -> {new_filename}")
+                    updates.append((new_pdf_path, pdf_path))
                     renamed_count += 1
                 else:
-                    print(f"❌ Failed to copy: {filename}")
+                    print(f"❌ Failed to link: {filename}")
             else:
                 print(f"⚠️ Source file not found: {old_full_path}")
     
+    # Update DB once all links are made: store.link() writes _blob_catalog on its
+    # own connection, which would block on an open write transaction here
+    cursor.executemany("UPDATE hkex_auditor_reports SET pdf_path = ? WHERE pdf_path = ?", updates)
     conn.commit()
     conn.close()
-    print(f"✅ Copied {renamed_count} PDFs to {RENAMED_DIR}.")
+    print(f"✅ Linked {renamed_count} PDFs to {RENAMED_DIR}.")
     if skipped_count > 0:
         print(f"⏭️ Skipped {skipped_count} already existing files.")
     return True
@@ -8,12 +8,15 @@
 #   1) (Optional) Run stock_id scraper to produce CSV
 #   2) Load the produced CSV into SQLite table: stock_code_to_id
 #   3) Export all stockIds from DB into a text file (one per line)
-#   4a) Build pending query list from full + ignore (skip existing CSVs)
-#   4) Download press releases for pending IDs (auto-update ignore list)
+#   4a) Build pending query list from full + ignore (skip stocks already
+#       stored, or refresh them incrementally with PRESS_REFRESH_EXISTING=1)
+#   4) Download press releases for pending IDs into the press_releases
+#      table of DB_PATH (auto-update ignore list)
 #
 # Keep this file in the hongkong/ folder (project root).
 # ============================================================
 
+import argparse
 import os
 import time
 from pathlib import Path
@@ -22,11 +25,13 @@ from dotenv import load_dotenv
 # ------------------------------------------------------------
 # Imports (project modules)
 # ------------------------------------------------------------
+from loaders import stock_id_api_scraper
 from loaders.stock_id_api_scraper import run_scrape
 from loaders.db_loader_csv import csv_loader
 from helpers.export_stock_ids import export_stock_ids
 from loaders import download_hkex_press_release as pressdl
 from helpers.query_list_builder import build_query_list, update_ignore_from_summary
+from helpers.telemetry import RunLedger, measure, print_comparison
 
 # ------------------------------------------------------------
 # Environment & configuration
@@ -42,11 +47,20 @@ FULL_IDS_FILE    = os.getenv("PRESS_STOCK_IDS_FILE", "data/lists/stock_ids.txt")
 IGNORE_IDS_FILE  = os.getenv("PRESS_IGNORE_IDS_FILE", "data/lists/ignore_ids.txt")
 PENDING_IDS_FILE = os.getenv("PRESS_PENDING_IDS_FILE", "data/lists/pending_ids.txt")
 
-# Press data folder and summary
+# Press data folder (legacy per-ID CSVs) and summary
 SAVE_DIR         = os.getenv("PRESS_SAVE_DIR", "data/press")
 SUMMARY_CSV      = os.getenv("PRESS_SUMMARY_CSV", "data/press/press_summary.csv")
 
+# Daily refresh: re-query stocks that are already stored; the downloader only
+# fetches filings newer than the ones stored (PRESS_INCREMENTAL, on by default)
+PRESS_REFRESH_EXISTING = os.getenv("PRESS_REFRESH_EXISTING", "0") in ("1", "true", "True")
+
+# Press releases are stored in DB_PATH (press_releases + press_manifest tables)
+pressdl.DB_PATH = os.getenv("PRESS_DB_PATH") or DB_PATH
+
 # Concurrency control for Step 4
+# PRESS_MAX_WORKERS is only the starting point; the downloader adapts it (AIMD)
+# up to PRESS_MAX_CONCURRENCY based on latency and 429/5xx responses.
 PRESS_MAX_WORKERS = os.getenv("PRESS_MAX_WORKERS")
 if PRESS_MAX_WORKERS:
     try:
@@ -73,7 +87,9 @@ def step_3_export():
 def step_4a_build_pending():
     """
     Build pending query list from FULL_IDS_FILE and IGNORE_IDS_FILE.
-    Also skips IDs that already have per-ID CSVs in SAVE_DIR.
+    Also skips IDs already in the press store (or with legacy per-ID CSVs in
+    SAVE_DIR), unless PRESS_REFRESH_EXISTING is set (then those are refreshed
+    incrementally).
     """
     totals = build_query_list(
         full_list_file=FULL_IDS_FILE,
@@ -82,6 +98,8 @@ def step_4a_build_pending():
         skip_existing=True,
         existing_save_dir=SAVE_DIR,
         existing_pattern="press_releases_*.csv",
+        refresh_existing=PRESS_REFRESH_EXISTING,
+        existing_db_path=pressdl.DB_PATH,
     )
     print(f"ℹ️ Build pending: full={totals[0]} ignore={totals[1]} existing={totals[2]} pending={totals[3]}")
     return totals[3]
@@ -112,35 +130,57 @@ def step_4_download_and_update():
 
 # ------------------------------------------------------------
 # Steps to run (comment/uncomment to run a subset)
+#   third element: module METRICS (helpers/telemetry.py) the step reports into
 # ------------------------------------------------------------
 STEPS = [
-    ("Step 1: stock_id scraper", step_1_scrape),
-    ("Step 2: load CSV -> SQLite", step_2_load),
-    ("Step 3: export stockIds -> text file", step_3_export),
-    ("Step 4a: build pending list", step_4a_build_pending),
-    ("Step 4: download & auto-update ignore list", step_4_download_and_update),
+    ("Step 1: stock_id scraper", step_1_scrape, stock_id_api_scraper.METRICS),
+    ("Step 2: load CSV -> SQLite", step_2_load, None),
+    ("Step 3: export stockIds -> text file", step_3_export, None),
+    ("Step 4a: build pending list", step_4a_build_pending, None),
+    ("Step 4: download & auto-update ignore list", step_4_download_and_update, pressdl.METRICS),
 ]
 
+# Regression detection against previous runs (run ledger in the SQLite DB)
+COMPARE_RUNS = int(os.getenv("PIPELINE_COMPARE_RUNS", "5"))
+COMPARE_THRESHOLD_PCT = float(os.getenv("PIPELINE_COMPARE_PCT", "25"))
+
 # ------------------------------------------------------------
 # Main run
 # ------------------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the PRESS workflow.")
+    parser.add_argument("--compare", action="store_true", help="Report step timings of the last run against previous runs and exit.")
+    parser.add_argument("--runs", type=int, default=COMPARE_RUNS, help="Number of previous runs for the median (default: %(default)s).")
+    parser.add_argument("--threshold", type=float, default=COMPARE_THRESHOLD_PCT, help="Percent slower that counts as a regression (default: %(default)s).")
+    args = parser.parse_args()
+
+    ledger = RunLedger(DB_PATH)
+    if args.compare:
+        report = ledger.compare("press", runs=args.runs, threshold_pct=args.threshold)
+        print_comparison(report, args.threshold)
+        raise SystemExit(1 if any(r["regressed"] for r in report) else 0)
+
     print("\n🚀 Starting PRESS workflow...\n")
     start_total = time.time()
     results = []
 
-    for name, func in STEPS:
+    for name, func, step_metrics in STEPS:
         print(f"▶️ {name}")
         start = time.time()
+        before = step_metrics.as_dict() if step_metrics else {}
         try:
-            ret = func()
+            ret, metrics = measure(func, {})
             elapsed = time.time() - start
             print(f"✅ {name} completed in {elapsed:.1f}s\n")
             results.append((name, True, elapsed, ret))
         except Exception as e:
             elapsed = time.time() - start
+            metrics = {"wall_s": elapsed}
             print(f"❌ {name} failed after {elapsed:.1f}s → {e}\n")
             results.append((name, False, elapsed, None))
+        after = step_metrics.as_dict() if step_metrics else {}
+        metrics.update({k: v - before.get(k, 0) for k, v in after.items()})
+        ledger.record("press", name, "success" if results[-1][1] else "failed", metrics)
 
     # --------------------------------------------------------
     # Summary
@@ -160,6 +200,7 @@ if __name__ == "__main__":
     print("-" * 60)
     print(f"⏱️ Total runtime: {time.time() - start_total:.1f}s")
     print("=" * 60 + "\n")
+    print_comparison(ledger.compare("press", runs=args.runs, threshold_pct=args.threshold), args.threshold, only_regressions=True)
 
     if any(not ok for _, ok, _, _ in results):
         exit(1)
\ No newline at end of file
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+benchmark_excel_engines.py
+
+Times every installed Excel engine (helpers/excel_reader.py) on the downloaded
+HKEX workbooks: the Main/GEM listing files and the ISIN files in data/raw.
+Each engine reads every sheet of every file (header=None, as the converter
+does); results are checked against the first engine that read the file.
+
+    python testing/benchmark_excel_engines.py --repeat 3
+    python testing/benchmark_excel_engines.py --engines calamine,openpyxl data/raw/Main_2020.xlsx
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# ----------------------------
+# Ensure project root is in sys.path so helpers import works
+# ----------------------------
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import excel_reader
+
+# ----------------------------
+# Configuration
+# ----------------------------
+RAW_DIR = Path("data/raw")
+PATTERNS = ["Main_*.xls*", "GEM_*.xls*", "isino.xls*", "isinsehk.xls*", "secstkorder.xls*"]
+
+
+def default_files() -> list[Path]:
+    return sorted({p for pattern in PATTERNS for p in RAW_DIR.glob(pattern) if not p.name.startswith("~$")})
+
+
+def same_sheets(a: dict, b: dict) -> bool:
+    if list(a) != list(b):
+        return False
+    for name in a:
+        try:
+            pd.testing.assert_frame_equal(a[name], b[name], check_dtype=False)
+        except AssertionError:
+            return False
+    return True
+
+
+def benchmark(files: list[Path], engines: list[str], repeat: int) -> dict:
+    """engine -> {"seconds": median total over files, "files": files read, "mismatches": [...]}"""
+    results = {e: {"runs": [], "files": 0, "failed": [], "mismatches": []} for e in engines}
+    reference = {}
+    for engine in engines:
+        for run in range(repeat):
+            total = 0.0
+            for path in files:
+                start = time.perf_counter()
+                try:
+                    sheets = excel_reader.read_excel(path, sheet_name=None, engines=[engine])
+                except Exception:
+                    if run == 0:
+                        results[engine]["failed"].append(path.name)
+                    continue
+                total += time.perf_counter() - start
+                if run == 0:
+                    results[engine]["files"] += 1
+                    if path not in reference:
+                        reference[path] = sheets
+                    elif not same_sheets(reference[path], sheets):
+                        results[engine]["mismatches"].append(path.name)
+            results[engine]["runs"].append(total)
+    for r in results.values():
+        r["seconds"] = statistics.median(r.pop("runs")) if repeat else 0.0
+    return results
+
+
+# ----------------------------
+# Entry point
+# ----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Excel engines on the HKEX workbooks.")
+    parser.add_argument("files", nargs="*", type=Path, help="Workbooks (default: listing and ISIN files in data/raw).")
+    parser.add_argument("--engines", default=",".join(excel_reader.ENGINE_MODULES),
+                        help="Comma-separated engines to compare (default: %(default)s).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per engine; the median is reported.")
+    args = parser.parse_args()
+
+    files = args.files or default_files()
+    engines = excel_reader.available_engines(args.engines.split(","))
+    if not files:
+        raise SystemExit(f"❌ No workbooks found in {RAW_DIR} (run the downloaders first).")
+    if not engines:
+        raise SystemExit("❌ None of the requested engines is installed.")
+
+    print(f"📊 {len(files)} workbooks, {args.repeat} passes: {', '.join(engines)}\n")
+    results = benchmark(files, engines, args.repeat)
+    fastest = min((r["seconds"] for r in results.values() if r["files"]), default=0.0)
+    print(f"{'engine':<10} {'files':>5} {'seconds':>9} {'vs best':>8}  notes")
+    for engine, r in results.items():
+        ratio = f"{r['seconds'] / fastest:.1f}x" if fastest and r["files"] else "-"
+        notes = []
+        if r["failed"]:
+            notes.append(f"cannot read {len(r['failed'])} ({', '.join(r['failed'][:3])}{', ...' if len(r['failed']) > 3 else ''})")
+        if r["mismatches"]:
+            notes.append(f"differs on {', '.join(r['mismatches'])}")
+        print(f"{engine:<10} {r['files']:>5} {r['seconds']:>9.2f} {ratio:>8}  {'; '.join(notes)}")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+check_offer_rows.py
+
+Fixture check for the vectorized Main Board offer-row handling:
+- hkex_main_bronze.fill_continuation_codes (stock codes for (b)/(c) rows)
+- hkex_main_silver.merge_offer_rows ((b)/(c) funds merged into the (a) row)
+Both are compared with the row-by-row loops they replaced, on a fixture of
+edge cases and on a large random history, then timed.
+
+    python testing/check_offer_rows.py --rows 2000
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Ensure project root is in sys.path so modules import works
+# ----------------------------
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from modules.hkex_main_bronze import fill_continuation_codes
+from modules.hkex_main_silver import merge_offer_rows
+
+
+# ----------------------------
+# Reference implementations (the loops replaced)
+# ----------------------------
+def fill_continuation_codes_loop(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for i in range(len(df)):
+        offer_type = str(df.iloc[i, -1]).strip()
+        prev_offer = str(df.iloc[i - 1, -1]).strip() if i > 0 else ""
+        if offer_type in ("(b)", "(c)") and i > 0:
+            if prev_offer == "(a)":
+                df.iat[i, 1] = df.iat[i - 1, 1]
+            elif offer_type == "(c)" and prev_offer == "(b)" and i > 1:
+                df.iat[i, 1] = df.iat[i - 2, 1]
+    return df
+
+
+def merge_offer_rows_loop(df: pd.DataFrame) -> pd.DataFrame:
+    df["funds_raised_hk"] = None
+    df["funds_raised_intl"] = None
+    df["funds_raised_sg"] = None
+    rows_to_drop = []
+    for i in range(len(df)):
+        location = str(df.loc[i, "offer_location"]).strip()
+        funds = df.loc[i, "funds_raised"]
+        if location in ("(b)", "(c)"):
+            for j in range(i - 1, -1, -1):
+                if df.loc[j, "stock_code"] == df.loc[i, "stock_code"]:
+                    if location == "(b)":
+                        df.at[j, "funds_raised_intl"] = funds
+                    elif location == "(c)":
+                        df.at[j, "funds_raised_sg"] = funds
+                    rows_to_drop.append(i)
+                    break
+        else:
+            df.at[i, "funds_raised_hk"] = funds
+    return df.drop(rows_to_drop).drop(columns=["funds_raised", "offer_location"])
+
+
+# ----------------------------
+# Fixtures
+# ----------------------------
+def bronze_fixture() -> pd.DataFrame:
+    """Grid rows as hkex_main_bronze sees them: column 1 stock_code, last column offer type."""
+    N = np.nan
+    rows = [
+        (1, 101, "(a)"), (2, N, "(b)"),                    # (b) after (a)
+        (3, 102, "(a)"), (4, N, "(b)"), (5, N, "(c)"),     # (a)(b)(c)
+        (6, 103, "(a)"), (7, N, "(c)"),                    # (c) after (a)
+        (8, 104, "(a)"), (9, N, "(b)"), (10, N, "(b)"), (11, N, "(c)"),  # chain through (b) rows
+        (12, N, "(b)"), (13, N, "(c)"),                    # continuation without an (a)
+        (14, 105, N), (15, 106, " (a) "), (16, N, "(b) "), # blanks and padding
+    ]
+    return pd.DataFrame([[i, code, f"Co {i}", *([N] * 7), offer] for i, code, offer in rows])
+
+
+def silver_fixture() -> pd.DataFrame:
+    rows = [
+        (101, 10.0, "(a)"), (101, 2.0, "(b)"),
+        (102, 20.0, "(a)"), (102, 3.0, "(b)"), (102, 4.0, "(c)"),
+        (103, 30.0, "(a)"), (103, 5.0, "(c)"), (103, 6.0, "(c)"),  # latest (c) wins
+        (104, 7.0, "(b)"),                                          # no parent: kept
+        (np.nan, 8.0, "(a)"), (np.nan, 9.0, "(b)"),                 # missing codes never match
+        (105, np.nan, "(a)"), (106, 11.0, np.nan), (105, 12.0, " (b) "),
+    ]
+    return pd.DataFrame(rows, columns=["stock_code", "funds_raised", "offer_location"]).assign(company="x")
+
+
+def random_history(n: int, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    rng = random.Random(seed)
+    offers = rng.choices(["(a)", "(b)", "(c)", "nan"], weights=[6, 2, 1, 1], k=n)
+    codes = [rng.randrange(1, n // 3 + 2) if o != "(b)" or rng.random() < 0.3 else np.nan for o in offers]
+    bronze = pd.DataFrame({0: range(n), 1: codes, 2: "Co", 3: np.nan, 4: offers})
+    silver = pd.DataFrame({"stock_code": [rng.randrange(1, n // 3 + 2) for _ in range(n)],
+                           "funds_raised": [rng.random() * 100 for _ in range(n)],
+                           "offer_location": offers})
+    return bronze, silver
+
+
+def same(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    return a.to_csv() == b.to_csv()
+
+
+def quiet(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+# ----------------------------
+# Entry point
+# ----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check vectorized offer-row handling against the loops it replaced.")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows of random history to compare and time.")
+    args = parser.parse_args()
+
+    bronze, silver = random_history(args.rows)
+    checks = {
+        "bronze fixture": same(fill_continuation_codes(bronze_fixture()), fill_continuation_codes_loop(bronze_fixture())),
+        "silver fixture": same(quiet(merge_offer_rows, silver_fixture()), merge_offer_rows_loop(silver_fixture())),
+        "bronze random": same(fill_continuation_codes(bronze), fill_continuation_codes_loop(bronze)),
+    }
+    start = time.perf_counter()
+    fast = quiet(merge_offer_rows, silver.copy())
+    t_fast = time.perf_counter() - start
+    start = time.perf_counter()
+    slow = merge_offer_rows_loop(silver.copy())
+    t_slow = time.perf_counter() - start
+    checks["silver random"] = same(fast, slow)
+
+    for name, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+    print(f"⏱️ merge_offer_rows on {args.rows} rows: {t_fast:.3f}s vectorized vs {t_slow:.2f}s loop")
+    if not all(checks.values()):
+        raise SystemExit(1)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+check_stock_prefix_trie.py
+
+Fixture check for the prefix-trie planner of loaders/stock_id_api_scraper.py
+(plan_queries): every target code must be resolved, whatever order prefix.do
+returns its matches in. A stub API answers with up to PREFIX_LIMIT codes
+starting with the query, in ascending, descending or shuffled order; the
+planner's coverage and query count are compared with one query per code.
+
+    python testing/check_stock_prefix_trie.py --max-code 2999
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+# ----------------------------
+# Ensure project root is in sys.path so loaders import works
+# ----------------------------
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from loaders.stock_id_api_scraper import CODE_DIGITS, PREFIX_LIMIT, plan_queries
+
+
+# ----------------------------
+# Stub prefix.do
+# ----------------------------
+def stub_api(codes: list[int], order: str, seed: int = 0):
+    """fetch(prefixes) for plan_queries, backed by `codes` listed in `order`."""
+    rng = random.Random(seed)
+    listed = sorted(codes, reverse=order == "descending")
+    if order == "shuffled":
+        rng.shuffle(listed)
+    calls = {"queries": 0}
+
+    def reply(prefix: str) -> list:
+        matches = [c for c in listed
+                   if str(c).startswith(prefix) or str(c).zfill(CODE_DIGITS).startswith(prefix)]
+        return [{"code": str(c).zfill(CODE_DIGITS), "stockId": c} for c in matches[:PREFIX_LIMIT]]
+
+    def fetch(prefixes):
+        calls["queries"] += len(prefixes)
+        return {p: reply(p) for p in prefixes}
+
+    return fetch, calls
+
+
+def resolved(targets: list[str], fetch) -> set[str]:
+    found = set()
+    for _, info in plan_queries(targets, fetch):
+        found.update(str(int(item["code"])) for item in info)
+    return found & set(targets)
+
+
+# ----------------------------
+# Entry point
+# ----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the stock-code prefix trie resolves every code.")
+    parser.add_argument("--max-code", type=int, default=2999, help="Codes 1..max-code exist and are targets.")
+    args = parser.parse_args()
+
+    codes = list(range(1, args.max_code + 1))
+    targets = sorted(str(c) for c in codes)
+    ok = True
+    for order in ("ascending", "descending", "shuffled"):
+        fetch, calls = stub_api(codes, order)
+        missing = set(targets) - resolved(targets, fetch)
+        ok &= not missing
+        print(f"{'✅' if not missing else '❌'} {order}: {len(targets) - len(missing)}/{len(targets)} codes resolved "
+              f"with {calls['queries']} queries (one per code: {len(targets)})"
+              + (f", missing {sorted(missing, key=int)[:5]}..." if missing else ""))
+    if not ok:
+        raise SystemExit(1)
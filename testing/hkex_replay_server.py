@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+hkex_replay_server.py
+
+Local stand-in for hkexnews / hkex.com.hk that replays a fixture archive
+(helpers/fixture_archive.py) with configurable latency, server errors and
+429 throttling, so the downloaders can be benchmarked offline.
+
+1) Record real responses once (normal run, online):
+     HTTP_RECORD_DIR=data/fixtures/hkex python main.py
+     HTTP_RECORD_DIR=data/fixtures/hkex python press_main.py
+2) Replay them:
+     python testing/hkex_replay_server.py --latency 200 --error-rate 0.02 --max-rps 20
+     HTTP_REPLAY_URL=http://127.0.0.1:8765 python press_main.py
+
+Requests arrive as /<original host>/<path>?<query> (see rewrite_url in
+helpers/http_client.py). Conditional GETs (ETag / Last-Modified) and byte
+ranges are honoured, so freshness checks and resumable downloads behave as
+they do against HKEX.
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ----------------------------
+# Ensure project root is in sys.path so helpers import works
+# ----------------------------
+PROJECT_ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers.fixture_archive import FixtureArchive
+
+# ----------------------------
+# Configuration
+# ----------------------------
+FIXTURE_DIR = "data/fixtures/hkex"
+HOST = "127.0.0.1"
+PORT = 8765
+RETRY_AFTER = 1  # seconds advertised on 429 responses
+
+
+class Faults:
+    """Latency and failure injection shared by all handler threads."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0, max_rps=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = max_rps
+        self._refilled = time.monotonic()
+        self.counts = {"requests": 0, "ok": 0, "not_modified": 0, "missing": 0, "throttled": 0, "errors": 0}
+
+    def count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def delay(self) -> float:
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def verdict(self) -> int | None:
+        """429 / 503 for this request, or None to serve it."""
+        with self._lock:
+            if self.max_rps:
+                # Token bucket: bursts up to max_rps, refilled at max_rps per second
+                now = time.monotonic()
+                self._tokens = min(self.max_rps, self._tokens + (now - self._refilled) * self.max_rps)
+                self._refilled = now
+                if self._tokens < 1:
+                    return 429
+                self._tokens -= 1
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 503
+        return None
+
+
+def make_handler(archive: FixtureArchive, faults: Faults):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # keep benchmark output readable
+            pass
+
+        def _send(self, status, headers=None, body=b""):
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _serve(self):
+            faults.count("requests")
+            time.sleep(faults.delay())
+            status = faults.verdict()
+            if status == 429:
+                faults.count("throttled")
+                return self._send(429, {"Retry-After": str(RETRY_AFTER)})
+            if status:
+                faults.count("errors")
+                return self._send(status)
+
+            host, _, rest = self.path.lstrip("/").partition("/")
+            entry = archive.match(self.command, f"https://{host}/{rest}")
+            if entry is None and self.command == "HEAD":
+                entry = archive.match("GET", f"https://{host}/{rest}")
+            if entry is None:
+                faults.count("missing")
+                return self._send(404)
+
+            headers = dict(entry["headers"])
+            etag, modified = headers.get("ETag"), headers.get("Last-Modified")
+            if (etag and self.headers.get("If-None-Match") == etag) or \
+                    (not etag and modified and self.headers.get("If-Modified-Since") == modified):
+                faults.count("not_modified")
+                return self._send(304, {k: v for k, v in headers.items() if k in ("ETag", "Last-Modified")})
+
+            path = archive.body_path(entry)
+            body = path.read_bytes() if path else b""
+            status = entry["status"]
+            byte_range = self.headers.get("Range", "")
+            if status == 200 and byte_range.startswith("bytes=") and byte_range.endswith("-"):
+                start = int(byte_range[len("bytes="):-1] or 0)
+                if start >= len(body):
+                    return self._send(416, {"Content-Range": f"bytes */{len(body)}"})
+                headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+                status, body = 206, body[start:]
+            faults.count("ok" if status < 400 else "missing")
+            self._send(status, headers, body)
+
+        do_GET = _serve
+        do_HEAD = _serve
+        do_POST = _serve
+
+    return ReplayHandler
+
+
+def serve(fixture_dir=FIXTURE_DIR, host=HOST, port=PORT, **faults) -> tuple[ThreadingHTTPServer, Faults]:
+    """Start the replay server in a background thread (for benchmarks); returns (server, faults)."""
+    archive = FixtureArchive(fixture_dir)
+    fault_state = Faults(**faults)
+    server = ThreadingHTTPServer((host, port), make_handler(archive, fault_state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, fault_state
+
+
+# ----------------------------
+# Entry point
+# ----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded HKEX responses locally.")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Fixture archive directory (default: %(default)s).")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response latency in ms.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform latency jitter in ms (+/-).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Requests per second before 429s (0 = unlimited).")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible fault patterns.")
+    args = parser.parse_args()
+
+    server, faults = serve(args.fixtures, args.host, args.port, latency_ms=args.latency, jitter_ms=args.jitter,
+                           error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                           max_rps=args.max_rps, seed=args.seed)
+    print(f"🎞️ Replaying {len(FixtureArchive(args.fixtures))} responses on http://{args.host}:{args.port}")
+    print(f"   export HTTP_REPLAY_URL=http://{args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"📊 {faults.counts}")
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\n📊 {faults.counts}")